@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Пакетная запись ключей в animCurve: все ключи кривой одной командой setAttr
+по массиву keyTimeValue (так же кривые загружаются из .ma), команда попадает в undo.
+Касательные хранятся у кривой по индексу ключа: если запись сдвигает индексы
+ключей, их касательные снимаются до записи и возвращаются по времени ключа.
+"""
+import maya.cmds as cmds
+import maya.mel as mel
+
+
+def get_input_curve(plug):
+    """Возвращает animCurve, подключенную к атрибуту, или None."""
+    curves = cmds.listConnections(plug, s=True, d=False, type="animCurve") or []
+    return curves[0] if curves else None
+
+
+def write_time_keys(plug, frames, values, tangent="auto"):
+    """
+    Записывает ключи (кадр, значение) на атрибут, заменяя старые ключи в этом диапазоне.
+    Ключи вне диапазона сохраняются.
+    """
+    frames = [float(f) for f in frames]
+    values = [float(v) for v in values]
+    if not frames: return None
+    lo, hi = min(frames), max(frames)
+
+    curve = get_input_curve(plug)
+    tail = []
+    if curve:
+        # Ключи после диапазона сдвинутся по индексу (cutKey сжимает, запись ktv вставляет)
+        after = [t for t in cmds.keyframe(curve, q=True, tc=True) or [] if t > hi]
+        if after: tail = read_tangents(curve, (after[0], after[-1]))
+        cmds.cutKey(curve, time=(lo, hi), clear=True)
+    if not curve or not cmds.objExists(curve):
+        # Создаем кривую штатно, чтобы Maya сама подобрала тип и имя
+        cmds.setKeyframe(plug, t=frames[0], v=values[0])
+        curve = get_input_curve(plug)
+
+    old_t = cmds.keyframe(curve, q=True, tc=True) or []
+    old_v = cmds.keyframe(curve, q=True, vc=True) or []
+    merged = dict(zip(old_t, old_v))
+    merged.update(zip(frames, values))
+
+    keys = sorted(merged.items())
+    flat = [x for kv in keys for x in kv]
+    cmds.setAttr("{}.ktv[0:{}]".format(curve, len(keys) - 1), *flat)
+    cmds.keyTangent(curve, e=True, t=(lo, hi), itt=tangent, ott=tangent, lock=True)
+    restore_tangents(curve, tail)
+    return curve
+
+
+def _unitless(curve):
+    return cmds.nodeType(curve).startswith("animCurveU")
+
+
+def read_tangents(curve, span):
+    """
+    Касательные ключей кривой в диапазоне входов span (кадры или значения драйвера у SDK).
+    :return: [(вход, itt, ott, ia, oa, iw, ow, lock)] -- по одному запросу на свойство
+    """
+    sel = {"f": span} if _unitless(curve) else {"t": span}
+    inputs = cmds.keyframe(curve, q=True, fc=True, **sel) if "f" in sel else cmds.keyframe(curve, q=True, tc=True, **sel)
+    if not inputs: return []
+    props = [cmds.keyTangent(curve, q=True, **dict(sel, **{flag: True}))
+             for flag in ("itt", "ott", "ia", "oa", "iw", "ow", "lock")]
+    return list(zip(inputs, *props))
+
+
+def restore_tangents(curve, saved):
+    """Возвращает касательные, снятые read_tangents, ключам с теми же входами -- одним mel.eval."""
+    if not saved: return
+    sel = "-f" if _unitless(curve) else "-t"
+    weighted = cmds.keyTangent(curve, q=True, weightedTangents=True)[0]
+    script = []
+    for key, itt, ott, ia, oa, iw, ow, lock in saved:
+        head = "keyTangent -e {} \"{!r}\"".format(sel, float(key))
+        # Без замка стороны задаются независимо; угол -- только у fixed (иначе тип сменится на fixed)
+        edit = " -itt {} -ott {}".format(itt, ott)
+        if itt == "fixed": edit += " -ia {!r}".format(float(ia))
+        if ott == "fixed": edit += " -oa {!r}".format(float(oa))
+        if weighted: edit += " -iw {!r} -ow {!r}".format(float(iw), float(ow))
+        script.append("{} -lock 0 \"{}\";".format(head, curve))
+        script.append("{}{} \"{}\";".format(head, edit, curve))
+        script.append("{} -lock {} \"{}\";".format(head, int(bool(lock)), curve))
+    mel.eval("\n".join(script))
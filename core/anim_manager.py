@@ -3,6 +3,9 @@ import maya.cmds as cmds
 import os
 import json
 
+from FD_FishTool.core.scene_ops import scene_operation
+from FD_FishTool.core.symmetry_map import get_symmetry_map
+
 class AnimManager:
     def __init__(self, config_manager):
         self.cfg = config_manager
@@ -27,6 +30,7 @@ class AnimManager:
             print(f"FD_FishTool: Error parsing etalon: {e}")
         return ranges
 
+    @scene_operation("Studio Anim")
     def apply_studio_anim(self, anim_folder_name):
         """
         Автономная вставка анимации без mutils:
@@ -61,64 +65,59 @@ class AnimManager:
             return
 
         # --- 2. ШАГ: ЗАГРУЗКА АНИМАЦИИ (.ma) ИЛИ ПОЗЫ (.json) ---
-        cmds.undoInfo(openChunk=True)
-        try:
-            # А) Если есть файл .ma, импортируем его напрямую (это даст ключи)
-            if os.path.exists(ma_path):
-                print(f"FD_FishTool: Importing animation curves from {ma_path}...")
-                # Используем временный namespace, чтобы не было конфликтов имен
-                imported_nodes = cmds.file(ma_path, i=True, type="mayaAscii", rnn=True, namespace="temp_anim")
-                
-                # Сопоставляем кривые с объектами по именам из pose.json
-                if os.path.exists(pose_path):
-                    with open(pose_path, 'r') as f:
-                        pose_data = json.load(f)
-                    
-                    for obj_name, data in pose_data.get("objects", {}).items():
-                        if not cmds.objExists(obj_name): continue
-                        
-                        for attr_name, attr_info in data.get("attrs", {}).items():
-                            curve_name = attr_info.get("curve")
-                            if curve_name:
-                                full_curve = f"temp_anim:{curve_name}"
-                                if cmds.objExists(full_curve):
-                                    try:
-                                        cmds.connectAttr(f"{full_curve}.output", f"{obj_name}.{attr_name}", f=True)
-                                    except: pass
-                
-                # Удаляем временный namespace (Maya сама удалит пустой после переподключения)
-                cmds.namespace(removeNamespace="temp_anim", mergeNamespaceWithParent=True)
-
-            # Б) Накладываем статичные значения из pose.json (для атрибутов без кривых)
+        # А) Если есть файл .ma, импортируем его напрямую (это даст ключи)
+        if os.path.exists(ma_path):
+            print(f"FD_FishTool: Importing animation curves from {ma_path}...")
+            # Используем временный namespace, чтобы не было конфликтов имен
+            imported_nodes = cmds.file(ma_path, i=True, type="mayaAscii", rnn=True, namespace="temp_anim")
+            
+            # Сопоставляем кривые с объектами по именам из pose.json
             if os.path.exists(pose_path):
                 with open(pose_path, 'r') as f:
                     pose_data = json.load(f)
-
+                
                 for obj_name, data in pose_data.get("objects", {}).items():
                     if not cmds.objExists(obj_name): continue
                     
                     for attr_name, attr_info in data.get("attrs", {}).items():
-                        full_attr = f"{obj_name}.{attr_name}"
-                        
-                        # ФИКС ОШИБКИ: Проверяем существование атрибута перед getAttr/setAttr
-                        if not cmds.objExists(full_attr): continue
-                        if cmds.getAttr(full_attr, lock=True): continue
-                            
-                        val = attr_info.get("value")
-                        try:
-                            # Если на атрибуте нет входящих соединений (кривых), ставим значение
-                            if not cmds.listConnections(full_attr, destination=False, source=True):
-                                cmds.setAttr(full_attr, val)
-                                cmds.setKeyframe(full_attr)
-                        except: pass
-            
-            # Установка таймлайна
-            clip_name = "normal_move" if is_body else "smile"
-            self.set_timeline(clip_name)
-            print(f"FD_FishTool: Animation successfully applied for {anim_folder_name}")
+                        curve_name = attr_info.get("curve")
+                        if curve_name:
+                            full_curve = f"temp_anim:{curve_name}"
+                            if cmds.objExists(full_curve):
+                                try:
+                                    cmds.connectAttr(f"{full_curve}.output", f"{obj_name}.{attr_name}", f=True)
+                                except: pass
             
-        finally:
-            cmds.undoInfo(closeChunk=True)
+            # Удаляем временный namespace (Maya сама удалит пустой после переподключения)
+            cmds.namespace(removeNamespace="temp_anim", mergeNamespaceWithParent=True)
+
+        # Б) Накладываем статичные значения из pose.json (для атрибутов без кривых)
+        if os.path.exists(pose_path):
+            with open(pose_path, 'r') as f:
+                pose_data = json.load(f)
+
+            for obj_name, data in pose_data.get("objects", {}).items():
+                if not cmds.objExists(obj_name): continue
+                
+                for attr_name, attr_info in data.get("attrs", {}).items():
+                    full_attr = f"{obj_name}.{attr_name}"
+                    
+                    # ФИКС ОШИБКИ: Проверяем существование атрибута перед getAttr/setAttr
+                    if not cmds.objExists(full_attr): continue
+                    if cmds.getAttr(full_attr, lock=True): continue
+                        
+                    val = attr_info.get("value")
+                    try:
+                        # Если на атрибуте нет входящих соединений (кривых), ставим значение
+                        if not cmds.listConnections(full_attr, destination=False, source=True):
+                            cmds.setAttr(full_attr, val)
+                            cmds.setKeyframe(full_attr)
+                    except: pass
+        
+        # Установка таймлайна
+        clip_name = "normal_move" if is_body else "smile"
+        self.set_timeline(clip_name)
+        print(f"FD_FishTool: Animation successfully applied for {anim_folder_name}")
 
     def set_timeline(self, anim_name):
         if anim_name in self.anim_ranges:
@@ -129,6 +128,5 @@ class AnimManager:
         return False
 
     def get_symmetric_control(self, ctrl):
-        if "_R" in ctrl: return ctrl.replace("_R", "_L")
-        if "_L" in ctrl: return ctrl.replace("_L", "_R")
-        return None
\ No newline at end of file
+        partner = get_symmetry_map().partner(ctrl)
+        return partner if partner and partner != ctrl else None
\ No newline at end of file
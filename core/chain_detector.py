@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Автоматический поиск пружинных цепей рига для SpringSelectorWindow.
+Цепь -- ряд контролов одного семейства (FKSideFin1_R -> FKSideFin2_R -> ...),
+заканчивающийся Gimble-кончиком. Группа определяется по шаблонам имен корня цепи
+без префикса и стороны, но с номером: вторые плавники отличаются именно им
+(FKSideFin2_1_R, FKSideFinB1_R).
+"""
+import re
+
+# Порядок важен: первый подходящий шаблон определяет группу (проверяется control_stem корня)
+GROUP_PATTERNS = [
+    ("SideFin2", r"side_?(fin|plv)_?(2|b)(_?\d+)?$|side_?2_?(fin|plv)"),
+    ("SideFin", r"side_?(fin|plv)|pectoral"),
+    ("BellyFin", r"belly|pelvic|anal|(dwn|down|bottom|low)_?(fin|plv)"),
+    ("DorsalFin", r"dorsal|(up|top|back)_?(fin|plv)"),
+    ("HeadFin", r"head_?(fin|plv)|chin|jaw_?fin"),
+    ("Tail", r"tail|caudal"),
+    ("Extra", r"fin|plv|whisker|tentacle|feeler"),
+]
+
+_PREFIX = re.compile(r"^(FKExtra|FKOffset|FK|IK)")
+_SIDE = re.compile(r"_[LRM]$")
+_DIGITS = re.compile(r"\d+$")
+
+
+def control_stem(name):
+    """'ns:FKSideFin2_1_R' -> 'sidefin2_1'."""
+    short = name.split("|")[-1].split(":")[-1]
+    return _SIDE.sub("", _PREFIX.sub("", short)).lower()
+
+
+def chain_family(name):
+    """'ns:FKSideFin2_R' -> 'sidefin' (номер звена цепи отброшен)."""
+    return _DIGITS.sub("", control_stem(name))
+
+
+class FinChainDetector:
+    def __init__(self, control_index):
+        self.index = control_index
+        self.patterns = [(key, re.compile(p, re.IGNORECASE)) for key, p in GROUP_PATTERNS]
+
+    def classify(self, name):
+        stem = control_stem(name)
+        for key, pattern in self.patterns:
+            if pattern.search(stem): return key
+        return None
+
+    def find_roots(self):
+        """Корни цепей: самый верхний контрол семейства над каждым Gimble-кончиком."""
+        roots = set()
+        for tip in self.index.gimble:
+            if tip not in self.index.curve_ctrls: continue
+            family = chain_family(tip)
+            root, length = tip, 1
+            node = self.index.parent.get(tip)
+            while node:
+                if node in self.index.curve_ctrls:
+                    if chain_family(node) != family: break
+                    root = node
+                    length += 1
+                node = self.index.parent.get(node)
+            if length >= 2: roots.add(root)
+        return roots
+
+    def detect(self):
+        """
+        :return: {группа: [корни]} -- пары _L/_R собраны вместе, как в SpringSelectorWindow.assign
+        """
+        mapping = {}
+        used = set()
+        for root in sorted(self.find_roots()):
+            if root in used: continue
+            key = self.classify(root)
+            if not key: continue
+            short = root.rsplit("|", 1)[-1]
+            group = [short]
+            used.add(root)
+            partner = self.index.partners.get(root)
+            if partner:
+                group.append(partner.rsplit("|", 1)[-1])
+                used.add(partner)
+            mapping.setdefault(key, []).extend(group)
+        return mapping
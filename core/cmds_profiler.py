@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Профилировщик вызовов maya.cmds: число вызовов и суммарное время по команде и по вызывающей функции.
+Пока активен хотя бы один профилировщик, функции модуля maya.cmds подменены обертками --
+это видят все модули, импортирующие 'maya.cmds as cmds'. Стеки вызовов (только кадры
+FD_FishTool) пишутся в свернутом формате flamegraph.pl / speedscope: 'a;b;cmds.ls 1234'.
+
+    with CmdsProfiler() as prof:
+        manager.apply_topological_gradient(mesh)
+    print(prof.report())
+    prof.save_folded("gradient.folded")
+"""
+import functools
+import sys
+import time
+from collections import defaultdict
+import maya.cmds as cmds
+
+PACKAGE = "FD_FishTool"
+
+_active = []  # запущенные профилировщики (все получают каждый вызов)
+_originals = {}  # имя команды -> исходная функция
+
+
+def _frame_name(frame):
+    return "{}.{}".format(frame.f_globals.get("__name__", "?"), frame.f_code.co_name)
+
+
+def _wrap(name, fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not _active: return fn(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            frame = sys._getframe(1)
+            for prof in list(_active): prof._record(name, elapsed, frame)
+    return wrapper
+
+
+def _install():
+    for name in dir(cmds):
+        fn = getattr(cmds, name)
+        if name.startswith("_") or not callable(fn) or name in _originals: continue
+        _originals[name] = fn
+        setattr(cmds, name, _wrap(name, fn))
+
+
+def _uninstall():
+    for name, fn in _originals.items(): setattr(cmds, name, fn)
+    _originals.clear()
+
+
+class CmdsProfiler:
+    def __init__(self, stacks=False, max_depth=32):
+        """
+        :param stacks: собирать свернутые стеки (дороже -- обход кадров на каждый вызов)
+        :param max_depth: глубина стека (только кадры пакета FD_FishTool)
+        """
+        self.stacks = stacks
+        self.max_depth = max_depth
+        self.reset()
+
+    def reset(self):
+        self.by_command = defaultdict(lambda: [0, 0.0])  # команда -> [вызовы, секунды]
+        self.by_caller = defaultdict(lambda: [0, 0.0])  # (функция, команда) -> [вызовы, секунды]
+        self.folded = defaultdict(float)  # 'a;b;cmds.X' -> секунды
+        self.elapsed = 0.0
+        self._start = None
+
+    def start(self):
+        if self in _active: return self
+        if not _originals: _install()
+        _active.append(self)
+        self._start = time.perf_counter()
+        return self
+
+    def stop(self):
+        if self not in _active: return self
+        _active.remove(self)
+        self.elapsed += time.perf_counter() - self._start
+        if not _active: _uninstall()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _record(self, name, elapsed, frame):
+        stat = self.by_command[name]
+        stat[0] += 1; stat[1] += elapsed
+        stat = self.by_caller[(_frame_name(frame), name)]
+        stat[0] += 1; stat[1] += elapsed
+        if self.stacks:
+            chain = []
+            while frame is not None and len(chain) < self.max_depth:
+                if frame.f_globals.get("__name__", "").startswith(PACKAGE): chain.append(_frame_name(frame))
+                frame = frame.f_back
+            chain.reverse(); chain.append("cmds." + name)
+            self.folded[";".join(chain)] += elapsed
+
+    # --- Отчеты ---
+    @property
+    def calls(self):
+        return sum(c for c, _ in self.by_command.values())
+
+    def top_commands(self, limit=20, key="time"):
+        """[(команда, вызовы, секунды)] по убыванию времени ('time') или числа вызовов ('calls')."""
+        rows = [(n, c, t) for n, (c, t) in self.by_command.items()]
+        return sorted(rows, key=lambda r: r[2] if key == "time" else r[1], reverse=True)[:limit]
+
+    def top_callers(self, limit=20, key="time"):
+        """[(функция, команда, вызовы, секунды)] -- худшие точки обращения к Maya."""
+        rows = [(f, n, c, t) for (f, n), (c, t) in self.by_caller.items()]
+        return sorted(rows, key=lambda r: r[3] if key == "time" else r[2], reverse=True)[:limit]
+
+    def report(self, limit=20, key="time"):
+        lines = ["cmds: {} вызовов, {:.3f} c из {:.3f} c".format(
+            self.calls, sum(t for _, t in self.by_command.values()), self.elapsed)]
+        lines.append("{:<32} {:>8} {:>10}".format("команда", "вызовы", "мс"))
+        for n, c, t in self.top_commands(limit, key):
+            lines.append("{:<32} {:>8} {:>10.1f}".format(n, c, t * 1000.0))
+        lines.append("{:<56} {:>8} {:>10}".format("функция -> команда", "вызовы", "мс"))
+        for f, n, c, t in self.top_callers(limit, key):
+            lines.append("{:<56} {:>8} {:>10.1f}".format("{} -> {}".format(f, n)[-56:], c, t * 1000.0))
+        return "\n".join(lines)
+
+    def folded_lines(self):
+        """Свернутые стеки; вес -- микросекунды (целые, как ждет flamegraph.pl)."""
+        return ["{} {}".format(stack, max(1, int(t * 1e6))) for stack, t in sorted(self.folded.items())]
+
+    def save_folded(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(self.folded_lines()) + "\n")
+        return path
+
+    def as_dict(self, limit=10):
+        return {
+            "calls": self.calls,
+            "commands": {n: c for n, c, _ in self.top_commands(limit, "calls")},
+            "callers": ["{} -> {} x{}".format(f, n, c) for f, n, c, _ in self.top_callers(limit, "calls")],
+        }
+
+
+def profile_cmds(stacks=False, log=True):
+    """Декоратор: профилирует вызовы cmds функции и печатает отчет."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with CmdsProfiler(stacks) as prof:
+                result = fn(*args, **kwargs)
+            if log: print("FD_FishTool: [{}]\n{}".format(fn.__name__, prof.report(10)))
+            wrapper.last_profile = prof
+            return result
+        return wrapper
+    return decorator
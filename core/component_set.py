@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Наборы вершин меша как отсортированные массивы индексов (int64) вместо строк 'mesh.vtx[i]'.
+Объединение/пересечение/разность -- np.union1d/intersect1d/setdiff1d, соседство -- CSR из ребер.
+В MSelectionList/строки компонентов набор переводится только на границе с Maya.
+"""
+import numpy as np
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+import maya.api.OpenMayaAnim as oma
+
+from FD_FishTool.core import skin_weights
+from FD_FishTool.core.weight_smoothing import build_neighbors
+
+
+def _parse_components(components):
+    """Строки вершин (в т.ч. диапазоны 'mesh.vtx[3:7]') -> (меш, индексы)."""
+    mesh, result = None, []
+    for c in components:
+        if ".vtx[" not in c: continue
+        node, _, rng = c.partition(".vtx[")
+        mesh = mesh or node
+        lo, _, hi = rng.rstrip("]").partition(":")
+        result.append(np.arange(int(lo), int(hi or lo) + 1))
+    return mesh, np.concatenate(result) if result else np.zeros(0, dtype=np.int64)
+
+
+class ComponentSet:
+    """Отсортированный набор уникальных индексов вершин одного меша."""
+    __slots__ = ("mesh", "indices")
+
+    def __init__(self, mesh, indices=(), assume_sorted=False):
+        self.mesh = mesh
+        indices = np.asarray(indices, dtype=np.int64).ravel()
+        self.indices = indices if assume_sorted else np.unique(indices)
+
+    @classmethod
+    def from_components(cls, components, mesh=None):
+        node, indices = _parse_components(components)
+        return cls(mesh or node, indices)
+
+    @classmethod
+    def from_selection(cls, mesh):
+        return cls(mesh, skin_weights.get_selected_vertices(mesh), assume_sorted=True)
+
+    @classmethod
+    def from_influence(cls, skin, influence):
+        """Вершины с ненулевым весом инфлюенса -- без изменения выделения."""
+        sel = om.MSelectionList(); sel.add(skin); sel.add(influence)
+        fn = oma.MFnSkinCluster(sel.getDependNode(0))
+        affected, _ = fn.getPointsAffectedByInfluence(sel.getDagPath(1))
+        path = om.MDagPath(fn.getPathAtIndex(0)); path.pop()
+        indices = []
+        for i in range(affected.length()):
+            _, comp = affected.getComponent(i)
+            if not comp.isNull(): indices.extend(om.MFnSingleIndexedComponent(comp).getElements())
+        return cls(path.partialPathName(), indices)
+
+    def _combine(self, other, op):
+        # Пустой набор (в т.ч. без меша) совместим с любым
+        if len(self.indices) and len(other.indices) and other.mesh != self.mesh:
+            raise ValueError("ComponentSet: разные меши ({} / {})".format(self.mesh, other.mesh))
+        return ComponentSet(self.mesh or other.mesh, op(self.indices, other.indices), True)
+
+    def __or__(self, other):
+        return self._combine(other, np.union1d)
+
+    def __and__(self, other):
+        return self._combine(other, lambda a, b: np.intersect1d(a, b, assume_unique=True))
+
+    def __sub__(self, other):
+        return self._combine(other, lambda a, b: np.setdiff1d(a, b, assume_unique=True))
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __bool__(self):
+        return bool(len(self.indices))
+
+    def __iter__(self):
+        return iter(self.indices.tolist())
+
+    def __contains__(self, index):
+        pos = np.searchsorted(self.indices, index)
+        return pos < len(self.indices) and self.indices[pos] == index
+
+    def __getitem__(self, key):
+        return ComponentSet(self.mesh, self.indices[key], True)
+
+    def contains(self, indices):
+        """Векторная проверка принадлежности: bool-маска по indices."""
+        pos = np.clip(np.searchsorted(self.indices, indices), 0, max(len(self.indices) - 1, 0))
+        return (self.indices[pos] == indices) if len(self.indices) else np.zeros(len(indices), dtype=bool)
+
+    # --- Граница с Maya ---
+    def to_components(self):
+        """Строки диапазонов 'mesh.vtx[a:b]' -- короткий список для cmds."""
+        if not len(self.indices): return []
+        breaks = np.nonzero(np.diff(self.indices) != 1)[0]
+        starts = self.indices[np.concatenate([[0], breaks + 1])]
+        ends = self.indices[np.concatenate([breaks, [len(self.indices) - 1]])]
+        return ["{}.vtx[{}:{}]".format(self.mesh, a, b) for a, b in zip(starts.tolist(), ends.tolist())]
+
+    def to_selection_list(self):
+        sel = om.MSelectionList(); sel.add(self.mesh)
+        comp_fn = om.MFnSingleIndexedComponent()
+        comp = comp_fn.create(om.MFn.kMeshVertComponent)
+        comp_fn.addElements(self.indices.tolist())
+        result = om.MSelectionList()
+        result.add((sel.getDagPath(0).extendToShape(), comp))
+        return result
+
+    def select(self, add=False):
+        skin_weights.select_vertices(self.mesh, self.indices, add)
+
+
+class MeshTopology:
+    """CSR-соседство вершин меша для операций над ComponentSet."""
+
+    def __init__(self, mesh):
+        self.mesh = mesh
+        self.vertex_count = cmds.polyEvaluate(mesh, vertex=True)
+        self.edges = skin_weights.get_edges(mesh)
+        self.indptr, self.neighbors = build_neighbors(self.edges, self.vertex_count)
+
+    def signature(self):
+        return (len(self.edges), self.vertex_count)
+
+    def _gather(self, indices):
+        """(соседи подряд, индекс исходной вершины для каждого соседа)."""
+        start, end = self.indptr[indices], self.indptr[indices + 1]
+        counts = end - start
+        shift = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return self.neighbors[np.repeat(start, counts) + shift], np.repeat(np.arange(len(indices)), counts)
+
+    def grow(self, cset):
+        """Набор вместе с соседями по ребрам (аналог vtx -> edge -> vtx)."""
+        nbrs, _ = self._gather(cset.indices)
+        return ComponentSet(cset.mesh, np.union1d(cset.indices, nbrs), True)
+
+    def touching(self, cset, other):
+        """Вершины cset, у которых есть сосед в other."""
+        nbrs, owner = self._gather(cset.indices)
+        hit = np.zeros(len(cset), dtype=bool)
+        hit[owner[other.contains(nbrs)]] = True
+        return cset[hit]
+
+    def border(self, cset):
+        """Вершины cset, у которых есть сосед вне cset."""
+        nbrs, owner = self._gather(cset.indices)
+        hit = np.zeros(len(cset), dtype=bool)
+        hit[owner[~cset.contains(nbrs)]] = True
+        return cset[hit]
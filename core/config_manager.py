@@ -1,19 +1,60 @@
+import copy
 import json
 import os
+import tempfile
+from types import MappingProxyType
+
+
+def _freeze(data):
+    """Только для чтения: dict -> MappingProxyType, list -> tuple (рекурсивно)."""
+    if isinstance(data, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in data.items()})
+    if isinstance(data, list):
+        return tuple(_freeze(v) for v in data)
+    return data
+
+
+def _thaw(obj):
+    if isinstance(obj, MappingProxyType): return dict(obj)
+    raise TypeError("{} is not JSON serializable".format(type(obj).__name__))
+
 
 class ConfigManager:
     def __init__(self):
         self.base_dir = os.path.dirname(os.path.dirname(__file__))
         self.data_path = os.path.join(self.base_dir, "data")
+        self._cache = {}  # путь -> ((mtime_ns, size), данные, вид только для чтения)
 
-    def load_json(self, filename):
+    def load_json(self, filename, copy_data=False):
+        """
+        JSON из папки data; парсинг -- только при изменении mtime/размера файла.
+        :param copy_data: True -- изменяемая копия, иначе общий вид только для чтения
+        """
         full_path = os.path.join(self.data_path, filename)
-        if os.path.exists(full_path):
+        try:
+            st = os.stat(full_path)
+        except OSError:
+            self._cache.pop(full_path, None)
+            return {} if copy_data else MappingProxyType({})
+        key = (st.st_mtime_ns, st.st_size)
+        cached = self._cache.get(full_path)
+        if not cached or cached[0] != key:
             with open(full_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {}
+                data = json.load(f)
+            cached = (key, data, _freeze(data))
+            self._cache[full_path] = cached
+        return copy.deepcopy(cached[1]) if copy_data else cached[2]
 
     def save_json(self, filename, data):
+        """Запись через временный файл и os.replace: при сбое старый файл остается целым."""
         full_path = os.path.join(self.data_path, filename)
-        with open(full_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4)
\ No newline at end of file
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", suffix=".json", dir=self.data_path)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=4, default=_thaw)
+                f.flush(); os.fsync(f.fileno())
+            os.replace(tmp_path, full_path)
+        except BaseException:
+            if os.path.exists(tmp_path): os.remove(tmp_path)
+            raise
+        self._cache.pop(full_path, None)
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Индекс иерархии контролов, собранный за один проход по сцене:
+родители/дети, контролы с nurbsCurve, Gimble-кончики и симметричные пары (по SymmetryMap).
+Разрешение цепей после этого -- поиск в памяти, без запросов к Maya.
+"""
+import maya.cmds as cmds
+
+from FD_FishTool.core.symmetry_map import get_symmetry_map
+from FD_FishTool.core import instrumentation
+
+GIMBLE_ATTR = "Gimble_Visible"
+
+
+class ControlIndex:
+    def __init__(self, log=False):
+        """:param log: печатать статистику индекса (всегда печатается при включенной инструментации)"""
+        self.log = log
+        self.parent = {}
+        self.children = {}
+        self.by_short = {}
+        self.curve_ctrls = set()
+        self.gimble = set()
+        self.partners = {}
+        self.build()
+
+    def build(self):
+        transforms = cmds.ls(type="transform", long=True) or []
+        self.parent, self.children, self.by_short = {}, {}, {}
+        for t in transforms:
+            par = t.rsplit("|", 1)[0] or None
+            self.parent[t] = par
+            self.children.setdefault(par, []).append(t)
+            self.by_short.setdefault(t.rsplit("|", 1)[-1], []).append(t)
+
+        shapes = cmds.ls(type="nurbsCurve", long=True, ni=True) or []
+        self.curve_ctrls = {s.rsplit("|", 1)[0] for s in shapes}
+        plugs = cmds.ls("*." + GIMBLE_ATTR, "*:*." + GIMBLE_ATTR, o=True, long=True) or []
+        self.gimble = set(plugs)
+
+        # Симметричные пары -- из карты симметрии сцены
+        sym = get_symmetry_map()
+        self.partners = {}
+        for short, paths in self.by_short.items():
+            if len(paths) != 1 or paths[0] not in self.curve_ctrls: continue
+            other = self.by_short.get(sym.partner(short) or "")
+            if other and len(other) == 1 and other[0] != paths[0]:
+                self.partners[paths[0]] = other[0]
+        if self.log or instrumentation.is_enabled():
+            print(f"ControlIndex: {len(transforms)} transform, {len(self.curve_ctrls)} контролов, "
+                  f"{len(self.gimble)} Gimble, {len(self.partners) // 2} пар.")
+
+    def long_name(self, node):
+        if node in self.parent: return node
+        paths = self.by_short.get(node.split("|")[-1], [])
+        return paths[0] if len(paths) == 1 else None
+
+    def descendants(self, node):
+        """Потомки в порядке обхода в глубину (с глубиной)."""
+        out = []
+        stack = [(c, 1) for c in reversed(self.children.get(node, []))]
+        while stack:
+            cur, depth = stack.pop()
+            out.append((cur, depth))
+            stack.extend((c, depth + 1) for c in reversed(self.children.get(cur, [])))
+        return out
+
+    def chain_end(self, root):
+        """Самый глубокий Gimble-контрол под корнем (кончик цепи)."""
+        root = self.long_name(root) or root
+        desc = self.descendants(root)
+        tips = [(depth, i, n) for i, (n, depth) in enumerate(desc) if n in self.gimble]
+        if tips: return max(tips)[2]
+        return desc[-1][0] if desc else root
+
+    def chain(self, root):
+        """Цепь контролов nurbsCurve от корня до кончика: (список, кончик)."""
+        root_long = self.long_name(root)
+        if not root_long: return [root], root
+        end = self.chain_end(root_long)
+        path = []
+        node = end
+        while node and node != root_long:
+            if node in self.curve_ctrls: path.append(node)
+            node = self.parent.get(node)
+        return [root] + path[::-1], end
+
+    def partner(self, node):
+        long_node = self.long_name(node)
+        other = self.partners.get(long_node)
+        return other.rsplit("|", 1)[-1] if other else None
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+Прореживание animCurve с контролем ошибки.
+Оставляет минимум ключей с fixed-касательными, который повторяет исходную
+кривую в пределах допуска канала. Подбор ключей векторизован по всем кривым сразу.
+
+Запеченные кривые (ключ на каждом кадре) сверяются в каждом ключе, касательные --
+конечные разности. У разреженных кривых (SDK, ручная анимация) касательные авторские,
+а ошибка считается и между ключами -- по промежуточным точкам каждого пролета.
+"""
+import maya.cmds as cmds
+import maya.mel as mel
+import numpy as np
+
+# Промежуточных точек на пролет при сверке разреженных кривых
+SUBDIV = 8
+
+
+def _hermite(times, values, in_slopes, out_slopes, mask, q_times, q_span):
+    """
+    Значения кривой, собранной по ключам mask, в точках q_times (все кривые сразу).
+    :param q_span: (C, Q) индекс исходного пролета [k, k+1], в который попадает точка
+    :return: (значения (C, Q), предыдущий оставленный ключ (C, Q))
+    """
+    count, frames = values.shape
+    cols = np.arange(frames)
+    prev = np.maximum.accumulate(np.where(mask, cols, -1), axis=1)
+    nxt = np.minimum.accumulate(np.where(mask, cols, frames)[:, ::-1], axis=1)[:, ::-1]
+    rows = np.arange(count)[:, None]
+    p, n = prev[rows, q_span], nxt[rows, q_span + 1]
+
+    t0, t1 = times[rows, p], times[rows, n]
+    h = t1 - t0
+    safe_h = np.where(h > 0, h, 1.0)
+    s = np.where(h > 0, (q_times - t0) / safe_h, 0.0)
+    s2, s3 = s * s, s * s * s
+    h00, h10 = 2 * s3 - 3 * s2 + 1, s3 - 2 * s2 + s
+    h01, h11 = -2 * s3 + 3 * s2, s3 - s2
+    fitted = (h00 * values[rows, p] + h10 * safe_h * out_slopes[rows, p]
+              + h01 * values[rows, n] + h11 * safe_h * in_slopes[rows, n])
+    return fitted, p
+
+
+def fit_keys(times, values, tolerance, slopes=None, subdiv=0):
+    """
+    Подбор минимального набора ключей для группы кривых одинаковой длины.
+    :param times: (C, F) входы ключей, :param values: (C, F), :param tolerance: (C,)
+    :param slopes: (входящие, исходящие) касательные (C, F); None -- конечные разности
+    :param subdiv: промежуточных точек на пролет для сверки (0 -- только в ключах)
+    :return: (mask (C, F) -- оставляемые ключи, (in_slopes, out_slopes), max_error (C,))
+    """
+    times = np.asarray(times, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    tol = np.asarray(tolerance, dtype=np.float64)[:, None]
+    count, frames = values.shape
+    rows = np.arange(count)[:, None]
+
+    if slopes is None:
+        fd = np.gradient(values, axis=1) / np.gradient(times, axis=1)
+        in_slopes = out_slopes = fd
+    else:
+        in_slopes, out_slopes = (np.asarray(s, dtype=np.float64) for s in slopes)
+
+    # Точки сверки: сами ключи + промежуточные точки пролетов на исходной кривой
+    q_times = times
+    q_span = np.broadcast_to(np.minimum(np.arange(frames), frames - 2), (count, frames))
+    q_values = values
+    if subdiv:
+        u = np.arange(1, subdiv + 1) / (subdiv + 1.0)
+        s_times = (times[:, :-1, None] + np.diff(times, axis=1)[:, :, None] * u).reshape(count, -1)
+        s_span = np.broadcast_to(np.repeat(np.arange(frames - 1), subdiv), s_times.shape)
+        full = np.ones((count, frames), dtype=bool)
+        s_values, _ = _hermite(times, values, in_slopes, out_slopes, full, s_times, s_span)
+        q_times = np.concatenate([q_times, s_times], axis=1)
+        q_span = np.concatenate([q_span, s_span], axis=1)
+        q_values = np.concatenate([q_values, s_values], axis=1)
+
+    # Ключ-кандидат для точки -- ближайший конец ее пролета (второй, если ближний уже оставлен)
+    t_lo, t_hi = times[rows, q_span], times[rows, q_span + 1]
+    near = np.where(q_times - t_lo <= t_hi - q_times, q_span, q_span + 1)
+    far = 2 * q_span + 1 - near
+
+    mask = np.zeros((count, frames), dtype=bool)
+    mask[:, 0] = mask[:, -1] = True
+
+    while True:
+        fitted, prev = _hermite(times, values, in_slopes, out_slopes, mask, q_times, q_span)
+        err = np.abs(fitted - q_values)
+        cand = np.where(mask[rows, near], far, near)
+        # Пролет с обоими оставленными концами улучшить нечем (ступенька, весовые касательные)
+        over = (err > tol) & ~mask[rows, cand]
+        if not over.any(): break
+        # В каждом сегменте, где ошибка выше допуска, добавляем ключ у точки худшей ошибки
+        c_idx, q_idx = np.nonzero(over)
+        seg = c_idx * frames + prev[c_idx, q_idx]
+        order = np.lexsort((-err[c_idx, q_idx], seg))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = seg[order][1:] != seg[order][:-1]
+        pick = order[first]
+        mask[c_idx[pick], cand[c_idx[pick], q_idx[pick]]] = True
+
+    return mask, (in_slopes, out_slopes), err.max(axis=1)
+
+
+class CurveReducer:
+    # Допуск по типу канала (в единицах UI: градусы / сантиметры)
+    TOLERANCES = {"rotate": 0.05, "translate": 0.001, "scale": 0.001, "default": 0.001}
+
+    def __init__(self, tolerances=None):
+        self.tolerances = dict(self.TOLERANCES)
+        if tolerances: self.tolerances.update(tolerances)
+
+    def _tolerance(self, curve):
+        dest = cmds.listConnections(curve + ".output", s=False, d=True, p=True) or [""]
+        attr = dest[0].split(".")[-1]
+        for prefix in ("rotate", "translate", "scale"):
+            if attr.startswith(prefix): return self.tolerances[prefix]
+        return self.tolerances["default"]
+
+    def curves_of(self, nodes):
+        curves = cmds.listConnections(nodes, s=True, d=False, type="animCurve") or []
+        return sorted(set(curves))
+
+    def reduce_nodes(self, nodes, ranges=None):
+        return self.reduce_curves(self.curves_of(nodes), ranges)
+
+    @staticmethod
+    def _authored_slopes(curve, scale):
+        """Авторские касательные (in, out) в единицах значения на вход; None -- кривую не трогаем."""
+        if cmds.keyTangent(curve, q=True, weightedTangents=True)[0]: return None
+        if set(cmds.keyTangent(curve, q=True, ott=True)) & {"step", "stepnext"}: return None
+        ia = np.radians(cmds.keyTangent(curve, q=True, ia=True))
+        oa = np.radians(cmds.keyTangent(curve, q=True, oa=True))
+        return np.tan(ia) / scale, np.tan(oa) / scale
+
+    @staticmethod
+    def _segments(inputs, spans):
+        """Отрезки [i0, i1] индексов ключей внутри диапазонов spans (None -- вся кривая)."""
+        if spans is None: return [(0, len(inputs) - 1)]
+        segments = []
+        for s, e in spans:
+            inside = np.nonzero((inputs >= s - 1e-6) & (inputs <= e + 1e-6))[0]
+            if len(inside): segments.append((int(inside[0]), int(inside[-1])))
+        return segments
+
+    def reduce_curves(self, curves, ranges=None):
+        """
+        Прореживает кривые. Отрезки одной длины и одного вида (запеченный/разреженный)
+        обрабатываются одним пакетом. Разреженные отрезки с весовыми или ступенчатыми
+        касательными пропускаются.
+        :param ranges: {кривая: [(старт, конец)]} -- прореживать только ключи в этих диапазонах
+                       (крайние ключи диапазона остаются); None -- кривые целиком
+        :return: {кривая: {"before": N, "after": N, "max_error": float}}
+        """
+        fps = mel.eval("currentTimeUnitToFPS")
+        groups, scales, skipped = {}, {}, 0
+        for c in curves:
+            unitless = cmds.nodeType(c).startswith("animCurveU")
+            inputs = cmds.keyframe(c, q=True, fc=True) if unitless else cmds.keyframe(c, q=True, tc=True)
+            if not inputs or len(inputs) < 3: continue
+            inputs = np.array(inputs)
+            values = np.array(cmds.keyframe(c, q=True, vc=True))
+            # Угол касательной: у временных кривых время в секундах, у SDK -- значение драйвера
+            scale = 1.0 if unitless else fps
+            authored = False  # еще не читали
+            for i0, i1 in self._segments(inputs, None if ranges is None else ranges.get(c, ())):
+                if i1 - i0 < 2: continue
+                baked = not unitless and np.allclose(np.diff(inputs[i0:i1 + 1]), 1.0)
+                if not baked and authored is False: authored = self._authored_slopes(c, scale)
+                if not baked and authored is None:
+                    skipped += 1
+                    continue
+                slopes = None if baked else (authored[0][i0:i1 + 1], authored[1][i0:i1 + 1])
+                groups.setdefault((i1 - i0 + 1, baked), []).append(
+                    (c, i0, inputs[i0:i1 + 1], values[i0:i1 + 1], slopes))
+                scales[c] = scale
+
+        edits, report = {}, {}
+        for (_, baked), items in groups.items():
+            times = np.array([it[2] for it in items])
+            values = np.array([it[3] for it in items])
+            tol = np.array([self._tolerance(it[0]) for it in items])
+            slopes = None if baked else (np.array([it[4][0] for it in items]), np.array([it[4][1] for it in items]))
+            mask, (in_s, out_s), max_err = fit_keys(times, values, tol, slopes, 0 if baked else SUBDIV)
+            for row, (curve, i0, _, _, _) in enumerate(items):
+                edits.setdefault(curve, []).append((i0, mask[row], in_s[row], out_s[row], baked))
+                r = report.setdefault(curve, {"before": 0, "after": 0, "max_error": 0.0})
+                r["before"] += mask.shape[1]
+                r["after"] += int(mask[row].sum())
+                r["max_error"] = max(r["max_error"], float(max_err[row]))
+
+        for curve, segments in edits.items():
+            self._write_curve(curve, scales[curve], segments)
+
+        before = sum(r["before"] for r in report.values())
+        after = sum(r["after"] for r in report.values())
+        print(f"CurveReducer: Кривых: {len(report)} (пропущено: {skipped}), ключей {before} -> {after}.")
+        return report
+
+    def _write_curve(self, curve, scale, segments):
+        """:param segments: [(первый индекс, keep, in_slopes, out_slopes, baked)] по отрезкам кривой"""
+        drop = np.sort(np.concatenate([i0 + np.nonzero(~keep)[0] for i0, keep, _, _, _ in segments]))
+        # Удаляем ключи сериями индексов, начиная с конца (индексы не сдвигаются)
+        if len(drop):
+            runs = np.split(drop, np.nonzero(np.diff(drop) > 1)[0] + 1)
+            for run in reversed(runs):
+                cmds.cutKey(curve, index=(int(run[0]), int(run[-1])), clear=True)
+
+        # Все касательные кривой -- одним вызовом mel.eval вместо команды на каждый ключ
+        script = []
+        for i0, keep, in_slopes, out_slopes, baked in segments:
+            kept = i0 + np.nonzero(keep)[0]
+            ia = np.degrees(np.arctan(in_slopes[keep] * scale))
+            oa = np.degrees(np.arctan(out_slopes[keep] * scale))
+            lock_flag = " -lock 1" if baked else ""
+            for idx, a, b in zip(kept - np.searchsorted(drop, kept), ia, oa):
+                script.append("keyTangent -e -index {} -itt fixed -ott fixed -ia {!r} -oa {!r}{} \"{}\";".format(
+                    int(idx), float(a), float(b), lock_flag, curve))
+        mel.eval("\n".join(script))
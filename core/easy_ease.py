@@ -1,6 +1,15 @@
 # -*- coding: utf-8 -*-
 import maya.cmds as cmds
 import maya.mel as mel
+import numpy as np
+
+from FD_FishTool.core.scene_ops import scene_operation
+from FD_FishTool.core import skin_weights
+from FD_FishTool.core.weight_store import WeightSnapshot
+from FD_FishTool.core.component_set import ComponentSet
+
+# Доля смещения по слоям от стыка
+MULTIPLIERS = [1.0, 0.5, 0.25, 0.1, 0.05, 0.02, 0.01]
 
 class EasyEaseEngine:
     def __init__(self, rig_manager):
@@ -8,6 +17,7 @@ class EasyEaseEngine:
         self.active_data = None
         self.ease_depth = 4 
 
+    @scene_operation("Easy Ease: Start", undo=False, suspend_undo=True)
     def start_ease_blend(self, mesh_name, depth):
         """Восстановленная рабочая логика поиска слоев."""
         self.ease_depth = depth
@@ -28,31 +38,37 @@ class EasyEaseEngine:
             return False
 
         # 2. Построение слоев (топологические лупы)
+        topo = self.mgr.get_topology(isl1.mesh)
         layers = []
-        processed = set(isl1)
+        processed = isl1
         # Находим стык
-        current_frontier = {v for v in isl1 if self.mgr.get_vtx_neighbors([v]) & isl2}
+        current_frontier = topo.touching(isl1, isl2)
         
         for i in range(self.ease_depth):
-            next_layer = (self.mgr.get_vtx_neighbors(list(current_frontier)) - processed) & isl2
+            next_layer = (topo.grow(current_frontier) - processed) & isl2
             if not next_layer: break
-            layers.append(list(next_layer))
-            processed.update(next_layer)
+            layers.append(next_layer)
+            processed = processed | next_layer
             current_frontier = next_layer
 
-        all_vtxs = [v for layer in layers for v in layer]
-        if not all_vtxs: return False
+        if not layers: return False
+        # Слои не пересекаются; порядок индексов -- по слоям (под множители)
+        indices = np.concatenate([layer.indices for layer in layers])
+        all_vtxs = ComponentSet(isl1.mesh, indices)
 
         # 3. Изоляция в стиле Twin Machine (с фиксом пропадания меша)
         active_panel = cmds.getPanel(withFocus=True)
         if "modelPanel" in active_panel:
             cmds.isolateSelect(active_panel, state=True)
             cmds.isolateSelect(active_panel, addSelectedObjects=mesh_name) 
-            cmds.select(all_vtxs, r=True)
+            all_vtxs.select()
             cmds.isolateSelect(active_panel, addSelected=True)
         
-        # 4. Визуализация и Snapshot
-        snapshot = {v: cmds.skinPercent(sc, v, q=True, v=True, transform=bn2) for v in all_vtxs}
+        # 4. Визуализация и слепок весов облака одним чтением
+        before = WeightSnapshot.capture(sc, indices, mesh_name)
+        column = {n.split('|')[-1]: i for i, n in enumerate(before.influences)}
+        mult = np.concatenate([np.full(len(layer), MULTIPLIERS[i] if i < len(MULTIPLIERS) else 0.001)
+                               for i, layer in enumerate(layers)])
         shape = cmds.listRelatives(mesh_name, s=True)[0]
         cmds.setAttr(f"{shape}.displayColors", 1)
         cmds.polyOptions(colorShadedDisplay=True)
@@ -65,35 +81,41 @@ class EasyEaseEngine:
         print(f"  > Cloud: {len(all_vtxs)} vertices in {len(layers)} layers.")
 
         self.active_data = {
-            "sc": sc, "bn1": bn1, "bn2": bn2, "layers": layers, 
-            "snapshot": snapshot, "panel": active_panel, "vtxs": all_vtxs
+            "sc": sc, "mesh": mesh_name, "bn1": bn1, "bn2": bn2, "layers": layers,
+            "c1": column[bn1.split('|')[-1]], "c2": column[bn2.split('|')[-1]],
+            "indices": indices, "mult": mult, "before": before,
+            "locked": skin_weights.get_locked(before.influences), "panel": active_panel, "vtxs": all_vtxs
         }
         return True
 
+    @scene_operation("Easy Ease: Blend", undo=False, suspend_undo=True, suspend_refresh=False, log=False)
     def update_ease_live(self, offset):
         if not self.active_data: return
         d = self.active_data
-        multipliers = [1.0, 0.5, 0.25, 0.1, 0.05, 0.02, 0.01]
-        
-        for i, layer in enumerate(d["layers"]):
-            mult = multipliers[i] if i < len(multipliers) else 0.001
-            for v in layer:
-                orig_w2 = d["snapshot"][v]
-                new_w2 = max(0.0, min(1.0, orig_w2 + (offset * mult)))
-                cmds.skinPercent(d["sc"], v, tv=[(d["bn2"], new_w2)], nrm=True)
-                
-                if offset >= 0: # Blue shift
-                    cmds.polyColorPerVertex(v, rgb=(0.0, 0.1, new_w2 * mult))
-                else: # Red shift
-                    w1 = 1.0 - new_w2
-                    cmds.polyColorPerVertex(v, rgb=(w1 * mult, 0.1, 0.0))
+        mult = d["mult"]
+        rows = d["before"].weights.astype(np.float64)
+        rows = skin_weights.set_influence_weight(rows, d["c2"], rows[:, d["c2"]] + offset * mult,
+                                                 fallback=d["c1"], locked=d["locked"])
+        skin_weights.write_weights(d["sc"], rows, d["indices"])
+
+        zeros, green = np.zeros_like(mult), np.full_like(mult, 0.1)
+        if offset >= 0: # Blue shift
+            rgb = np.stack([zeros, green, rows[:, d["c2"]] * mult], axis=1)
+        else: # Red shift
+            rgb = np.stack([(1.0 - rows[:, d["c2"]]) * mult, green, zeros], axis=1)
+        skin_weights.set_vertex_colors(d["mesh"], d["indices"], rgb)
 
+    @scene_operation("Easy Ease: Stop", undo=False, suspend_undo=True)
     def stop_ease_blend(self):
+        """Весь drag мимо undo Maya -- одна запись истории весов (слепки старта и отпускания)."""
         if not self.active_data: return
         d = self.active_data
+        after = WeightSnapshot.capture(d["sc"], d["indices"], d["mesh"])
+        if not np.array_equal(after.weights, d["before"].weights):
+            self.mgr.weight_history.push("Easy Ease", d["before"], after)
         if "modelPanel" in d["panel"]:
             cmds.isolateSelect(d["panel"], state=False)
         mel.eval('polyOptions -sizeVertex 3')
-        cmds.polyColorPerVertex(d["vtxs"], remove=True)
-        print("FD_FishTool: EASY EASE COMPLETE.\n" + "="*50)
+        cmds.polyColorPerVertex(d["vtxs"].to_components(), remove=True)
+        print("FD_FishTool: EASY EASE COMPLETE (отмена -- Weights Undo, Ctrl+Z Maya не откатывает веса).\n" + "="*50)
         self.active_data = None
\ No newline at end of file
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Предпросмотр весов в формате движка: максимум 4 инфлюенса на вершину, 8 бит на вес (сумма 255).
+Ошибка квантования -- разница linear blend skinning с весами Maya и с весами движка
+на кадрах клипов из animation.txt. Кадры считаются пачками einsum (память -- на пачку,
+а не на все кадры): сначала смешиваются матрицы (разность весов x матрицы скиннинга),
+потом на них умножаются точки; максимум по кадрам копится между пачками.
+"""
+import os
+import numpy as np
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+import maya.api.OpenMayaAnim as oma
+
+from FD_FishTool.core.scene_ops import scene_operation
+from FD_FishTool.core import skin_weights
+from FD_FishTool.core.matrix_utils import get_world_matrices
+
+ENGINE_INFLUENCES = 4
+ENGINE_BITS = 8
+# Элементов в промежуточном массиве (кадры x вершины x 16) на одну пачку кадров (~32 МБ)
+CHUNK_ELEMENTS = 1 << 22
+
+
+def quantize_weights(weights, max_influences=ENGINE_INFLUENCES, bits=ENGINE_BITS):
+    """Веса как в движке: top-N инфлюенсов, целые доли (2^bits - 1), метод наибольших остатков."""
+    weights = np.array(weights, dtype=np.float64)
+    if weights.shape[1] > max_influences:
+        drop = np.argpartition(weights, -max_influences, axis=1)[:, :-max_influences]
+        np.put_along_axis(weights, drop, 0.0, axis=1)
+    weights = skin_weights.normalize_rows(weights)
+    scale = (1 << bits) - 1
+    q = weights * scale
+    base = np.floor(q)
+    total = weights.sum(axis=1) > 0
+    rest = np.where(total, scale - base.sum(axis=1), 0).astype(np.int64)
+    # Недостающие единицы -- инфлюенсам с наибольшей дробной частью
+    rank = np.argsort(np.argsort(-(q - base), axis=1, kind="stable"), axis=1)
+    base += rank < rest[:, None]
+    return base / scale
+
+
+def parse_clips(path):
+    """animation.txt: 'старт конец имя' -> {имя: (старт, конец)}."""
+    clips = {}
+    if not path or not os.path.exists(path): return clips
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3: clips[parts[2]] = (float(parts[0]), float(parts[1]))
+    return clips
+
+
+def sample_frames(clips, per_clip=5):
+    """Равномерные кадры по каждому клипу (включая границы), без повторов."""
+    frames = [np.linspace(a, b, per_clip) for a, b in clips.values()]
+    return np.unique(np.round(np.concatenate(frames))) if frames else np.zeros(0)
+
+
+def skin_matrices(skin, influences, frames):
+    """Матрицы скиннинга bindPreMatrix * worldMatrix (F, J, 4, 4) -- один проход API на кадр."""
+    sel = om.MSelectionList(); sel.add(skin)
+    fn = oma.MFnSkinCluster(sel.getDependNode(0))
+    paths = fn.influenceObjects()
+    bind = np.array([cmds.getAttr("{}.bindPreMatrix[{}]".format(skin, fn.indexForInfluenceObject(p)))
+                     for p in paths], dtype=np.float64).reshape(-1, 4, 4)
+    current = cmds.currentTime(q=True)
+    world = np.empty((len(frames), len(influences), 4, 4))
+    try:
+        for f, frame in enumerate(frames):
+            cmds.currentTime(float(frame), update=True)
+            world[f] = np.array([list(m) for m in get_world_matrices(influences)]).reshape(-1, 4, 4)
+    finally:
+        cmds.currentTime(current, update=True)
+    return np.einsum("jab,fjbc->fjac", bind, world)
+
+
+def deformation_error(points, weights_a, weights_b, matrices):
+    """
+    Максимальное по кадрам смещение вершин между LBS с весами a и b.
+    :param points: (V, 3) точки привязки в мировом пространстве
+    :param matrices: (F, J, 4, 4) матрицы скиннинга (строковые векторы, как в Maya)
+    :return: (V,) максимум, (V,) кадр максимума
+    """
+    delta = np.asarray(weights_a) - np.asarray(weights_b)
+    frames = matrices.shape[0]
+    best = np.zeros(len(points))
+    best_frame = np.zeros(len(points), dtype=np.int64)
+    if not frames: return best, best_frame
+    flat = matrices.reshape(frames, -1, 16)
+    homo = np.concatenate([points, np.ones((len(points), 1))], axis=1)
+    step = max(1, CHUNK_ELEMENTS // max(1, 16 * len(points)))
+    for lo in range(0, frames, step):
+        blended = np.einsum("vj,fjm->fvm", delta, flat[lo:lo + step]).reshape(-1, len(points), 4, 4)
+        dist = np.linalg.norm(np.einsum("vk,fvkc->fvc", homo, blended)[..., :3], axis=2)
+        chunk_max, chunk_arg = dist.max(axis=0), dist.argmax(axis=0)
+        better = chunk_max > best
+        best[better] = chunk_max[better]
+        best_frame[better] = chunk_arg[better] + lo
+    return best, best_frame
+
+
+def heat_colors(values, limit=None):
+    """Синий (0) -> зеленый -> красный (limit)."""
+    limit = limit or (values.max() if len(values) else 0.0) or 1.0
+    t = np.clip(values / limit, 0.0, 1.0)
+    return np.stack([np.clip(2.0 * t - 1.0, 0, 1), 1.0 - np.abs(2.0 * t - 1.0), np.clip(1.0 - 2.0 * t, 0, 1)], axis=1)
+
+
+class EnginePreview:
+    def __init__(self, mesh):
+        self.mesh = mesh
+        self.skin = skin_weights.find_skin_cluster(mesh)
+        if not self.skin:
+            raise RuntimeError("EnginePreview: у {} нет skinCluster".format(mesh))
+        self.weights, self.influences = skin_weights.read_weights(self.skin)
+        self.engine_weights = quantize_weights(self.weights)
+        self.error = None
+
+    @scene_operation("Engine Weights Preview", undo=False)
+    def analyze(self, clips, per_clip=5):
+        """:return: отчет (кадры, максимум/среднее смещения, худшие вершины)"""
+        frames = sample_frames(clips, per_clip)
+        points = skin_weights.get_bind_points(self.mesh)
+        geom = np.array(cmds.getAttr(self.skin + ".geomMatrix"), dtype=np.float64).reshape(4, 4)
+        points = (np.concatenate([points, np.ones((len(points), 1))], axis=1) @ geom)[:, :3]
+        matrices = skin_matrices(self.skin, self.influences, frames)
+        self.error, worst_frame = deformation_error(points, self.weights, self.engine_weights, matrices)
+        worst = np.argsort(-self.error)[:10]
+        return {
+            "frames": len(frames),
+            "vertices": len(self.error),
+            "max": float(self.error.max()) if len(self.error) else 0.0,
+            "mean": float(self.error.mean()) if len(self.error) else 0.0,
+            "pruned": int(((self.weights > 0).sum(axis=1) > ENGINE_INFLUENCES).sum()),
+            "worst": [(int(v), float(self.error[v]), float(frames[worst_frame[v]])) for v in worst],
+        }
+
+    def show_overlay(self, limit=None):
+        """Тепловая карта ошибки цветами вершин."""
+        if self.error is None: return
+        shape = cmds.listRelatives(self.mesh, s=True, ni=True)[0]
+        cmds.setAttr(shape + ".displayColors", 1)
+        cmds.polyOptions(self.mesh, colorShadedDisplay=True)
+        skin_weights.set_vertex_colors(self.mesh, np.arange(len(self.error)), heat_colors(self.error, limit))
+
+    def clear_overlay(self):
+        cmds.polyColorPerVertex(self.mesh, remove=True)
+        shape = cmds.listRelatives(self.mesh, s=True, ni=True)[0]
+        cmds.setAttr(shape + ".displayColors", 0)
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Рецепт лицевого рига: декларативное описание SDK-сети.
+Для каждого контрола (face_rig_config.json), канала драйвера (face_test_anim.json)
+и значения драйвера хранится целевая поза управляемых костей:
+
+    {"version": 1,
+     "controls": {"Jaw": {"tx": {"1": {"mchFcrg_jaw": {"translateX": 0.5, "rotateZ": -12.0}}}}}}
+
+Рецепт снимается с готовой сети и собирается обратно без UI, одной транзакцией.
+"""
+import os
+import json
+import time
+import maya.cmds as cmds
+
+from FD_FishTool.core.sdk_writer import SDKWriter, driven_curves
+from FD_FishTool.core.scene_ops import scene_operation
+
+RECIPE_VERSION = 1
+DRIVER_CHANNELS = ("tx", "ty")
+
+
+def _value_key(value):
+    return "{:g}".format(value)
+
+
+class FaceRecipe:
+    def __init__(self, controls=None):
+        self.controls = controls or {}  # контрол -> канал -> значение драйвера -> кость -> {атрибут: значение}
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r") as f: data = json.load(f)
+        if data.get("version") != RECIPE_VERSION:
+            raise ValueError("Неподдерживаемая версия рецепта: {}".format(data.get("version")))
+        return cls(data.get("controls", {}))
+
+    def save(self, path):
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder): os.makedirs(folder)
+        with open(path, "w") as f:
+            json.dump({"version": RECIPE_VERSION, "controls": self.controls}, f, indent=2, sort_keys=True)
+
+    @classmethod
+    def capture(cls, config, anim_data=None):
+        """
+        Снимает рецепт с SDK-сети сцены.
+        :param config: face_rig_config.json -- список контролов
+        :param anim_data: face_test_anim.json -- каналы драйверов (по умолчанию tx и ty)
+        """
+        anim_data = anim_data or {}
+        controls = {}
+        for ctrl in config:
+            if not cmds.objExists(ctrl): continue
+            channels = [ch for ch in DRIVER_CHANNELS if ch in anim_data.get(ctrl, {})] or DRIVER_CHANNELS
+            for ch in channels:
+                for plug, curve in driven_curves("{}.{}".format(ctrl, ch)).items():
+                    node, attr = plug.split(".", 1)
+                    inputs = cmds.keyframe(curve, q=True, fc=True) or []
+                    values = cmds.keyframe(curve, q=True, vc=True) or []
+                    poses = controls.setdefault(ctrl, {}).setdefault(ch, {})
+                    for dv, v in zip(inputs, values):
+                        poses.setdefault(_value_key(dv), {}).setdefault(node, {})[attr] = v
+        return cls(controls)
+
+    @scene_operation("Face: Compile Recipe")
+    def compile(self, replace=True, log=print):
+        """
+        Сборка SDK-сети по рецепту.
+        :param replace: удалить существующие кривые контрола на костях рецепта перед записью
+        :return: {контрол: {"curves", "keys", "missing", "time"}}
+        """
+        report = {}
+        writer = SDKWriter()
+        for ctrl, channels in self.controls.items():
+            start = time.perf_counter()
+            if not cmds.objExists(ctrl):
+                log("Recipe: контрол {} не найден, пропуск.".format(ctrl))
+                continue
+
+            missing = set()
+            for ch, poses in channels.items():
+                driver = "{}.{}".format(ctrl, ch)
+                joints = {j for pose in poses.values() for j in pose}
+                existing = set(cmds.ls(list(joints)) or []) if joints else set()
+                missing |= joints - existing
+                if replace:
+                    stale = [c for p, c in driven_curves(driver).items() if p.split(".", 1)[0] in existing]
+                    if stale: cmds.delete(stale)
+                for dv, pose in poses.items():
+                    for joint, attrs in pose.items():
+                        if joint not in existing: continue
+                        for attr, value in attrs.items():
+                            writer.add(driver, float(dv), "{}.{}".format(joint, attr), value)
+
+            curves, keys = writer.flush()
+            elapsed = time.perf_counter() - start
+            report[ctrl] = {"curves": curves, "keys": keys, "missing": sorted(missing), "time": elapsed}
+            log("Recipe: {} -- {} keys / {} curves, {:.3f} c{}".format(
+                ctrl, keys, curves, elapsed, ", нет костей: {}".format(len(missing)) if missing else ""))
+        return report
@@ -2,17 +2,33 @@
 import maya.cmds as cmds
 import maya.api.OpenMaya as om
 import os
+import re
 import json
+import fnmatch
+
+from FD_FishTool.core.curve_reducer import CurveReducer
+from FD_FishTool.core import matrix_utils
+from FD_FishTool.core.pose_snapshot import PoseSnapshot
+from FD_FishTool.core.scene_ops import scene_operation
+from FD_FishTool.core.sdk_writer import SDKWriter
+from FD_FishTool.core.face_recipe import FaceRecipe
+from FD_FishTool.core.symmetry_map import get_symmetry_map, mirror_name
 
 class FaceRigBuilder(object):
     def __init__(self):
         self.config_dir = os.path.join(cmds.internalVar(usd=True), "FD_FishTool", "data")
         self.config_path = os.path.join(self.config_dir, "face_rig_config.json")
         self.anim_path = os.path.join(self.config_dir, "face_test_anim.json")
+        self.recipe_path = os.path.join(self.config_dir, "face_rig_recipe.json")
         self.test_ctrls = ["R_Lwr_EyeLid", "L_Lwr_EyeLid", "L_Upp_EyeLid", "R_Upp_EyeLid", 
                    "Emote", "Sync", "Jaw", "gui_teeth", "Lwr_Lip", "Upr_Lip",
                    "R_Brow_ctrl", "L_Brow_ctrl", "R_Eye_ctrl", "L_Eye_ctrl"]
         self.ai_log = None
+        self.sdk = SDKWriter()
+        self._json_cache = {}     # путь -> (mtime, данные)
+        self._patterns = {}       # glob -> скомпилированный regex
+        self._joints = ()         # последний список костей сцены
+        self._bones_cache = {}    # (контрол, квадрант) -> кости; сбрасывается при смене костей/конфига
 
         self.mirror_map = {
             "Emote": {"pos_y": "pos_x", "pos_x": "pos_y", "neg_x": "neg_y", "neg_y": "neg_x"},
@@ -30,9 +46,44 @@ class FaceRigBuilder(object):
             with open(path, 'r') as f: return json.load(f)
         return {}
 
+    def load_cached_json(self, path):
+        """JSON с кэшем по mtime файла. Данные общие -- не изменять."""
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            self._json_cache.pop(path, None)
+            return {}
+        cached = self._json_cache.get(path)
+        if cached and cached[0] == mtime: return cached[1]
+        data = self.load_json(path)
+        self._json_cache[path] = (mtime, data)
+        if path == self.config_path: self._bones_cache = {}
+        return data
+
+    def get_config(self):
+        return self.load_cached_json(self.config_path)
+
+    def _scene_joints(self):
+        """Один запрос списка костей; кэш костей контролов сбрасывается, если набор изменился."""
+        joints = tuple(cmds.ls(type="joint") or [])
+        if joints != self._joints:
+            self._joints = joints
+            self._bones_cache = {}
+        return joints
+
+    def _match_pattern(self, pattern):
+        rx = self._patterns.get(pattern)
+        if rx is None:
+            rx = self._patterns[pattern] = re.compile(fnmatch.translate(pattern))
+        return rx
+
     def get_driven_bones(self, ctrl_name, quadrant=None):
-        config = self.load_json(self.config_path)
+        config = self.get_config()
         if ctrl_name not in config: return []
+        joints = self._scene_joints()
+        key = (ctrl_name, quadrant)
+        if key in self._bones_cache: return list(self._bones_cache[key])
+
         patterns = []
         node_cfg = config[ctrl_name]
         if quadrant:
@@ -42,11 +93,15 @@ class FaceRigBuilder(object):
         else:
             for q in ["pos_y", "neg_y", "pos_x", "neg_x"]:
                 patterns.extend(node_cfg.get(q, []))
-        actual = []
+        # Все шаблоны разрешаются по одному списку костей
+        short_names = [(j, j.rsplit("|", 1)[-1]) for j in joints]
+        actual = set()
         for p in patterns:
-            found = cmds.ls(p, type="joint") if "*" in p else ([p] if cmds.objExists(p) else [])
-            actual.extend(found)
-        return sorted(list(set(actual)))
+            rx = self._match_pattern(p)
+            actual.update(j for j, short in short_names if rx.match(short))
+        result = sorted(actual)
+        self._bones_cache[key] = tuple(result)
+        return result
 
     def _get_sdk_curve(self, driven_attr, driver_attr):
         curves = cmds.listConnections(driven_attr, s=True, d=False, type='animCurve') or []
@@ -55,18 +110,6 @@ class FaceRigBuilder(object):
             if driver_attr in inputs: return c
         return None
 
-    def _create_proxies(self, nodes, prefix="proxy_"):
-        proxies = []
-        for n in nodes:
-            loc = cmds.spaceLocator(name=prefix + n)[0]
-            cmds.xform(loc, matrix=cmds.xform(n, q=True, matrix=True, ws=True), ws=True)
-            proxies.append(loc)
-        return proxies
-
-    def _snap_to(self, nodes, targets):
-        for n, t in zip(nodes, targets):
-            cmds.xform(n, matrix=cmds.xform(t, q=True, matrix=True, ws=True), ws=True)
-
     def _hard_reset_driven_bones(self, nodes):
         attrs = ['tx','ty','tz','rx','ry','rz']
         for n in nodes:
@@ -76,10 +119,13 @@ class FaceRigBuilder(object):
                     cmds.setAttr(full_at, 0)
 
     # --- МАРШРУТИЗАЦИЯ KEY ---
+    @scene_operation("Face: Smart Key")
     def set_smart_key(self, driver_obj, driven_nodes_from_ui):
-        config = self.load_json(self.config_path)
+        config = self.get_config()
         if driver_obj not in config: return
         
+        # Ключи копятся в self.sdk и пишутся одним пакетом в конце
+        self.sdk.clear()
         if driver_obj == "Jaw":
             self._process_jaw_sdk(driver_obj, driven_nodes_from_ui)
         elif driver_obj == "gui_teeth":
@@ -88,6 +134,8 @@ class FaceRigBuilder(object):
             self._process_linear_sdk(driver_obj, driven_nodes_from_ui)
         else:
             self._process_quadrant_sdk(driver_obj, config[driver_obj])
+        curves, keys = self.sdk.flush()
+        self._log("SDK written: {} keys on {} curves.".format(keys, curves))
 
     # --- ИСПРАВЛЕННЫЙ МЕТОД ДЛЯ JAW (Cross-Mirroring) ---
     # --- ГИБРИДНЫЙ МЕТОД ДЛЯ JAW (Self + Cross Mirroring) ---
@@ -96,31 +144,24 @@ class FaceRigBuilder(object):
         drv_at = driver_obj + ".tx"
         
         # 1. Захват данных из позы при TX = 1.0 (в словарь Python)
-        captured_data = {}
-        for n in driven_nodes:
-            captured_data[n] = {
-                'tx': cmds.getAttr(n + ".tx"), 'ty': cmds.getAttr(n + ".ty"), 'tz': cmds.getAttr(n + ".tz"),
-                'rx': cmds.getAttr(n + ".rx"), 'ry': cmds.getAttr(n + ".ry"), 'rz': cmds.getAttr(n + ".rz")
-            }
+        pose = PoseSnapshot(driven_nodes)
+        captured_data = pose.local
         
         # 2. Нейтраль (TX = 0)
         cmds.setAttr(drv_at, 0)
         self._hard_reset_driven_bones(driven_nodes)
-        for n in driven_nodes: 
-            self._key_6(drv_at, 0.0, n)
+        self.sdk.key_pose(drv_at, 0.0, driven_nodes)
         
         # 3. Установка ключей для TX = 1.0
         cmds.setAttr(drv_at, 1.0)
-        for n in driven_nodes:
-            d = captured_data[n]
-            for a in ['tx','ty','tz','rx','ry','rz']:
-                cmds.setAttr(n + "." + a, d[a])
-            self._key_6(drv_at, 1.0, n)
+        pose.restore()
+        self.sdk.key_pose(drv_at, 1.0, driven_nodes)
             
         # 4. ЗЕРКАЛО ДЛЯ TX = -1.0
         cmds.setAttr(drv_at, -1.0)
         # Очищаем сцену перед распределением зеркальной позы
         self._hard_reset_driven_bones(driven_nodes)
+        sym = get_symmetry_map()
         
         for n in driven_nodes:
             # Проверка: центральная кость или парная?
@@ -138,11 +179,7 @@ class FaceRigBuilder(object):
                 cmds.setAttr(n + ".rz", -d['rz'])
             else:
                 # ЛОГИКА ДЛЯ ПАРНЫХ (Перенос на партнера)
-                m_node = n
-                if "right" in n: m_node = n.replace("right", "left")
-                elif "left" in n: m_node = n.replace("left", "right")
-                elif "R_" in n: m_node = n.replace("R_", "L_")
-                elif "L_" in n: m_node = n.replace("L_", "R_")
+                m_node = sym.partner(n) or n
                 
                 if cmds.objExists(m_node):
                     # По вашему примеру: T инвертируется по всем осям, R сохраняет знаки
@@ -154,8 +191,7 @@ class FaceRigBuilder(object):
                     cmds.setAttr(m_node + ".rz", d['rz'])
 
         # Фиксируем ключи для положения -1.0 для всех костей
-        for n in driven_nodes:
-            self._key_6(drv_at, -1.0, n)
+        self.sdk.key_pose(drv_at, -1.0, driven_nodes)
             
         # Возвращаем в 1.0 для проверки
         cmds.setAttr(drv_at, 1.0)
@@ -177,27 +213,25 @@ class FaceRigBuilder(object):
         # 2. Логика X (Наклон с инверсией RotateX)
         if abs(tx_val) > 0.001:
             drv_at = driver_obj + ".tx"
-            proxies = self._create_proxies(driven_nodes, "tmp_teeth_")
+            pose = PoseSnapshot(driven_nodes)
             
             # Фундамент 0 (Стерильный сброс)
             cmds.setAttr(drv_at, 0)
             self._hard_reset_driven_bones(driven_nodes)
-            for n in driven_nodes: self._key_6(drv_at, 0.0, n)
+            self.sdk.key_pose(drv_at, 0.0, driven_nodes)
             
             # Рабочий ключ TX = 1.0 (Поза вперед)
             cmds.setAttr(drv_at, 1.0)
-            self._snap_to(driven_nodes, proxies)
-            for n in driven_nodes: self._key_6(drv_at, 1.0, n)
+            pose.restore()
+            self.sdk.key_pose(drv_at, 1.0, driven_nodes)
             
             # Авто-инверсия для TX = -1.0 (Наклон назад)
             cmds.setAttr(drv_at, -1.0)
-            self._snap_to(driven_nodes, proxies) # Сначала возвращаем позу
-            for n in driven_nodes:
-                rx_val = cmds.getAttr(n + ".rx")
-                cmds.setAttr(n + ".rx", rx_val * -1) # Инвертируем наклон
-                self._key_6(drv_at, -1.0, n)
+            pose.restore() # Сначала возвращаем позу
+            for n in pose.nodes:
+                cmds.setAttr(n + ".rx", -pose.local[n]["rx"]) # Инвертируем наклон
+            self.sdk.key_pose(drv_at, -1.0, driven_nodes)
                 
-            cmds.delete(proxies)
             # Возвращаем контроллер в текущее положение пользователя
             cmds.setAttr(drv_at, tx_val)
             self._log("TEETH X-Inversion Processed.")
@@ -207,7 +241,7 @@ class FaceRigBuilder(object):
     def _process_linear_sdk(self, driver_obj, driven_nodes):
         self._log("Linear SDK: Starting sterile process for {}...".format(driver_obj))
         curr_frame = int(cmds.currentTime(q=True))
-        anim_data = self.load_json(self.anim_path)
+        anim_data = self.load_cached_json(self.anim_path)
         
         # 1. РАЗДЕЛЕНИЕ СТОРОН
         is_shared = driver_obj in ["Sync", "Jaw", "gui_teeth"]
@@ -219,7 +253,7 @@ class FaceRigBuilder(object):
         saved_vals = {ch: cmds.getAttr(driver_obj + "." + ch) for ch in channels}
 
         # --- ШАГ 1: ЗАХВАТ ПРАВОЙ ПОЗЫ ---
-        r_proxies = self._create_proxies(right_and_cent, "tmp_R_")
+        r_pose = PoseSnapshot(right_and_cent)
 
         # --- ШАГ 2: СТЕРИЛЬНЫЙ 0-ФУНДАМЕНТ (ПРАВО) ---
         for ch in channels: cmds.setAttr(driver_obj + "." + ch, 0)
@@ -227,6 +261,7 @@ class FaceRigBuilder(object):
 
         for chan in channels:
             drv_at = "{}.{}".format(driver_obj, chan)
+            unkeyed = []
             for n in right_and_cent:
                 curve = self._get_sdk_curve(n + ".tx", drv_at)
                 has_zero = False
@@ -234,12 +269,12 @@ class FaceRigBuilder(object):
                     keys = cmds.keyframe(curve, q=True, fc=True) or []
                     if any(abs(k - 0.0) < 0.001 for k in keys): has_zero = True
                 
-                if not has_zero:
-                    self._key_6(drv_at, 0.0, n)
+                if not has_zero: unkeyed.append(n)
+            self.sdk.key_pose(drv_at, 0.0, unkeyed)
 
         # --- ШАГ 3: УСТАНОВКА РАБОЧИХ КЛЮЧЕЙ (ПРАВО) ---
         for ch, val in saved_vals.items(): cmds.setAttr(driver_obj + "." + ch, val)
-        self._snap_to(right_and_cent, r_proxies)
+        r_pose.restore()
         
         f_idx = None
         try: f_idx = anim_data[driver_obj]["frames"].index(curr_frame)
@@ -250,14 +285,11 @@ class FaceRigBuilder(object):
             target_v = anim_data[driver_obj][chan][f_idx] if f_idx is not None else saved_vals[chan]
             
             if abs(target_v) > 0.001:
-                for n in right_and_cent: self._key_6(drv_at, target_v, n)
+                self.sdk.key_pose(drv_at, target_v, right_and_cent)
 
         # --- ШАГ 4: ЗЕРКАЛИРОВАНИЕ (ЛЕВО) ---
-        m_ctrl = driver_obj
-        if "R_" in driver_obj: m_ctrl = driver_obj.replace("R_", "L_")
-        elif "L_" in driver_obj: m_ctrl = driver_obj.replace("L_", "R_")
-        elif "right" in driver_obj: m_ctrl = driver_obj.replace("right", "left")
-        elif "left" in driver_obj: m_ctrl = driver_obj.replace("left", "right")
+        sym = get_symmetry_map()
+        m_ctrl = sym.partner(driver_obj) or driver_obj
 
         if m_ctrl != driver_obj and cmds.objExists(m_ctrl) or is_shared:
             target_driver = driver_obj if is_shared else m_ctrl
@@ -268,14 +300,12 @@ class FaceRigBuilder(object):
             # Поиск левых костей для не-shared контролов
             if not left_only:
                 for b in right_and_cent:
-                    new_b = b
-                    if "right" in b: new_b = b.replace("right", "left")
-                    elif "left" in b: new_b = b.replace("left", "right")
-                    if new_b != b and cmds.objExists(new_b):
+                    new_b = sym.partner(b)
+                    if new_b and new_b != b and cmds.objExists(new_b):
                         left_only.append(new_b)
             
             if left_only:
-                l_prox = self._create_proxies(left_only, "tmp_L_")
+                l_pose = PoseSnapshot(left_only)
                 
                 # Б. Чистый фундамент для левой стороны
                 for ch in channels: 
@@ -286,7 +316,7 @@ class FaceRigBuilder(object):
                 
                 for chan in channels:
                     l_drv_at = "{}.{}".format(target_driver, chan)
-                    for ln in left_only: self._key_6(l_drv_at, 0.0, ln)
+                    self.sdk.key_pose(l_drv_at, 0.0, left_only)
                 
                 # В. Рабочая зеркальная поза
                 for chan in channels:
@@ -297,18 +327,16 @@ class FaceRigBuilder(object):
                     if abs(l_target_v) > 0.001:
                         cmds.setAttr(l_drv_at, l_target_v)
 
-                self._snap_to(left_only, l_prox)
+                l_pose.restore()
                 
                 for chan in channels:
                     l_drv_at = "{}.{}".format(target_driver, chan)
                     l_target_v = saved_vals[chan]
                     
                     if abs(l_target_v) > 0.001:
-                        for ln in left_only: self._key_6(l_drv_at, l_target_v, ln)
+                        self.sdk.key_pose(l_drv_at, l_target_v, left_only)
                 
-                cmds.delete(l_prox)
 
-        cmds.delete(r_proxies)
         self._log("Linear Process Complete: {}".format(driver_obj))
 
     # --- КВАДРАНТНАЯ ЛОГИКА (EMOTE / LIPS) --- (БЕЗ ИЗМЕНЕНИЙ)
@@ -327,40 +355,68 @@ class FaceRigBuilder(object):
                 if partner == active_q: src_q = q; break
 
         r_bones = self.get_driven_bones(driver_obj, src_q)
-        r_prox = self._create_proxies(r_bones, "tmp_quad_R_")
+        r_pose = PoseSnapshot(r_bones)
 
         all_bones = self.get_driven_bones(driver_obj)
         for chan in ["tx", "ty"]:
             drv_at = "{}.{}".format(driver_obj, chan)
             old_v = cmds.getAttr(drv_at); cmds.setAttr(drv_at, 0)
             self._hard_reset_driven_bones(all_bones)
-            for n in all_bones: self._key_6(drv_at, 0.0, n)
+            self.sdk.key_pose(drv_at, 0.0, all_bones)
             cmds.setAttr(drv_at, old_v)
 
         src_chan = "ty" if "y" in src_q else "tx"
         src_val = 1.5 if "pos" in src_q else -1.5 
         drv_at = "{}.{}".format(driver_obj, src_chan)
-        self._snap_to(r_bones, r_prox)
-        for n in r_bones: self._key_6(drv_at, src_val, n)
+        r_pose.restore()
+        self.sdk.key_pose(drv_at, src_val, r_bones)
 
         mirror_q = self.mirror_map.get(driver_obj, {}).get(src_q)
         if mirror_q:
             self.mirror_drivens_logic(r_bones)
-            l_bones = [b.replace("right", "left") if "right" in b else b for b in r_bones]
+            sym = get_symmetry_map()
+            l_bones = [sym.partner(b) or b for b in r_bones]
             l_bones = [b for b in l_bones if cmds.objExists(b)]
-            l_prox = self._create_proxies(l_bones, "tmp_quad_L_")
+            l_pose = PoseSnapshot(l_bones)
             m_chan = "ty" if "y" in mirror_q else "tx"
             m_drv_at = "{}.{}".format(driver_obj, m_chan)
             m_val = 1.5 if "pos" in mirror_q else -1.5
-            self._snap_to(l_bones, l_prox)
-            for ln in l_bones: self._key_6(m_drv_at, m_val, ln)
-            cmds.delete(l_prox)
-        cmds.delete(r_prox)
-
-    # --- ВСЕ ОСТАЛЬНЫЕ МЕТОДЫ (key_6, mirror_logic, ui_tools) --- (БЕЗ ИЗМЕНЕНИЙ)
-    def _key_6(self, drv_at, drv_val, node):
-        for a in ['tx','ty','tz','rx','ry','rz']:
-            cmds.setDrivenKeyframe("{}.{}".format(node, a), cd=drv_at, dv=drv_val, v=cmds.getAttr("{}.{}".format(node, a)))
+            l_pose.restore()
+            self.sdk.key_pose(m_drv_at, m_val, l_bones)
+
+    # --- ВСЕ ОСТАЛЬНЫЕ МЕТОДЫ (mirror_logic, ui_tools) --- (БЕЗ ИЗМЕНЕНИЙ)
+    @scene_operation("Face: Reduce SDK Keys")
+    def reduce_sdk_keys(self):
+        """Прореживание SDK-кривых (animCurveU*) на механических костях лица."""
+        bones = cmds.ls("mchFcrg_*", type="joint") or []
+        if not bones: return {}
+        reducer = CurveReducer()
+        curves = [c for c in reducer.curves_of(bones) if cmds.nodeType(c).startswith("animCurveU")]
+        report = reducer.reduce_curves(curves)
+        before = sum(r["before"] for r in report.values())
+        after = sum(r["after"] for r in report.values())
+        self._log("SDK keys reduced: {} -> {} ({} curves)".format(before, after, len(report)))
+        return report
+
+    def save_recipe(self, path=None):
+        """Снимает рецепт с текущей SDK-сети лица."""
+        path = path or self.recipe_path
+        recipe = FaceRecipe.capture(self.get_config(), self.load_cached_json(self.anim_path))
+        recipe.save(path)
+        self._log("Recipe saved: {} controls -> {}".format(len(recipe.controls), path))
+        return recipe
+
+    def build_from_recipe(self, path=None, replace=True):
+        """Сборка всей SDK-сети лица по рецепту (работает и без UI, в mayapy)."""
+        path = path or self.recipe_path
+        if not os.path.exists(path):
+            self._log("Recipe not found: {}".format(path))
+            return {}
+        report = FaceRecipe.load(path).compile(replace=replace, log=self._log)
+        total = sum(r["time"] for r in report.values())
+        self._log("Recipe built: {} controls, {} keys, {:.2f} c".format(
+            len(report), sum(r["keys"] for r in report.values()), total))
+        return report
 
     def mirror_drivens_logic(self, nodes=None):
         """
@@ -370,13 +426,10 @@ class FaceRigBuilder(object):
         # Если ноды не переданы, ищем по умолчанию все правые
         targets = nodes if nodes else cmds.ls('mchFcrg*right*', type='joint')
         
+        sym = get_symmetry_map()
         for src in targets:
-            # Умный поиск зеркального имени (R_ -> L_, right -> left, _R -> _L)
-            dest = None
-            if "right" in src: dest = src.replace("right", "left")
-            elif "left" in src: dest = src.replace("left", "right")
-            elif "R_" in src: dest = src.replace("R_", "L_")
-            elif "L_" in src: dest = src.replace("L_", "R_")
+            # Партнер из карты симметрии (позиция + правила имен)
+            dest = sym.partner(src)
             
             if dest and dest != src and cmds.objExists(dest):
                 # 1. Зеркалирование транслейта (Мировая симметрия по X)
@@ -390,6 +443,7 @@ class FaceRigBuilder(object):
                 
                 self._log("Pose Mirrored: {} -> {} (Same Signs)".format(src, dest))
 
+    @scene_operation("Face: Test Animation")
     def run_context_test_animation(self):
         self.clean_test_animation()
         sel = cmds.ls(sl=True); data = self.load_json(self.anim_path); to_anim = []
@@ -417,6 +471,7 @@ class FaceRigBuilder(object):
                     if "tx" in d: cmds.setKeyframe(ctrl, at="tx", v=d["tx"][i], t=f)
         cmds.currentTime(1)
 
+    @scene_operation("Face: Clean Test Animation")
     def clean_test_animation(self):
         """Очистка ключей и сброс в ноль."""
         c = [x for x in self.test_ctrls if cmds.objExists(x)]
@@ -451,7 +506,8 @@ class FaceRigBuilder(object):
 
     def mirror_unit(self, source_loc):
         if not cmds.objExists(source_loc) or any(x in source_loc for x in ["cent_", "teeth", "jaw"]): return
-        target = source_loc.replace("right", "left")
+        target = mirror_name(source_loc)
+        if target == source_loc: return
         if cmds.objExists(target): cmds.delete(target)
         new_loc = cmds.duplicate(source_loc, name=target, rc=True)[0]
         cmds.setAttr(new_loc+".tx", -cmds.getAttr(new_loc+".tx")); cmds.setAttr(new_loc+".rx", 180)
@@ -459,6 +515,7 @@ class FaceRigBuilder(object):
         child = cmds.listRelatives(new_loc, children=True, type="joint")
         if child: cmds.rename(child[0], target.replace("locAlign_fcrg_", "mchFcrg_"))
     
+    @scene_operation("Face: Skin Bones")
     def build_and_connect_skin_bones(self):
         """
         Stage 4: Динамическая генерация скин-костей и их привязка к механике.
@@ -493,7 +550,7 @@ class FaceRigBuilder(object):
                 cmds.select(cl=True)
                 skn = cmds.joint(name=skn_name)
                 # Копируем положение
-                cmds.delete(cmds.parentConstraint(mch, skn))
+                matrix_utils.snap([skn], [mch])
                 cmds.makeIdentity(skn, apply=True, t=0, r=1, s=0)
                 cmds.parent(skn, skin_grp)
                 self._log("Создана кость: {}".format(skn_name))
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Замеры времени фаз (старт, вкладки, операции) и подсчет команд maya.cmds внутри них.
+Выключено по умолчанию: phase() сводится к проверке флага, cmds не обернут.
+Команды считает CmdsProfiler на время фазы (вложенные фазы -- свои профилировщики,
+счет включительный). Журнал -- кольцевой буфер последних записей.
+
+    with instrumentation.phase("Config"): ...
+    instrumentation.enable(); ...; instrumentation.dump_json(path)
+"""
+import json
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from FD_FishTool.core.cmds_profiler import CmdsProfiler
+
+HISTORY_SIZE = 500
+# Команда, вызванная за одну фазу больше стольких раз, помечается как горячая (цикл по вершинам)
+HOT_CALLS = 200
+
+_enabled = os.environ.get("FD_FISHTOOL_TIMING", "") == "1"
+_stacks = False  # свернутые стеки для внешних фаз (flame graph)
+_depth = 0
+history = deque(maxlen=HISTORY_SIZE)
+last_profile = None  # CmdsProfiler последней внешней фазы
+
+
+def is_enabled():
+    return _enabled
+
+
+def enable(state=True, stacks=None):
+    global _enabled, _stacks
+    _enabled = state
+    if stacks is not None: _stacks = stacks
+
+
+@contextmanager
+def phase(name, kind="phase"):
+    """Замер фазы и вызовов cmds внутри нее."""
+    global _depth, last_profile
+    if not _enabled:
+        yield
+        return
+    prof = CmdsProfiler(stacks=_stacks and _depth == 0).start()
+    _depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        prof.stop()
+        _depth -= 1
+        record = {"name": name, "kind": kind, "depth": _depth, "time": time.time(), "duration": duration}
+        record.update(prof.as_dict())
+        record["hot"] = [n for n, c, _ in prof.top_commands(None, "calls") if c > HOT_CALLS]
+        history.append(record)
+        if not _depth: last_profile = prof
+
+
+def records(kind=None):
+    return [r for r in history if kind is None or r["kind"] == kind]
+
+
+def clear():
+    history.clear()
+
+
+def dump_json(path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(list(history), f, indent=2)
+    return path
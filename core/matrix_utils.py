@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Работа с мировыми трансформами как с матрицами в памяти.
+Заменяет временные parentConstraint и локаторы: чтение -- пакетно через API
+(без команд на каждый узел), запись -- xform (корректно для jointOrient и попадает в undo).
+"""
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+
+def _dag_paths(nodes):
+    sel = om.MSelectionList()
+    for n in nodes: sel.add(n)
+    return [sel.getDagPath(i) for i in range(len(nodes))]
+
+
+def get_world_matrices(nodes):
+    """Мировые матрицы узлов (om.MMatrix) одним проходом по API."""
+    if not nodes: return []
+    return [path.inclusiveMatrix() for path in _dag_paths(nodes)]
+
+
+def _rest_local(path):
+    """
+    Локальная матрица в позе покоя: анимированные и подключенные каналы t/r/s -- по умолчанию (0 / 1).
+    Узел без ведомых каналов берется как есть; у ведомых пивоты не учитываются.
+    """
+    fn = om.MFnDependencyNode(path.node())
+    plugs = {at: fn.findPlug(at, False) for at in
+             ["{}{}".format(c, a) for c in ("translate", "rotate", "scale") for a in "XYZ"]}
+    if not any(p.isDestination for p in plugs.values()):
+        return om.MFnMatrixData(fn.findPlug("matrix", False).asMObject()).matrix()
+
+    def rest(channel, default):
+        return [default if plugs[channel + a].isDestination else plugs[channel + a].asDouble() for a in "XYZ"]
+
+    def euler(attr, order=om.MEulerRotation.kXYZ):
+        return om.MEulerRotation([fn.findPlug(attr + a, False).asDouble() for a in "XYZ"], order).asMatrix()
+
+    scale = om.MTransformationMatrix()
+    scale.setScale(rest("scale", 1.0), om.MSpace.kTransform)
+    move = om.MTransformationMatrix()
+    move.setTranslation(om.MVector(rest("translate", 0.0)), om.MSpace.kTransform)
+    rotate = om.MEulerRotation(rest("rotate", 0.0), fn.findPlug("rotateOrder", False).asInt()).asMatrix()
+    orient = euler("jointOrient") if path.hasFn(om.MFn.kJoint) else om.MMatrix()
+    return scale.asMatrix() * euler("rotateAxis") * rotate * orient * move.asMatrix()
+
+
+def get_rest_matrices(nodes):
+    """Мировые матрицы узлов в позе покоя (см. _rest_local), не зависят от текущего кадра и позы."""
+    cache = {}
+
+    def world(path):
+        key = path.fullPathName()
+        if key not in cache:
+            parent = om.MDagPath(path)
+            parent.pop()
+            local = _rest_local(path)
+            cache[key] = local * world(parent) if parent.length() else local
+        return cache[key]
+
+    return [world(p) for p in _dag_paths(nodes)] if nodes else []
+
+
+def set_world_matrices(nodes, matrices):
+    """Выставляет узлам мировые матрицы."""
+    for n, m in zip(nodes, matrices):
+        cmds.xform(n, matrix=list(m), ws=True)
+
+
+def _without_scale(matrix):
+    """MTransformationMatrix только с переносом и вращением."""
+    src = om.MTransformationMatrix(matrix)
+    src.setScale([1.0, 1.0, 1.0], om.MSpace.kWorld)
+    src.setShear([0.0, 0.0, 0.0], om.MSpace.kWorld)
+    return src
+
+
+def offset_matrix(matrix, translate=(0, 0, 0), rotate=(0, 0, 0), space="object"):
+    """
+    Смещение матрицы. Результат без масштаба -- как у выравнивания через parentConstraint.
+    :param space: 'object' -- по осям самой матрицы (в мировых единицах),
+                  'world' -- по мировым осям
+    :param rotate: градусы, xyz
+    """
+    src = _without_scale(matrix)
+    offset = om.MTransformationMatrix()
+    offset.setRotation(om.MEulerRotation(*[om.MAngle(v, om.MAngle.kDegrees).asRadians() for v in rotate]))
+
+    if space == "world":
+        pivot = src.translation(om.MSpace.kWorld)
+        src.setTranslation(om.MVector(), om.MSpace.kWorld)
+        result = om.MTransformationMatrix(src.asMatrix() * offset.asMatrix())
+        result.setTranslation(pivot + om.MVector(*translate), om.MSpace.kWorld)
+        return result.asMatrix()
+
+    offset.setTranslation(om.MVector(*translate), om.MSpace.kWorld)
+    return offset.asMatrix() * src.asMatrix()
+
+
+def snap(nodes, targets):
+    """
+    Пакетная привязка: каждому узлу -- мировые перенос и вращение соответствующей цели.
+    Масштаб узла остается своим, масштаб цели не копируется (как у parentConstraint).
+    """
+    result = []
+    for own, target in zip(get_world_matrices(nodes), get_world_matrices(targets)):
+        m = _without_scale(target)
+        m.setScale(om.MTransformationMatrix(own).scale(om.MSpace.kWorld), om.MSpace.kWorld)
+        result.append(m.asMatrix())
+    set_world_matrices(nodes, result)
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 import maya.cmds as cmds
 
+from FD_FishTool.core.scene_ops import scene_operation
+
 class BoneNamePreparing():
     def __init__(self, bone_map):
         self.meta_list = bone_map # Словарь из bone_map.json
@@ -13,6 +15,7 @@ class BoneNamePreparing():
             try: cmds.parent(child, parent_node)
             except: pass
 
+    @scene_operation("Rig/Export Toggle")
     def execute(self):
         self.check_and_rename_bones()
         if self.export_toggle: 
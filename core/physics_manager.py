@@ -1,13 +1,35 @@
 # -*- coding: utf-8 -*-
 import maya.cmds as cmds
+import maya.api.OpenMaya as om
 import os
-import pymel.core as pm
+import numpy as np
 
-try:
-    from springmagic import core as sm_core
-except ImportError:
-    sm_core = None
-    cmds.warning("FD_FishTool: SpringMagic core не найден!")
+from FD_FishTool.core.physics_pool import PhysicsPool
+from FD_FishTool.core.control_index import ControlIndex
+from FD_FishTool.core import matrix_utils
+from FD_FishTool.core.sim_cache import SimCache
+from FD_FishTool.core.spring_solver import euler_to_matrix, solve_chain
+from FD_FishTool.core.anim_curves import write_time_keys, get_input_curve
+from FD_FishTool.core.curve_reducer import CurveReducer
+from FD_FishTool.core.scene_ops import scene_operation
+
+_sm_core = False  # False -- еще не загружен, None -- не найден
+
+# Допуск расхождения решателя пула с SpringMagic (градусы, угол между вращениями контрола)
+PARITY_TOLERANCE = 0.5
+
+
+def _springmagic():
+    """SpringMagic (и тянущий его pymel) грузится при первом расчете, а не при старте окна."""
+    global _sm_core
+    if _sm_core is False:
+        try:
+            from springmagic import core as sm
+        except ImportError:
+            sm = None
+            cmds.warning("FD_FishTool: SpringMagic core не найден!")
+        _sm_core = sm
+    return _sm_core
 
 class PhysicsManager:
     # Золотой набор анимаций для определения границ запекания
@@ -25,6 +47,10 @@ class PhysicsManager:
         paths = self.cfg.load_json("paths.json")
         self.etalon_path = paths.get("animation_data", "")
         self.anim_ranges = self._parse_etalon()
+        self.bind_ranges = {}  # Кортеж прокси-цепи -> диапазоны клипов, для которых она считалась
+        self.index = None  # ControlIndex, строится один раз на прогон пайплайна
+        self.baked_channels = {}  # Плаг запеченного канала -> диапазоны кадров (для прореживания ключей)
+        self.sim_cache = SimCache(os.path.join(cmds.internalVar(uad=True), "FD_FishTool", "sim_cache"))
 
     def _parse_etalon(self):
         """Парсинг эталонного файла animation.txt."""
@@ -41,17 +67,19 @@ class PhysicsManager:
             print(f"PhysicsManager: Ошибка чтения эталона: {e}")
         return ranges
 
+    def get_control_index(self, rebuild=False):
+        """Индекс иерархии контролов (один проход по сцене)."""
+        if rebuild or self.index is None:
+            self.index = ControlIndex()
+        return self.index
+
     def get_symmetric_control(self, ctrl):
         """Определяет симметричную пару для Advanced Skeleton."""
-        if "_R" in ctrl: return ctrl.replace("_R", "_L")
-        if "_L" in ctrl: return ctrl.replace("_L", "_R")
-        return None
+        return self.get_control_index().partner(ctrl)
 
     def get_chain_end(self, root):
         """Ищет кончик цепи (Gimble узел)."""
-        children = cmds.listRelatives(root, ad=True, type="transform", fullPath=True) or []
-        ctrls = [c for c in children if cmds.attributeQuery("Gimble_Visible", node=c, exists=True)]
-        return ctrls[0] if ctrls else (children[0] if children else root)
+        return self.get_control_index().chain_end(root)
 
     def create_aligned_locator(self, target_node):
         """Реализация LAT (Locator Alignment Tool)."""
@@ -61,29 +89,34 @@ class PhysicsManager:
         if cmds.objExists(loc_name): cmds.delete(loc_name)
         
         loc = cmds.spaceLocator(n=loc_name)[0]
-        # Выравнивание через временный констрейнт
-        temp_pc = cmds.parentConstraint(target_node, loc)[0]
-        cmds.delete(temp_pc)
-        
-        # Смещение WD 1.25
-        cmds.move(1.25 * side_mult, 0, 0, loc, r=True, os=True, wd=True)
+        # Выравнивание матрицей + смещение WD 1.25 по X в пространстве объекта
+        target_mtx = matrix_utils.get_world_matrices([target_node])[0]
+        matrix_utils.set_world_matrices([loc], [matrix_utils.offset_matrix(target_mtx, (1.25 * side_mult, 0, 0))])
         return loc
 
-    def process_spring_logic(self, root_ctrl, anim_list, spring_val, twist_val, is_loop):
+    def collect_chain(self, root_ctrl):
+        """Сбор цепи nurbsCurve от корневого контрола вниз до Gimble-кончика."""
+        return self.get_control_index().chain(root_ctrl)
+
+    @scene_operation("Physics: SpringMagic", eval_mode="off")
+    def process_spring_logic(self, root_ctrl, anim_list, spring_val, twist_val, is_loop, use_cache=True):
         """
         Полный цикл физики: LAT -> Bind -> CopyKeys -> Apply.
+        :param use_cache: брать результат из кэша симуляции (False -- всегда считать SpringMagic)
         """
-        end_node = self.get_chain_end(root_ctrl)
+        import pymel.core as pm
+        sm_core = _springmagic()
+        chain, end_node = self.collect_chain(root_ctrl)
+
+        # Ключи кэша считаем до Bind: после него контролы следуют за прокси
+        cache_keys = {}
+        for anim_name in anim_list:
+            if anim_name not in self.anim_ranges: continue
+            start, end = self.anim_ranges[anim_name]
+            motion = self.export_chain_motion(chain, end_node, start, end)
+            cache_keys[anim_name] = self._cache_key("springmagic", chain, motion, spring_val, twist_val, is_loop)
+
         loc = self.create_aligned_locator(end_node)
-        
-        # Сбор цепи nurbsCurve от выделенного контрола вниз
-        chain = [root_ctrl]
-        children = cmds.listRelatives(root_ctrl, ad=True, type="transform", fullPath=True) or []
-        for child in children[::-1]:
-            shapes = cmds.listRelatives(child, shapes=True) or []
-            if any(cmds.nodeType(s) == "nurbsCurve" for s in shapes):
-                chain.append(child)
-                if child == end_node: break
         chain.append(loc)
         
         # Создание прокси
@@ -92,10 +125,12 @@ class PhysicsManager:
         sm_core.bindControls()
         
         proxy_chain = [n.name() + "_SpringProxy" for n in py_chain]
+        ranges = self.bind_ranges.setdefault(tuple(proxy_chain), [])
         
         for anim_name in anim_list:
             if anim_name not in self.anim_ranges: continue
             start, end = self.anim_ranges[anim_name]
+            ranges.append((start, end))
             safe_frame = start - 30 
             
             # Технические кадры и Padding
@@ -108,6 +143,14 @@ class PhysicsManager:
                 else:
                     cmds.setKeyframe(proxy_chain, attribute='rotate')
 
+            # Повторный прогон без изменений: берем результат из кэша
+            cached = self.sim_cache.get(cache_keys[anim_name]) if use_cache else None
+            if cached is not None:
+                for i, proxy in enumerate(proxy_chain):
+                    for axis, at in enumerate(["rx", "ry", "rz"]):
+                        write_time_keys("{}.{}".format(proxy, at), cached["frames"], cached["rotate"][:, i, axis])
+                continue
+
             # Расчет SpringMagic
             cmds.playbackOptions(min=start, max=end, ast=start, aet=end)
             sm_settings = sm_core.Spring(ratio=1.0-spring_val, twistRatio=1.0-twist_val)
@@ -116,23 +159,317 @@ class PhysicsManager:
             sm_objs = [pm.PyNode(p) for p in proxy_chain]
             sm_core.SpringMagicMaya(sm_objs, sm_settings, sm_mgr)
 
+            frames = np.arange(int(start), int(end) + 1, dtype=np.float64)
+            self.sim_cache.put(cache_keys[anim_name], frames=frames,
+                               rotate=self._sample_rotate(proxy_chain, frames))
+
         return proxy_chain
 
-    def final_bake(self, all_proxies):
-        """Запекание в полезном диапазоне 9-189."""
-        if not all_proxies: return
+    def _cache_key(self, solver, chain, motion, spring_val, twist_val, is_loop):
+        """
+        Ключ кэша -- только то, что ведет цепь: мировое движение родителя корня, топология,
+        поза покоя (смещения контролов и промежуточных групп, rotateAxis/jointOrient, кончик)
+        и параметры. Собственные вращения цепи -- результат симуляции, в ключ не входят:
+        иначе запекание меняло бы ключ и повторный прогон на запеченной сцене промахивался.
+        """
+        topology = []
+        for n in chain:
+            parent = cmds.listRelatives(n, p=True, f=True) or [""]
+            topology.append("{}>{}".format(parent[0], n))
+        world, parent = motion["world"], motion["parent"]
+        # Трансляция контрола в пространстве родителя и смещение группы между соседними контролами
+        # не зависят от вращений цепи
+        local_t = (world @ np.linalg.inv(parent))[:, :, 3, :3]
+        groups = parent[:, 1:] @ np.linalg.inv(world[:, :-1])
+        arrays = [motion["frames"], parent[:, 0], local_t, groups, motion["pre"], motion["post"], motion["tip_offset"]]
+        return self.sim_cache.make_key(solver, topology, arrays, spring_val, twist_val, is_loop)
+
+    def _sample_rotate(self, nodes, frames):
+        """Чтение локальных вращений узлов по кадрам через API (без смены currentTime)."""
+        sel = om.MSelectionList()
+        for n in nodes: sel.add(n)
+        plugs = []
+        for i in range(len(nodes)):
+            fn = om.MFnDependencyNode(sel.getDependNode(i))
+            plugs.append([fn.findPlug(at, False) for at in ("rotateX", "rotateY", "rotateZ")])
+
+        rotate = np.empty((len(frames), len(nodes), 3))
+        unit = om.MTime.uiUnit()
+        for fi, f in enumerate(frames):
+            with om.MDGContextGuard(om.MDGContext(om.MTime(f, unit))):
+                for i, node_plugs in enumerate(plugs):
+                    rotate[fi, i] = [p.asMAngle().asDegrees() for p in node_plugs]
+        return rotate
+
+    @scene_operation("Physics: Bake")
+    def final_bake(self, all_proxies, sparse=False, padding=1):
+        """
+        Запекание в полезном диапазоне 9-189.
+        :param sparse: запекать только диапазоны клипов каждой цепи (см. sparse_bake)
+        """
+        if not all_proxies: return {}
+        if sparse: return self.sparse_bake(all_proxies, padding)
         starts, ends = [], []
         for name in self.IMPORTANT_ANIMS:
             if name in self.anim_ranges:
                 starts.append(self.anim_ranges[name][0])
                 ends.append(self.anim_ranges[name][1])
         
-        if not starts: return
+        if not starts: return {}
         f_start, f_end = min(starts) - 1, max(ends) + 1
         
         cmds.playbackOptions(min=f_start, max=f_end, ast=f_start, aet=f_end)
+        import pymel.core as pm
         pm.select([pm.PyNode(p) for p in all_proxies])
-        sm_core.clearBind(f_start, f_end)
+        _springmagic().clearBind(f_start, f_end)
+        for p in all_proxies:
+            if p.startswith("locAlign_"): continue
+            for at in ["rx", "ry", "rz"]:
+                self._mark_baked("{}.{}".format(p[:-len("_SpringProxy")], at), f_start, f_end)
+        self.bind_ranges.clear()
         
         locs = cmds.ls("locAlign_*")
-        if locs: cmds.delete(locs)
\ No newline at end of file
+        if locs: cmds.delete(locs)
+        return {}
+
+    def sparse_bake(self, all_proxies, padding=1):
+        """
+        Запекание только тех диапазонов клипов (+padding), которые считались для каждой цепи.
+        Промежутки между клипами и чужие клипы не трогаются.
+        :return: {корневой контрол: {"frames": N, "keys": N}}
+        """
+        proxies = set(all_proxies)
+        report = {}
+        for proxy_chain, ranges in list(self.bind_ranges.items()):
+            if not proxies.intersection(proxy_chain): continue
+            # Последний узел цепи -- прокси LAT-локатора, его не запекаем
+            ctrls = [p[:-len("_SpringProxy")] for p in proxy_chain[:-1]]
+            spans = self._merge_ranges([(s - padding, e + padding) for s, e in ranges])
+
+            # 1. Снимаем итоговое вращение контролов (с учетом констрейнтов) без смены кадра
+            sampled = []
+            for s, e in spans:
+                frames = np.arange(int(s), int(e) + 1, dtype=np.float64)
+                sampled.append((frames, self._sample_rotate(ctrls, frames)))
+
+            # 2. Отвязываем контролы от прокси
+            self._detach_from_proxies(ctrls, proxy_chain)
+
+            # 3. Пишем ключи только в диапазонах клипов
+            frame_count, key_count = 0, 0
+            for frames, rotate in sampled:
+                frame_count += len(frames)
+                for i, ctrl in enumerate(ctrls):
+                    for axis, at in enumerate(["rx", "ry", "rz"]):
+                        plug = "{}.{}".format(ctrl, at)
+                        if not cmds.getAttr(plug, settable=True): continue
+                        write_time_keys(plug, frames, rotate[:, i, axis])
+                        self._mark_baked(plug, frames[0], frames[-1])
+                        key_count += len(frames)
+            report[ctrls[0]] = {"frames": frame_count, "keys": key_count}
+            print(f"PhysicsManager: Sparse bake {ctrls[0]}: кадров {frame_count}, ключей {key_count}.")
+            del self.bind_ranges[proxy_chain]
+
+        locs = cmds.ls("locAlign_*")
+        if locs: cmds.delete(locs)
+        return report
+
+    def _merge_ranges(self, ranges):
+        merged = []
+        for s, e in sorted(ranges):
+            if merged and s <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], e))
+            else:
+                merged.append((s, e))
+        return merged
+
+    def _detach_from_proxies(self, ctrls, proxy_chain):
+        """Удаляет констрейнты на прокси, pairBlend-ы и сами прокси, возвращая кривые на контролы."""
+        proxy_set = set(p for p in proxy_chain if cmds.objExists(p))
+        for ctrl in ctrls:
+            cons = set(cmds.listConnections(ctrl, s=True, d=False, type="constraint") or [])
+            for con in cons:
+                targets = set(cmds.listConnections(con + ".target", s=True, d=False) or [])
+                if targets & proxy_set: cmds.delete(con)
+
+            for at in ["rx", "ry", "rz"]:
+                blends = cmds.listConnections("{}.{}".format(ctrl, at), s=True, d=False, type="pairBlend") or []
+                for pb in blends:
+                    if not cmds.objExists(pb): continue
+                    for axis in "XYZ":
+                        src = cmds.listConnections("{}.inRotate{}1".format(pb, axis), s=True, d=False, p=True)
+                        if src: cmds.connectAttr(src[0], "{}.rotate{}".format(ctrl, axis), f=True)
+                    cmds.delete(pb)
+
+        if proxy_set: cmds.delete(list(proxy_set))
+
+    def _mark_baked(self, plug, start, end):
+        self.baked_channels.setdefault(plug, []).append((start, end))
+
+    @scene_operation("Physics: Reduce Keys")
+    def reduce_baked_keys(self, tolerances=None):
+        """Прореживание ключей после запекания физики: только запеченные каналы и диапазоны."""
+        ranges = {}
+        for plug, spans in self.baked_channels.items():
+            curve = get_input_curve(plug) if cmds.objExists(plug) else None
+            if curve: ranges[curve] = self._merge_ranges(spans)
+        self.baked_channels.clear()
+        if not ranges: return {}
+        return CurveReducer(tolerances).reduce_curves(sorted(ranges), ranges)
+
+    # --- ПАРАЛЛЕЛЬНЫЙ РАСЧЕТ (вне Maya) ---
+    def is_pool_compatible(self, chain):
+        """Решатель поддерживает только порядок вращения xyz."""
+        return all(cmds.getAttr(n + ".rotateOrder") == 0 for n in chain)
+
+    def export_chain_motion(self, chain, end_node, start, end):
+        """Выгрузка ведущего движения цепи в массивы для воркера."""
+        frames = np.arange(int(start), int(end) + 1, dtype=np.float64)
+        sel = om.MSelectionList()
+        for n in chain: sel.add(n)
+
+        world_plugs, parent_plugs = [], []
+        pre = np.tile(np.eye(3), (len(chain), 1, 1))
+        post = np.tile(np.eye(3), (len(chain), 1, 1))
+        for i, n in enumerate(chain):
+            fn = om.MFnDependencyNode(sel.getDependNode(i))
+            world_plugs.append(fn.findPlug("worldMatrix", False).elementByLogicalIndex(0))
+            parent_plugs.append(fn.findPlug("parentMatrix", False).elementByLogicalIndex(0))
+            pre[i] = euler_to_matrix(cmds.getAttr(n + ".rotateAxis")[0])
+            if cmds.nodeType(n) == "joint":
+                post[i] = euler_to_matrix(cmds.getAttr(n + ".jointOrient")[0])
+
+        world = np.empty((len(frames), len(chain), 4, 4))
+        parent = np.empty_like(world)
+        unit = om.MTime.uiUnit()
+        for fi, f in enumerate(frames):
+            with om.MDGContextGuard(om.MDGContext(om.MTime(f, unit))):
+                for i in range(len(chain)):
+                    world[fi, i] = np.array(list(om.MFnMatrixData(world_plugs[i].asMObject()).matrix())).reshape(4, 4)
+                    parent[fi, i] = np.array(list(om.MFnMatrixData(parent_plugs[i].asMObject()).matrix())).reshape(4, 4)
+
+        # Кончик как в LAT: смещение WD 1.25 по X в пространстве последнего контрола
+        side_mult = -1.0 if "_L" in end_node else 1.0
+        return {
+            "frames": frames, "world": world, "parent": parent, "pre": pre, "post": post,
+            "tip_offset": np.array([1.25 * side_mult, 0.0, 0.0])
+        }
+
+    def build_spring_jobs(self, roots_anims, spring_val, twist_val, is_loop):
+        """
+        Готовит задачи цепь x клип.
+        :param roots_anims: список (root_ctrl, anim_list)
+        :return: (jobs, chains, skipped, cached) -- skipped считаются старым путем SpringMagic,
+                 cached -- готовые результаты из кэша
+        """
+        jobs, chains, skipped, cached = [], {}, [], {}
+        for root, anim_list in roots_anims:
+            chain, end_node = self.collect_chain(root)
+            if not self.is_pool_compatible(chain):
+                skipped.append((root, anim_list))
+                continue
+            chains[root] = chain
+            for anim_name in anim_list:
+                if anim_name not in self.anim_ranges: continue
+                start, end = self.anim_ranges[anim_name]
+                padding = self._padding_keys(chain, start, end)
+                job = self.export_chain_motion(chain, end_node, start, end)
+                cache_key = self._cache_key("pool", chain, job, spring_val, twist_val, is_loop)
+                hit = self.sim_cache.get(cache_key)
+                if hit is not None:
+                    cached[(root, anim_name)] = {"key": (root, anim_name), "frames": hit["frames"],
+                                                 "rotate": hit["rotate"], "padding": padding}
+                    continue
+                job.update(key=(root, anim_name), cache_key=cache_key, padding=padding,
+                           spring=spring_val, twist=twist_val, is_loop=is_loop)
+                jobs.append(job)
+        return jobs, chains, skipped, cached
+
+    @scene_operation("Physics: Parity Check", undo=False)
+    def check_solver_parity(self, root_ctrl, anim_name, spring_val, twist_val, is_loop, tolerance=PARITY_TOLERANCE):
+        """
+        Сверка решателя пула с SpringMagic на одной цепи и клипе.
+        SpringMagic считается в отдельном undo-чанке и откатывается, сцена не меняется.
+        :return: {"max": градусы, "mean": градусы, "frame": кадр худшего расхождения, "ok": bool}
+        """
+        chain, end_node = self.collect_chain(root_ctrl)
+        if anim_name not in self.anim_ranges or not self.is_pool_compatible(chain): return None
+        start, end = self.anim_ranges[anim_name]
+        job = self.export_chain_motion(chain, end_node, start, end)
+        job.update(key=root_ctrl, spring=spring_val, twist=twist_val, is_loop=is_loop)
+        pool = solve_chain(job)["rotate"]
+
+        # Эталон: SpringMagic по тем же данным, без кэша; вращения контролов снимаются до отката
+        current = cmds.currentTime(q=True)
+        playback = cmds.playbackOptions(q=True, min=True), cmds.playbackOptions(q=True, max=True)
+        proxy_chain = self.process_spring_logic(root_ctrl, [anim_name], spring_val, twist_val, is_loop, use_cache=False)
+        reference = self._sample_rotate(chain, job["frames"])
+        cmds.undo()
+        self.bind_ranges.pop(tuple(proxy_chain), None)
+        cmds.playbackOptions(min=playback[0], max=playback[1])
+        cmds.currentTime(current)
+
+        # Угол между вращениями, а не разница Эйлеров (неоднозначность +-360 и gimbal)
+        rot_a = np.array([[euler_to_matrix(r) for r in frame] for frame in pool])
+        rot_b = np.array([[euler_to_matrix(r) for r in frame] for frame in reference])
+        cos = (np.einsum("fnij,fnij->fn", rot_a, rot_b) - 1.0) / 2.0
+        angle = np.degrees(np.arccos(np.clip(cos, -1.0, 1.0)))
+        worst = int(np.argmax(angle.max(axis=1)))
+        report = {"max": float(angle.max()), "mean": float(angle.mean()), "frame": float(job["frames"][worst]),
+                  "ok": bool(angle.max() <= tolerance)}
+        print("PhysicsManager: Parity {} / {} -- макс. {:.3f} (кадр {:g}), средн. {:.3f} град., допуск {} -- {}".format(
+            root_ctrl, anim_name, report["max"], report["frame"], report["mean"], tolerance,
+            "OK" if report["ok"] else "РАСХОЖДЕНИЕ"))
+        return report
+
+    def _padding_keys(self, chain, start, end):
+        """
+        Технические кадры, как у пути SpringMagic: поза безопасного кадра (start-30)
+        на start-2, start-1 и end+1. :return: (кадры (3,), вращения (3, N, 3))
+        """
+        pose = self._sample_rotate(chain, np.array([start - 30.0]))
+        return np.array([start - 2.0, start - 1.0, end + 1.0]), np.repeat(pose, 3, axis=0)
+
+    def apply_spring_results(self, results, chains):
+        """
+        Слияние результатов в ключи rotate контролов (одна запись на кривую и клип).
+        Ключи пишутся только в диапазонах клипов (с техническими кадрами), отчет -- как у sparse_bake.
+        """
+        report = {}
+        for (root, anim_name), res in sorted(results.items()):
+            pad_frames, pad_rotate = res["padding"]
+            # Технические кадры до клипа, расчет, технический кадр после -- одной записью на кривую
+            frames = np.concatenate([pad_frames[:2], res["frames"], pad_frames[2:]])
+            rotate = np.concatenate([pad_rotate[:2], res["rotate"], pad_rotate[2:]])
+            entry = report.setdefault(root, {"frames": 0, "keys": 0})
+            entry["frames"] += len(frames)
+            for i, node in enumerate(chains[root]):
+                for axis, at in enumerate(["rx", "ry", "rz"]):
+                    plug = "{}.{}".format(node, at)
+                    if not cmds.getAttr(plug, settable=True): continue
+                    write_time_keys(plug, frames, rotate[:, i, axis])
+                    self._mark_baked(plug, frames[0], frames[-1])
+                    entry["keys"] += len(frames)
+        return report
+
+    @scene_operation("Physics: Pool Batch")
+    def process_spring_batch(self, roots_anims, spring_val, twist_val, is_loop,
+                             progress_cb=None, cancel_cb=None):
+        """
+        Пакетный пайплайн: экспорт движения -> пул воркеров -> запись ключей одним проходом.
+        :return: (skipped, report) -- skipped нужно досчитать через SpringMagic,
+                 report -- кадры и ключи по цепям; None, если расчет отменен.
+        """
+        jobs, chains, skipped, cached = self.build_spring_jobs(roots_anims, spring_val, twist_val, is_loop)
+        results = PhysicsPool().run(jobs, progress_cb, cancel_cb)
+        if results is None: return None
+
+        for job in jobs:
+            res = results[job["key"]]
+            self.sim_cache.put(job["cache_key"], frames=res["frames"], rotate=res["rotate"])
+            res["padding"] = job["padding"]
+        results.update(cached)
+
+        report = self.apply_spring_results(results, chains)
+        print(f"PhysicsManager: Задач: {len(results)} (из кэша: {len(cached)}), цепей: {len(chains)}.")
+        return skipped, report
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Пул процессов для расчета физики цепей вне Maya.
+Каждая задача цепь x клип независима и считается в отдельном воркере (mayapy).
+"""
+import os
+import sys
+import multiprocessing
+
+from FD_FishTool.core.spring_solver import solve_chain
+
+
+class PhysicsPool:
+    def __init__(self, workers=None):
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+
+    @staticmethod
+    def _python_exe():
+        """Внутри Maya sys.executable -- это maya.exe, воркерам нужен mayapy."""
+        bin_dir = os.path.dirname(sys.executable)
+        exe = os.path.join(bin_dir, "mayapy.exe" if os.name == "nt" else "mayapy")
+        return exe if os.path.exists(exe) else sys.executable
+
+    def run(self, jobs, progress_cb=None, cancel_cb=None):
+        """
+        Считает задачи параллельно.
+        :param progress_cb: callable(done, total) -- вызывается из главного потока
+        :param cancel_cb: callable() -> bool; True прерывает расчет
+        :return: {key: result} или None, если расчет отменен
+        """
+        total = len(jobs)
+        if not total: return {}
+
+        try:
+            ctx = multiprocessing.get_context("spawn")
+            ctx.set_executable(self._python_exe())
+            pool = ctx.Pool(processes=min(self.workers, total))
+        except (OSError, ValueError) as e:
+            print(f"PhysicsPool: Пул недоступен ({e}), расчет в текущем процессе.")
+            return self._run_serial(jobs, progress_cb, cancel_cb)
+
+        results = {}
+        try:
+            pending = [pool.apply_async(solve_chain, (job,)) for job in jobs]
+            while pending:
+                pending[0].wait(0.1)
+                done = [r for r in pending if r.ready()]
+                pending = [r for r in pending if r not in done]
+                for r in done:
+                    res = r.get()
+                    results[res["key"]] = res
+                if progress_cb: progress_cb(len(results), total)
+                if cancel_cb and cancel_cb():
+                    print("PhysicsPool: Расчет отменен пользователем.")
+                    return None
+        finally:
+            # terminate, а не shutdown: при отмене воркеры с недосчитанными задачами тоже завершаются
+            pool.terminate()
+            pool.join()
+        return results
+
+    def _run_serial(self, jobs, progress_cb=None, cancel_cb=None):
+        results = {}
+        for job in jobs:
+            if cancel_cb and cancel_cb(): return None
+            res = solve_chain(job)
+            results[res["key"]] = res
+            if progress_cb: progress_cb(len(results), len(jobs))
+        return results
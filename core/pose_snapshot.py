@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Снимок позы набора узлов в памяти: локальные каналы и мировые матрицы.
+Заменяет временные локаторы-прокси в SDK-билдерах лица.
+"""
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+from FD_FishTool.core import matrix_utils
+
+CHANNELS = ("tx", "ty", "tz", "rx", "ry", "rz")
+ATTRS = ("translateX", "translateY", "translateZ", "rotateX", "rotateY", "rotateZ")
+
+
+class PoseSnapshot:
+    def __init__(self, nodes):
+        self.nodes = [n for n in nodes if cmds.objExists(n)]
+        self.local = {}   # узел -> {канал: значение в единицах UI}
+        self.world = []   # om.MMatrix в порядке self.nodes
+        self.capture()
+
+    def capture(self):
+        """Один пакетный проход по API: локальные каналы и мировые матрицы."""
+        self.local = {}
+        if not self.nodes: return
+        sel = om.MSelectionList()
+        for n in self.nodes: sel.add(n)
+        dist_unit, ang_unit = om.MDistance.uiUnit(), om.MAngle.uiUnit()
+        for i, n in enumerate(self.nodes):
+            fn = om.MFnDependencyNode(sel.getDependNode(i))
+            vals = {}
+            for ch, name in zip(CHANNELS, ATTRS):
+                plug = fn.findPlug(name, False)
+                if ch.startswith("t"):
+                    vals[ch] = plug.asMDistance().asUnits(dist_unit)
+                else:
+                    vals[ch] = plug.asMAngle().asUnits(ang_unit)
+            self.local[n] = vals
+        self.world = matrix_utils.get_world_matrices(self.nodes)
+
+    def restore(self, space="local"):
+        """
+        Возврат позы.
+        :param space: 'local' -- каналы translate/rotate, 'world' -- мировые матрицы
+        """
+        if space == "world":
+            matrix_utils.set_world_matrices(self.nodes, self.world)
+            return
+        for n in self.nodes:
+            v = self.local[n]
+            cmds.setAttr(n + ".t", v["tx"], v["ty"], v["tz"])
+            cmds.setAttr(n + ".r", v["rx"], v["ry"], v["rz"])
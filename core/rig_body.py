@@ -2,11 +2,24 @@
 import maya.cmds as cmds
 import maya.mel as mel
 import os
+import numpy as np
+
+from FD_FishTool.core.scene_ops import scene_operation
+from FD_FishTool.core.symmetry_map import get_symmetry_map
+from FD_FishTool.core import skin_weights
+from FD_FishTool.core.weight_transfer import WeightTransfer
+from FD_FishTool.core import weight_smoothing
+from FD_FishTool.core import weight_io
+from FD_FishTool.core.weight_store import WeightSnapshot, WeightHistory
+from FD_FishTool.core.component_set import ComponentSet, MeshTopology
 
 class BodyRigManager:
     def __init__(self, config=None):
         self.cfg = config
         self.map_file = "bone_skin_map.json"
+        self._vtx_symmetry = {}  # меш -> VertexSymmetry (пересчет при изменении точек)
+        self.weight_history = WeightHistory()  # undo/redo инструментов весов (вне undo Maya)
+        self._topology = {}  # меш -> MeshTopology (CSR-соседство вершин)
 
     # --- Вспомогательные методы (Рабочая версия) ---
     def get_all_meshes_in_scene(self):
@@ -23,33 +36,42 @@ class BodyRigManager:
             if any(s in m.lower() for s in ['_geo', '_mesh', '_msh']): return m
         return all_meshes[0]
 
-    def get_vtx_neighbors(self, vtx_list):
-        if not vtx_list: return set()
-        edges = cmds.polyListComponentConversion(list(vtx_list), toEdge=True)
-        neighbors = cmds.polyListComponentConversion(edges, toVertex=True)
-        return set(cmds.ls(neighbors, fl=True))
+    def get_topology(self, mesh):
+        """Соседство вершин меша; пересчет при изменении числа вершин/ребер."""
+        cached = self._topology.get(mesh)
+        if cached is None or cached.signature() != (cmds.polyEvaluate(mesh, edge=True), cmds.polyEvaluate(mesh, vertex=True)):
+            cached = MeshTopology(mesh)
+            self._topology[mesh] = cached
+        return cached
+
+    def get_vtx_neighbors(self, vtxs):
+        """Набор вершин вместе с соседями по ребрам (ComponentSet или строки компонентов)."""
+        if not isinstance(vtxs, ComponentSet): vtxs = ComponentSet.from_components(vtxs)
+        if not vtxs: return vtxs
+        return self.get_topology(vtxs.mesh).grow(vtxs)
 
     def get_bone_island(self, sc, bone):
-        """Рабочий метод получения островов через выделение."""
+        """Вершины с весом кости -- ComponentSet, без изменения выделения."""
         try:
-            cmds.select(cl=True)
-            cmds.skinCluster(sc, edit=True, selectInfluenceVerts=bone)
-            return set(cmds.ls(sl=True, fl=True))
-        except: return set()
+            return ComponentSet.from_influence(sc, bone)
+        except RuntimeError:
+            return ComponentSet(None)
 
     def get_topology_distance(self, start_island, target_island):
         """Считает количество 'лупов' между двумя островами (Рабочая версия)."""
-        current_area = set(start_island)
-        edge_vtx = set(start_island)
+        topo = self.get_topology(start_island.mesh)
+        current_area = start_island
+        edge_vtx = start_island
         for i in range(1, 11):
-            next_step = self.get_vtx_neighbors(list(edge_vtx)) - current_area
+            next_step = topo.grow(edge_vtx) - current_area
             if not next_step: break
             if next_step & target_island:
                 return i
-            current_area.update(next_step)
+            current_area = current_area | next_step
             edge_vtx = next_step
         return 10
 
+    @scene_operation("Adaptive Gradient")
     def apply_topological_gradient(self, mesh_name):
         """Стабильный мульти-режимный градиент (Step 3 XL)."""
         joints = cmds.ls(os=True, type='joint')
@@ -73,14 +95,14 @@ class BodyRigManager:
             mode = MODES[dist if dist in MODES else 5]
             print(f"  [{label}] {src_bone} -> {tgt_bone} | Dist: {dist} | Mode: {mode['name']}")
 
-            frontier = {v for v in src_isl if self.get_vtx_neighbors([v]) - src_isl}
-            curr_area = set(src_isl); prev_loop = set(frontier)
+            topo = self.get_topology(src_isl.mesh)
+            curr_area = src_isl; prev_loop = topo.border(src_isl)
             for idx, weight in enumerate(mode["steps"]):
-                next_loop = (self.get_vtx_neighbors(list(prev_loop)) - curr_area) & tgt_isl
+                next_loop = (topo.grow(prev_loop) - curr_area) & tgt_isl
                 if next_loop:
-                    cmds.skinPercent(sc, list(next_loop), tv=[(src_bone, weight)], relative=True, nrm=True)
+                    cmds.skinPercent(sc, next_loop.to_components(), tv=[(src_bone, weight)], relative=True, nrm=True)
                     print(f"    > Row {idx+1}: ADD {weight}")
-                    curr_area.update(next_loop); prev_loop = next_loop
+                    curr_area = curr_area | next_loop; prev_loop = next_loop
                 else: break
 
         for i in range(len(joints)):
@@ -112,6 +134,7 @@ class BodyRigManager:
         bones = self.get_full_bone_list(f"stage_{idx}")
         if bones: cmds.select(bones, r=True)
 
+    @scene_operation("Staged Skinning")
     def add_to_skin_logic(self, idx, mesh):
         bones = self.get_full_bone_list(f"stage_{idx}")
         if not bones or not cmds.objExists(mesh): return
@@ -128,8 +151,141 @@ class BodyRigManager:
         sc = cmds.ls(cmds.listHistory(mesh), type='skinCluster')
         if sc: cmds.select(cmds.skinCluster(sc[0], q=True, inf=True), r=True)
 
+    @scene_operation("Remove Unused Influences")
     def clean_weightless_bones(self, mesh):
         sc = cmds.ls(cmds.listHistory(mesh), type='skinCluster')
         if sc:
             cmds.select(mesh, r=True); mel.eval("removeUnusedInfluences;")
-            cmds.skinCluster(sc[0], edit=True, rui=True)
\ No newline at end of file
+            cmds.skinCluster(sc[0], edit=True, rui=True)
+
+    # --- Зеркалирование весов ---
+    def get_vertex_symmetry(self, mesh, tolerance=None, axis=0):
+        """Индекс симметрии вершин меша; строится один раз на форму меша."""
+        points = skin_weights.get_bind_points(mesh)
+        cached = self._vtx_symmetry.get(mesh)
+        if cached is None or cached.key != skin_weights.VertexSymmetry.signature(points, tolerance, axis):
+            cached = skin_weights.VertexSymmetry(points, tolerance, axis)
+            self._vtx_symmetry[mesh] = cached
+        return cached
+
+    @scene_operation("Mirror Skin Weights", undo=False, suspend_undo=True)
+    def mirror_skin_weights(self, mesh, positive_to_negative=True, tolerance=None):
+        """
+        Зеркалирование весов по индексу симметрии вершин и карте симметрии костей.
+        :return: индексы вершин целевой стороны без пары (или None, если нет скина)
+        """
+        sc = skin_weights.find_skin_cluster(mesh)
+        if not sc: return None
+        vsym = self.get_vertex_symmetry(mesh, tolerance)
+        jsym = get_symmetry_map()
+
+        dst = vsym.side(not positive_to_negative)
+        src = vsym.partner[dst]
+        unmatched = dst[src < 0]
+        dst, src = dst[src >= 0], src[src >= 0]
+        # «До» -- до добавления инфлюенсов: откат через историю весов уберет и их
+        before = WeightSnapshot.capture(sc, dst, mesh)
+
+        # Недостающие зеркальные инфлюенсы добавляются одной командой
+        influences = skin_weights.get_influences(sc)
+        added = skin_weights.add_influences(sc, [jsym.partner(i) or i for i in influences])
+        weights, influences = skin_weights.read_weights(sc)
+        column = {n: i for i, n in enumerate(influences)}
+        perm = np.array([column.get(jsym.partner(n) or n, i) for i, n in enumerate(influences)])
+
+        mirrored = np.zeros((len(dst), len(influences)))
+        np.add.at(mirrored, (slice(None), perm), weights[src])
+        mirrored = skin_weights.normalize_rows(mirrored)
+        skin_weights.write_weights(sc, mirrored, dst)
+        self.weight_history.push("Mirror Skin Weights", before, WeightSnapshot(sc, dst, mirrored, influences, mesh))
+
+        print("FD_FishTool: Mirror Weights {} -- {} вершин, без пары: {}, добавлено инфлюенсов: {}".format(
+            mesh, len(dst), len(unmatched), len(added)))
+        return unmatched.tolist()
+
+    @scene_operation("Transfer Skin Weights", undo=False, suspend_undo=True)
+    def transfer_weights(self, source, targets, max_influences=4):
+        """Перенос весов с меша-источника на LOD/варианты (по ближайшей точке поверхности)."""
+        if not skin_weights.find_skin_cluster(source):
+            cmds.warning("FD_FishTool: У {} нет skinCluster.".format(source))
+            return {}
+        transfer = WeightTransfer(source)
+        report = {}
+        for target in targets:
+            if target == source or not cmds.objExists(target): continue
+            report[target] = transfer.apply(target, max_influences)
+            r = report[target]
+            self.weight_history.push("Transfer Skin Weights", r["before"], r["after"])
+            print("FD_FishTool: Transfer {} -> {} -- {} вершин, новых инфлюенсов: {}, макс. отклонение: {:.4f}".format(
+                source, target, r["vertices"], len(r["added"]), r["max_distance"]))
+        return report
+
+    @scene_operation("Smooth Skin Weights", undo=False)
+    def smooth_weights(self, mesh, iterations=3, factor=0.5, taubin=True):
+        """Сглаживание весов (Taubin) по выделенным вершинам или всему мешу, одна запись."""
+        sc = skin_weights.find_skin_cluster(mesh)
+        if not sc: return None
+        weights, influences = skin_weights.read_weights(sc)
+        locked = skin_weights.get_locked(influences)
+        mask = skin_weights.get_selected_vertices(mesh)
+        rows = mask if len(mask) else None
+        changed = np.arange(len(weights)) if rows is None else rows
+
+        topo = self.get_topology(mesh)
+        result = weight_smoothing.smooth_weights(weights, topo.indptr, topo.neighbors, iterations, factor, taubin,
+                                                 locked=locked, mask=rows)
+        if rows is None:
+            skin_weights.write_weights(sc, result)
+        else:
+            skin_weights.write_weights(sc, result[rows], rows)
+        self.weight_history.push("Smooth Skin Weights", WeightSnapshot(sc, changed, weights[changed], influences),
+                                 WeightSnapshot(sc, changed, result[changed], influences))
+        print("FD_FishTool: Smooth Weights {} -- {} вершин, {} итераций, заблокировано инфлюенсов: {}".format(
+            mesh, len(weights) if rows is None else len(rows), iterations, int(locked.sum())))
+        return result
+
+    # --- Бэкап весов (бинарный .fdsw) ---
+    @scene_operation("Export Skin Weights", undo=False)
+    def export_skin_weights(self, mesh, path):
+        sc = skin_weights.find_skin_cluster(mesh)
+        if not sc:
+            cmds.warning("FD_FishTool: У {} нет skinCluster.".format(mesh))
+            return None
+        meta = weight_io.export_weights(sc, path)
+        print("FD_FishTool: Export Weights {} -> {} -- {} вершин, {} инфлюенсов".format(
+            mesh, path, meta["vertices"], len(meta["influences"])))
+        return meta
+
+    @scene_operation("Import Skin Weights", undo=False, suspend_undo=True)
+    def import_skin_weights(self, mesh, path):
+        """Импорт с сопоставлением костей по имени/алиасу (bone_aliases.json), одна запись."""
+        sc = skin_weights.find_skin_cluster(mesh)
+        if not sc:
+            cmds.warning("FD_FishTool: У {} нет skinCluster.".format(mesh))
+            return None
+        aliases = self.cfg.load_json("bone_aliases.json") if self.cfg else {}
+        # «До» -- до добавления инфлюенсов: откат через историю весов уберет и их
+        before = WeightSnapshot.capture(sc, mesh=mesh)
+        try:
+            report = weight_io.import_weights(sc, path, aliases)
+        except ValueError as e:
+            cmds.warning("FD_FishTool: {}".format(e))
+            return None
+        self.weight_history.push("Import Skin Weights", before,
+                                 WeightSnapshot(sc, before.vertices, report["weights"], report["influences"], mesh))
+        print("FD_FishTool: Import Weights {} <- {} -- сопоставлено {}, добавлено {}, отброшено {}: {}".format(
+            mesh, path, report["matched"], len(report["added"]), len(report["dropped"]), report["dropped"]))
+        return report
+
+    # --- История инструментов весов ---
+    @scene_operation("Weights Undo", undo=False, suspend_undo=True)
+    def undo_weights(self):
+        label = self.weight_history.undo()
+        print("FD_FishTool: Weights Undo -- {}".format(label or "история пуста"))
+        return label
+
+    @scene_operation("Weights Redo", undo=False, suspend_undo=True)
+    def redo_weights(self):
+        label = self.weight_history.redo()
+        print("FD_FishTool: Weights Redo -- {}".format(label or "нечего повторять"))
+        return label
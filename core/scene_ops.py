@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Общий контекст тяжелых операций со сценой.
+Отключает перерисовку вьюпорта и автоключ, собирает изменения в один undo-чанк
+(или выключает запись undo для операций со своей историей, см. weight_store),
+при необходимости переключает Evaluation Manager и восстанавливает все при выходе
+или ошибке. Пишет время выполнения операции в лог и в журнал инструментации.
+
+Используется как контекст-менеджер и как декоратор:
+    with scene_operation("Gradient"): ...
+    @scene_operation("Physics", eval_mode="off")
+"""
+import time
+from contextlib import contextmanager
+import maya.cmds as cmds
+
+from FD_FishTool.core import instrumentation
+
+# Глубина вложенности: состояние сцены меняет и восстанавливает только внешняя операция
+_depth = 0
+
+
+@contextmanager
+def scene_operation(name, undo=True, suspend_refresh=True, eval_mode=None, log=True, suspend_undo=False):
+    """
+    :param name: имя операции (для undo-чанка и лога)
+    :param undo: собрать изменения в один undo-чанк
+    :param suspend_undo: не писать команды операции в очередь undo Maya (без сброса очереди) --
+                         для операций, которые откатываются своей историей (запись весов через API)
+    :param suspend_refresh: приостановить перерисовку вьюпорта
+    :param eval_mode: режим Evaluation Manager на время операции ('off', 'serial', 'parallel')
+    :param log: печатать время выполнения
+    """
+    global _depth
+    outer = _depth == 0
+    _depth += 1
+    start = time.perf_counter()
+    restore = []
+
+    # Замер времени и числа команд (при выключенной инструментации -- пустой контекст)
+    with instrumentation.phase(name, "action"):
+        try:
+            if undo:
+                cmds.undoInfo(openChunk=True, chunkName=name)
+                restore.append(lambda: cmds.undoInfo(closeChunk=True))
+            if suspend_undo and cmds.undoInfo(q=True, state=True):
+                cmds.undoInfo(stateWithoutFlush=False)
+                restore.append(lambda: cmds.undoInfo(stateWithoutFlush=True))
+            if outer:
+                autokey = cmds.autoKeyframe(q=True, state=True)
+                if autokey:
+                    cmds.autoKeyframe(state=False)
+                    restore.append(lambda: cmds.autoKeyframe(state=True))
+                if eval_mode:
+                    prev_mode = cmds.evaluationManager(q=True, mode=True)[0]
+                    if prev_mode != eval_mode:
+                        cmds.evaluationManager(mode=eval_mode)
+                        restore.append(lambda: cmds.evaluationManager(mode=prev_mode))
+                if suspend_refresh:
+                    cmds.refresh(suspend=True)
+                    restore.append(lambda: cmds.refresh(suspend=False))
+            yield
+        finally:
+            _depth -= 1
+            for fn in reversed(restore):
+                try:
+                    fn()
+                except RuntimeError as e:
+                    print(f"FD_FishTool: [{name}] Ошибка восстановления состояния: {e}")
+            if outer and suspend_refresh:
+                cmds.refresh(force=True)
+            if log:
+                print(f"FD_FishTool: [{name}] {time.perf_counter() - start:.3f} c")
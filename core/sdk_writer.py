@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Пакетная запись Set Driven Key.
+Ключи операции копятся в памяти (драйвер, значение драйвера, управляемый атрибут, значение)
+и пишутся в конце: каждая кривая драйвер -> атрибут получает все свои ключи
+одной командой setAttr по массиву keyValue, всё в одном undo-чанке; касательные
+существующих ключей сохраняются (см. anim_curves.restore_tangents).
+"""
+import maya.cmds as cmds
+
+from FD_FishTool.core.pose_snapshot import PoseSnapshot, CHANNELS, ATTRS
+from FD_FishTool.core.scene_ops import scene_operation
+from FD_FishTool.core.anim_curves import read_tangents, restore_tangents
+
+# Допуск совпадения значения драйвера с существующим ключом
+DRIVER_TOLERANCE = 1e-4
+
+
+def driven_curves(driver_plug):
+    """
+    SDK-кривые драйвера: {'узел.атрибут': animCurve}, в т.ч. подключенные через blendWeighted.
+    Два запроса на драйвер, независимо от числа кривых.
+    """
+    curves = sorted(set(cmds.listConnections(driver_plug, s=False, d=True, type="animCurve", scn=True) or []))
+    if not curves: return {}
+    pairs = cmds.listConnections([c + ".output" for c in curves], s=False, d=True, p=True, c=True, scn=True) or []
+
+    result, blends = {}, {}
+    blend_nodes = set(cmds.ls([dst.split(".")[0] for dst in pairs[1::2]], type="blendWeighted") or [])
+    for src, dst in zip(pairs[::2], pairs[1::2]):
+        curve, node = src.split(".")[0], dst.split(".")[0]
+        if node in blend_nodes:
+            blends.setdefault(node, curve)
+        else:
+            result.setdefault(dst, curve)
+
+    if blends:
+        pairs = cmds.listConnections([b + ".output" for b in blends], s=False, d=True, p=True, c=True, scn=True) or []
+        for src, dst in zip(pairs[::2], pairs[1::2]):
+            result.setdefault(dst, blends[src.split(".")[0]])
+    return result
+
+
+class SDKWriter:
+    def __init__(self):
+        self.pending = {}  # (драйвер, 'узел.атрибут') -> {значение драйвера: значение}
+
+    def clear(self):
+        self.pending = {}
+
+    def add(self, driver_plug, driver_value, driven_plug, value):
+        """:param driven_plug: атрибут с длинным именем ('node.translateX')"""
+        keys = self.pending.setdefault((driver_plug, driven_plug), {})
+        keys[float(driver_value)] = float(value)
+
+    def key_pose(self, driver_plug, driver_value, nodes):
+        """Аналог setDrivenKeyframe по tx..rz: текущая поза узлов читается одним проходом."""
+        pose = PoseSnapshot(nodes)
+        for n in pose.nodes:
+            values = pose.local[n]
+            for ch, attr in zip(CHANNELS, ATTRS):
+                self.add(driver_plug, driver_value, "{}.{}".format(n, attr), values[ch])
+
+    @scene_operation("SDK: Write Keys", log=False)
+    def flush(self):
+        """Запись накопленных ключей. :return: (кривых, ключей)"""
+        if not self.pending: return 0, 0
+        by_driver = {}
+        for driver, driven in self.pending:
+            by_driver.setdefault(driver, []).append(driven)
+
+        itt = cmds.keyTangent(q=True, g=True, itt=True)[0]
+        ott = cmds.keyTangent(q=True, g=True, ott=True)[0]
+        total = 0
+        for driver, plugs in by_driver.items():
+            curves = driven_curves(driver)
+            missing = [p for p in plugs if p not in curves]
+            if missing:
+                # Новые кривые создаем штатно: Maya сама подберет тип и вставит blendWeighted
+                for p in missing:
+                    dv, v = next(iter(self.pending[(driver, p)].items()))
+                    cmds.setDrivenKeyframe(p, cd=driver, dv=dv, v=v)
+                curves = driven_curves(driver)
+
+            for p in plugs:
+                curve = curves.get(p)
+                if not curve:
+                    print("FD_FishTool: SDK-кривая не найдена: {} -> {}".format(driver, p))
+                    continue
+                total += self._write_curve(curve, self.pending[(driver, p)], itt, ott)
+
+        count = len(self.pending)
+        self.pending = {}
+        return count, total
+
+    def _write_curve(self, curve, new_keys, itt, ott):
+        old_f = cmds.keyframe(curve, q=True, fc=True) or []
+        old_v = cmds.keyframe(curve, q=True, vc=True) or []
+        merged = dict(zip(old_f, old_v))
+        for dv, v in new_keys.items():
+            match = next((f for f in old_f if abs(f - dv) < DRIVER_TOLERANCE), dv)
+            merged[match] = v
+
+        # Касательные лежат по индексу ключа: новые ключи сдвигают индексы следующих за ними,
+        # их касательные снимаются до записи и возвращаются по значению драйвера
+        added = sorted(f for f in merged if f not in old_f)
+        shifted = [f for f in old_f if added and f > added[0]]
+        saved = read_tangents(curve, (shifted[0], shifted[-1])) if shifted else []
+
+        keys = sorted(merged.items())
+        flat = [x for kv in keys for x in kv]
+        cmds.setAttr("{}.kv[0:{}]".format(curve, len(keys) - 1), *flat)
+        restore_tangents(curve, saved)
+        if added:
+            cmds.keyTangent(curve, e=True, f=[(f, f) for f in added], itt=itt, ott=ott, lock=True)
+        return len(new_keys)
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Контентно-адресуемый кэш результатов физики.
+Ключ -- хэш ведущего движения цепи на диапазоне клипа (движение родителя корня
+и поза покоя, без собственных вращений цепи), топологии цепи и параметров SpringMagic. Результаты хранятся на диске компактными массивами (.npz), старые
+записи вытесняются по LRU при превышении лимита.
+"""
+import os
+import hashlib
+import numpy as np
+
+
+class SimCache:
+    def __init__(self, cache_dir, max_bytes=256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+    def make_key(self, solver, topology, arrays, spring_val, twist_val, is_loop):
+        """
+        :param solver: тег решателя ('pool' / 'springmagic'), результаты разных решателей не смешиваются
+        :param topology: список строк (имена контролов цепи и их родителей)
+        :param arrays: массивы ведущего движения (parent корня, смещения, pre, post, tip_offset...)
+        """
+        h = hashlib.sha1()
+        h.update(solver.encode("utf-8"))
+        h.update("|".join(topology).encode("utf-8"))
+        for arr in arrays:
+            # Округление убирает шум вычислений, не влияющий на результат; + 0.0 сводит -0.0 к 0.0
+            h.update((np.round(np.asarray(arr, dtype=np.float64), 6) + 0.0).tobytes())
+        h.update("{:.6f}|{:.6f}|{}".format(spring_val, twist_val, bool(is_loop)).encode("utf-8"))
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".npz")
+
+    def get(self, key):
+        """Возвращает {имя: массив} или None. Попадание обновляет время доступа для LRU."""
+        path = self._path(key)
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+        try:
+            with np.load(path) as data:
+                result = {k: data[k] for k in data.files}
+        except (OSError, ValueError) as e:
+            print(f"SimCache: Поврежденная запись {key}: {e}")
+            os.remove(path)
+            self.misses += 1
+            return None
+        os.utime(path, None)
+        self.hits += 1
+        return result
+
+    def put(self, key, **arrays):
+        """Сохраняет массивы (float32) через временный файл и вытесняет старые записи."""
+        path = self._path(key)
+        tmp = path + ".tmp.npz"
+        packed = {k: np.asarray(v, dtype=np.float32) for k, v in arrays.items()}
+        np.savez_compressed(tmp, **packed)
+        os.replace(tmp, path)
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".npz") or name.endswith(".tmp.npz"): continue
+            full = os.path.join(self.cache_dir, name)
+            st = os.stat(full)
+            entries.append((st.st_mtime, st.st_size, full))
+        total = sum(e[1] for e in entries)
+        for _, size, full in sorted(entries):
+            if total <= self.max_bytes: break
+            os.remove(full)
+            total -= size
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+Пакетное чтение и запись весов skinCluster через OpenMaya.
+Матрица весов -- массив NumPy (вершины x инфлюенсы) в порядке influenceObjects;
+чтение и запись -- одним вызовом getWeights/setWeights на весь набор вершин.
+Запись через API не попадает в undo Maya.
+"""
+import hashlib
+import numpy as np
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+import maya.api.OpenMayaAnim as oma
+
+from FD_FishTool.core.spatial_index import SpatialIndex
+
+# Допуск симметрии вершин по умолчанию -- доля диагонали габарита меша
+VERTEX_TOLERANCE_RATIO = 0.001
+
+
+def find_skin_cluster(mesh):
+    sc = cmds.ls(cmds.listHistory(mesh) or [], type="skinCluster")
+    return sc[0] if sc else None
+
+
+def _skin_fn(skin):
+    sel = om.MSelectionList(); sel.add(skin)
+    fn = oma.MFnSkinCluster(sel.getDependNode(0))
+    return fn, fn.getPathAtIndex(0)
+
+
+def _components(path, vertices=None):
+    comp_fn = om.MFnSingleIndexedComponent()
+    comp = comp_fn.create(om.MFn.kMeshVertComponent)
+    if vertices is None:
+        comp_fn.setCompleteData(om.MFnMesh(path).numVertices)
+    else:
+        comp_fn.addElements([int(v) for v in vertices])
+    return comp
+
+
+def get_influences(skin):
+    fn, _ = _skin_fn(skin)
+    return [p.partialPathName() for p in fn.influenceObjects()]
+
+
+def get_points(mesh, space=om.MSpace.kObject):
+    """Позиции вершин (V, 3) одним вызовом."""
+    sel = om.MSelectionList(); sel.add(mesh)
+    pts = om.MFnMesh(sel.getDagPath(0)).getPoints(space)
+    return np.array([(p.x, p.y, p.z) for p in pts], dtype=np.float64)
+
+
+def get_bind_points(mesh, space=om.MSpace.kObject):
+    """Позиции вершин исходной (до деформации) формы -- не зависят от текущей позы."""
+    orig = cmds.deformableShape(mesh, originalGeometry=True) or []
+    node = orig[0].split(".")[0] if orig and orig[0] else ""
+    return get_points(node if node and cmds.objExists(node) else mesh, space)
+
+
+def get_triangles(mesh):
+    """Треугольники меша (T, 3) -- индексы вершин."""
+    sel = om.MSelectionList(); sel.add(mesh)
+    _, tri_verts = om.MFnMesh(sel.getDagPath(0)).getTriangles()
+    return np.array(tri_verts, dtype=np.int64).reshape(-1, 3)
+
+
+def get_edges(mesh):
+    """Уникальные ребра меша (E, 2) по списку вершин полигонов -- без итерации по ребрам."""
+    sel = om.MSelectionList(); sel.add(mesh)
+    counts, verts = om.MFnMesh(sel.getDagPath(0)).getVertices()
+    counts = np.array(counts, dtype=np.int64)
+    verts = np.array(verts, dtype=np.int64)
+    offsets = np.cumsum(counts) - counts
+    nxt = np.arange(len(verts)) + 1
+    nxt[offsets + counts - 1] = offsets
+    edges = np.sort(np.stack([verts, verts[nxt]], axis=1), axis=1)
+    return np.unique(edges, axis=0)
+
+
+def get_selected_vertices(mesh):
+    """Индексы выделенных вершин меша (пусто, если выделения компонентов нет)."""
+    sel = om.MGlobal.getActiveSelectionList()
+    target = om.MSelectionList(); target.add(mesh)
+    shape = target.getDagPath(0).extendToShape()
+    result = []
+    for i in range(sel.length()):
+        try:
+            path, comp = sel.getComponent(i)
+        except RuntimeError:
+            continue
+        if comp.isNull() or not comp.hasFn(om.MFn.kMeshVertComponent): continue
+        if path.extendToShape() != shape: continue
+        result.extend(om.MFnSingleIndexedComponent(comp).getElements())
+    return np.unique(np.array(result, dtype=np.int64))
+
+
+def select_vertices(mesh, vertices, add=False):
+    """Выделение вершин по индексам одним вызовом (без строк компонентов)."""
+    sel = om.MSelectionList(); sel.add(mesh)
+    path = sel.getDagPath(0).extendToShape()
+    comp_fn = om.MFnSingleIndexedComponent()
+    comp = comp_fn.create(om.MFn.kMeshVertComponent)
+    comp_fn.addElements([int(v) for v in vertices])
+    result = om.MGlobal.getActiveSelectionList() if add else om.MSelectionList()
+    result.add((path, comp))
+    om.MGlobal.setActiveSelectionList(result)
+
+
+def set_vertex_colors(mesh, vertices, rgb):
+    """Цвета вершин (N, 3) одним вызовом MFnMesh.setVertexColors."""
+    sel = om.MSelectionList(); sel.add(mesh)
+    fn = om.MFnMesh(sel.getDagPath(0))
+    colors = [om.MColor((float(r), float(g), float(b), 1.0)) for r, g, b in rgb]
+    fn.setVertexColors(colors, [int(v) for v in vertices])
+
+
+def read_weights(skin, vertices=None):
+    """
+    :param vertices: индексы вершин или None (все)
+    :return: (веса (V, I) в порядке vertices, список инфлюенсов)
+    """
+    fn, path = _skin_fn(skin)
+    order = None
+    if vertices is not None:
+        vertices = np.asarray(vertices, dtype=np.int64)
+        order = np.argsort(vertices, kind="stable")
+        vertices = vertices[order]
+    weights, count = fn.getWeights(path, _components(path, vertices))
+    influences = [p.partialPathName() for p in fn.influenceObjects()]
+    weights = np.array(weights, dtype=np.float64).reshape(-1, count)
+    if order is not None:
+        restored = np.empty_like(weights)
+        restored[order] = weights
+        weights = restored
+    return weights, influences
+
+
+def normalize_rows(weights):
+    total = weights.sum(axis=1, keepdims=True)
+    return np.where(total > 0, weights / np.where(total > 0, total, 1.0), weights)
+
+
+def get_locked(influences):
+    return np.array([bool(cmds.getAttr(i + ".liw")) for i in influences], dtype=bool)
+
+
+def set_influence_weight(rows, column, values, fallback=None, locked=None):
+    """
+    Аналог skinPercent -tv (inf, value) -nrm для строк сразу: вес инфлюенса column
+    выставляется в values, остальные незаблокированные масштабируются к остатку.
+    :param fallback: столбец, получающий остаток, если других весов нет
+    """
+    rows = np.array(rows, dtype=np.float64)
+    fixed = np.zeros(rows.shape[1], dtype=bool) if locked is None else np.array(locked, dtype=bool)
+    fixed[column] = True
+    values = np.minimum(np.clip(values, 0.0, 1.0), 1.0 - rows[:, fixed & (np.arange(rows.shape[1]) != column)].sum(axis=1))
+    rows[:, column] = values
+    rest = np.clip(1.0 - rows[:, fixed].sum(axis=1), 0.0, 1.0)
+    free_sum = rows[:, ~fixed].sum(axis=1)
+    scale = np.where(free_sum > 0, rest / np.where(free_sum > 0, free_sum, 1.0), 0.0)
+    rows[:, ~fixed] *= scale[:, None]
+    if fallback is not None and not fixed[fallback]:
+        empty = free_sum <= 0
+        rows[empty, fallback] += rest[empty]
+    return rows
+
+
+def write_weights(skin, weights, vertices=None, normalize=False):
+    """Запись матрицы весов (V, I) в порядке influenceObjects одним вызовом setWeights."""
+    fn, path = _skin_fn(skin)
+    weights = np.asarray(weights, dtype=np.float64)
+    if normalize: weights = normalize_rows(weights)
+    if vertices is not None:
+        vertices = np.asarray(vertices, dtype=np.int64)
+        order = np.argsort(vertices, kind="stable")
+        vertices, weights = vertices[order], weights[order]
+    influences = om.MIntArray(list(range(weights.shape[1])))
+    fn.setWeights(path, _components(path, vertices), influences, om.MDoubleArray(weights.ravel().tolist()), False)
+
+
+def add_influences(skin, joints):
+    """Добавляет недостающие инфлюенсы одной командой (с нулевым весом)."""
+    existing = set(get_influences(skin))
+    missing = [j for j in joints if j not in existing and cmds.objExists(j)]
+    if missing:
+        cmds.skinCluster(skin, edit=True, ai=missing, lw=True, wt=0)
+        for j in missing: cmds.setAttr(j + ".liw", 0)
+    return missing
+
+
+class VertexSymmetry:
+    """Индекс симметрии вершин меша: пары по зеркальной позиции в пространстве объекта."""
+
+    def __init__(self, points, tolerance=None, axis=0):
+        self.points = np.asarray(points, dtype=np.float64)
+        self.axis = axis
+        self.key = self.signature(self.points, tolerance, axis)
+        if tolerance is None:
+            diag = np.linalg.norm(np.ptp(self.points, axis=0)) if len(self.points) else 0.0
+            tolerance = max(diag * VERTEX_TOLERANCE_RATIO, 1e-5)
+        self.tolerance = tolerance
+        mirrored = self.points.copy()
+        mirrored[:, axis] *= -1.0
+        self.partner, _ = SpatialIndex(self.points).nearest(mirrored, tolerance)
+
+    @staticmethod
+    def signature(points, tolerance=None, axis=0):
+        return hashlib.sha1(np.ascontiguousarray(points).tobytes() + repr((tolerance, axis)).encode()).hexdigest()
+
+    def side(self, positive=True):
+        """Индексы вершин стороны (без центральных)."""
+        coord = self.points[:, self.axis]
+        return np.nonzero(coord > self.tolerance if positive else coord < -self.tolerance)[0]
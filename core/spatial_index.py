@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Поиск ближайших точек в 3D: KD-дерево scipy, если оно есть в Maya,
+иначе векторизованная пространственная сетка (хэш ячеек) на NumPy.
+"""
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+# Ячеек сетки на ось при поиске без ограничения дистанции (стартовый размер)
+_START_CELLS = 32
+
+
+class SpatialIndex:
+    def __init__(self, points):
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        self._tree = cKDTree(self.points) if cKDTree is not None and len(self.points) else None
+
+    def nearest(self, queries, max_distance=np.inf):
+        """
+        Ближайшая точка индекса для каждого запроса.
+        :return: (индексы (Q,), дистанции (Q,)); -1 и inf, если ближе max_distance точки нет
+        """
+        queries = np.asarray(queries, dtype=np.float64).reshape(-1, 3)
+        idx = np.full(len(queries), -1, dtype=np.int64)
+        dist = np.full(len(queries), np.inf)
+        if not len(self.points) or not len(queries): return idx, dist
+
+        if self._tree is not None:
+            d, i = self._tree.query(queries, distance_upper_bound=max_distance)
+            found = np.isfinite(d)
+            idx[found], dist[found] = i[found], d[found]
+            return idx, dist
+
+        if np.isfinite(max_distance):
+            return self._grid_nearest(queries, max(max_distance, 1e-9))
+
+        # Без ограничения: расширяем ячейку, пока все запросы не найдут соседа
+        extent = np.ptp(np.vstack([self.points, queries]), axis=0).max()
+        radius = max(extent / _START_CELLS, 1e-6)
+        todo = np.arange(len(queries))
+        while len(todo):
+            i, d = self._grid_nearest(queries[todo], radius)
+            ok = i >= 0
+            idx[todo[ok]], dist[todo[ok]] = i[ok], d[ok]
+            todo = todo[~ok]
+            radius *= 2.0
+        return idx, dist
+
+    def _grid_nearest(self, queries, radius):
+        """Поиск в 27 соседних ячейках размера radius: находит все точки ближе radius."""
+        origin = np.minimum(self.points.min(axis=0), queries.min(axis=0)) - radius
+        src = np.floor((self.points - origin) / radius).astype(np.int64)
+        dst = np.floor((queries - origin) / radius).astype(np.int64)
+        dims = np.maximum(src.max(axis=0), dst.max(axis=0)) + 2
+
+        def cell_key(c):
+            return (c[:, 0] * dims[1] + c[:, 1]) * dims[2] + c[:, 2]
+
+        order = np.argsort(cell_key(src), kind="stable")
+        sorted_keys = cell_key(src)[order]
+
+        q_ids, p_ids = [], []
+        for offset in np.array(np.meshgrid([-1, 0, 1], [-1, 0, 1], [-1, 0, 1])).T.reshape(-1, 3):
+            keys = cell_key(dst + offset)
+            start = np.searchsorted(sorted_keys, keys, side="left")
+            counts = np.searchsorted(sorted_keys, keys, side="right") - start
+            total = counts.sum()
+            if not total: continue
+            rep = np.repeat(np.arange(len(queries)), counts)
+            shift = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            q_ids.append(rep)
+            p_ids.append(order[np.repeat(start, counts) + shift])
+
+        idx = np.full(len(queries), -1, dtype=np.int64)
+        dist = np.full(len(queries), np.inf)
+        if not q_ids: return idx, dist
+        q_ids, p_ids = np.concatenate(q_ids), np.concatenate(p_ids)
+        d = np.linalg.norm(queries[q_ids] - self.points[p_ids], axis=1)
+        within = d <= radius
+        q_ids, p_ids, d = q_ids[within], p_ids[within], d[within]
+
+        # Минимум по каждому запросу
+        sort = np.lexsort((d, q_ids))
+        q_ids, p_ids, d = q_ids[sort], p_ids[sort], d[sort]
+        first = np.ones(len(q_ids), dtype=bool)
+        first[1:] = q_ids[1:] != q_ids[:-1]
+        idx[q_ids[first]], dist[q_ids[first]] = p_ids[first], d[first]
+        return idx, dist
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Чистый (без Maya) решатель пружинной физики для цепей контролов.
+Работает на простых массивах, поэтому запускается в воркерах вне Maya.
+
+Соглашения Maya: матрицы 4x4 для вектор-строк (позиция в строке 3),
+вращение контрола собирается как RA * R * JO, порядок Эйлера xyz.
+"""
+import numpy as np
+
+
+def euler_to_matrix(rot_deg):
+    """Эйлер xyz (градусы) -> матрица 3x3 в соглашении Maya (Rx * Ry * Rz)."""
+    x, y, z = np.radians(rot_deg)
+    cx, sx, cy, sy, cz, sz = np.cos(x), np.sin(x), np.cos(y), np.sin(y), np.cos(z), np.sin(z)
+    rx = np.array([[1, 0, 0], [0, cx, sx], [0, -sx, cx]])
+    ry = np.array([[cy, 0, -sy], [0, 1, 0], [sy, 0, cy]])
+    rz = np.array([[cz, sz, 0], [-sz, cz, 0], [0, 0, 1]])
+    return rx @ ry @ rz
+
+
+def matrix_to_euler(mats):
+    """Матрицы (..., 3, 3) -> Эйлер xyz в градусах (..., 3)."""
+    m = np.asarray(mats)
+    y = np.arcsin(np.clip(-m[..., 0, 2], -1.0, 1.0))
+    x = np.arctan2(m[..., 1, 2], m[..., 2, 2])
+    z = np.arctan2(m[..., 0, 1], m[..., 0, 0])
+    return np.degrees(np.stack([x, y, z], axis=-1))
+
+
+def _orthonormal(m):
+    """Убирает масштаб и шир из матрицы вращения 3x3."""
+    u, _, vt = np.linalg.svd(m)
+    return u @ vt
+
+
+def _rotation_between(a, b):
+    """Минимальное вращение (3x3, вектор-строки), переводящее направление a в b."""
+    a = a / np.linalg.norm(a)
+    b = b / np.linalg.norm(b)
+    axis = np.cross(a, b)
+    s = np.linalg.norm(axis)
+    c = float(np.dot(a, b))
+    if s < 1e-9:
+        return np.eye(3)
+    k = axis / s
+    kx = np.array([[0, -k[2], k[1]], [k[2], 0, -k[0]], [-k[1], k[0], 0]])
+    # Формула Родрига для вектор-столбцов, транспонируем под вектор-строки
+    return (np.eye(3) + s * kx + (1.0 - c) * (kx @ kx)).T
+
+
+def _axis_angle(axis, angle):
+    """Вращение вокруг оси (3x3, вектор-строки)."""
+    k = axis / np.linalg.norm(axis)
+    kx = np.array([[0, -k[2], k[1]], [k[2], 0, -k[0]], [-k[1], k[0], 0]])
+    return (np.eye(3) + np.sin(angle) * kx + (1.0 - np.cos(angle)) * (kx @ kx)).T
+
+
+def _simulate(world, tip_offset, ratio, twist_ratio, state):
+    """
+    Один проход по кадрам. Возвращает мировые матрицы (F, N, 4, 4)
+    и конечное состояние (кончики и up-векторы костей).
+    """
+    frames, count = world.shape[:2]
+    sim = np.empty_like(world)
+    tips, ups = state
+
+    for f in range(frames):
+        w = world[f]
+        for i in range(count):
+            if i == 0:
+                base = w[0].copy()
+            else:
+                base = (w[i] @ np.linalg.inv(w[i - 1])) @ sim[f, i - 1]
+
+            if i < count - 1:
+                tip_local = (w[i + 1] @ np.linalg.inv(w[i]))[3, :3]
+            else:
+                tip_local = tip_offset
+            pos = base[3, :3]
+            anim_tip = np.append(tip_local, 1.0) @ base
+            anim_tip = anim_tip[:3]
+            length = np.linalg.norm(anim_tip - pos)
+
+            if tips[i] is None or length < 1e-9:
+                sim_tip = anim_tip
+            else:
+                sim_tip = tips[i] + (anim_tip - tips[i]) * ratio
+                direction = sim_tip - pos
+                norm = np.linalg.norm(direction)
+                sim_tip = pos + (direction / norm) * length if norm > 1e-9 else anim_tip
+
+            rot = _rotation_between(anim_tip - pos, sim_tip - pos) if length > 1e-9 else np.eye(3)
+            mat = base.copy()
+            mat[:3, :3] = base[:3, :3] @ rot
+
+            # Twist: запаздывание up-вектора вокруг оси кости
+            up = mat[1, :3] / np.linalg.norm(mat[1, :3])
+            if ups[i] is not None and length > 1e-9 and twist_ratio < 1.0:
+                aim = (sim_tip - pos) / np.linalg.norm(sim_tip - pos)
+                lag_up = ups[i] + (up - ups[i]) * twist_ratio
+                lag_up = lag_up - aim * np.dot(lag_up, aim)
+                cur_up = up - aim * np.dot(up, aim)
+                if np.linalg.norm(lag_up) > 1e-9 and np.linalg.norm(cur_up) > 1e-9:
+                    lag_up /= np.linalg.norm(lag_up)
+                    cur_up /= np.linalg.norm(cur_up)
+                    angle = np.arctan2(np.dot(np.cross(cur_up, lag_up), aim), np.dot(cur_up, lag_up))
+                    mat[:3, :3] = mat[:3, :3] @ _axis_angle(aim, angle)
+                    up = mat[1, :3] / np.linalg.norm(mat[1, :3])
+
+            sim[f, i] = mat
+            tips[i] = sim_tip
+            ups[i] = up
+    return sim, (tips, ups)
+
+
+def solve_chain(job):
+    """
+    Расчет одной задачи цепь x клип.
+
+    job -- словарь с ключами:
+        key          -- идентификатор задачи (возвращается как есть)
+        frames       -- номера кадров (F,)
+        world        -- мировые матрицы контролов цепи (F, N, 4, 4)
+        parent       -- мировые матрицы DAG-родителей контролов (F, N, 4, 4)
+        pre, post    -- статичные матрицы rotateAxis и jointOrient (N, 3, 3)
+        tip_offset   -- кончик последней кости в пространстве последнего контрола (3,)
+        spring, twist, is_loop -- параметры как в SpringMagic
+    Возвращает словарь {key, frames, rotate}, где rotate -- Эйлер xyz (F, N, 3).
+    """
+    world = np.asarray(job["world"], dtype=np.float64)
+    parent = np.asarray(job["parent"], dtype=np.float64)
+    pre = np.asarray(job["pre"], dtype=np.float64)
+    post = np.asarray(job["post"], dtype=np.float64)
+    tip_offset = np.asarray(job["tip_offset"], dtype=np.float64)
+    ratio = 1.0 - float(job["spring"])
+    twist_ratio = 1.0 - float(job["twist"])
+    count = world.shape[1]
+
+    state = ([None] * count, [None] * count)
+    if job.get("is_loop"):
+        # Прогревочный проход: цикл стартует из состояния конца клипа
+        _, state = _simulate(world, tip_offset, ratio, twist_ratio, state)
+    sim, _ = _simulate(world, tip_offset, ratio, twist_ratio, state)
+
+    frames = world.shape[0]
+    rotate = np.empty((frames, count, 3))
+    for i in range(count):
+        if i == 0:
+            sim_parent = parent[:, 0]
+        else:
+            offset = parent[:, i] @ np.linalg.inv(world[:, i - 1])
+            sim_parent = offset @ sim[:, i - 1]
+        local = sim[:, i] @ np.linalg.inv(sim_parent)
+        rot = np.array([_orthonormal(m[:3, :3]) for m in local])
+        rot = np.linalg.inv(pre[i]) @ rot @ np.linalg.inv(post[i])
+        euler = matrix_to_euler(rot)
+        rotate[:, i] = np.degrees(np.unwrap(np.radians(euler), axis=0))
+
+    return {"key": job["key"], "frames": np.asarray(job["frames"]), "rotate": rotate}
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Карта симметрии костей и контролов сцены.
+Позиции берутся в позе покоя (анимация не учитывается), поэтому карта не зависит
+от текущего кадра. Партнер по токену стороны в имени главнее: зеркальная позиция
+(SpatialIndex с допуском) его подтверждает, а расхождение попадает в conflicts и в
+предупреждение. Узлы без токена стороны сопоставляются по позиции.
+Результат кэшируется до изменения сцены (новая/открытая сцена, добавление, удаление,
+переименование или перенос узлов -- колбэки Maya), поиск партнера -- словарь.
+"""
+import re
+import numpy as np
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+from FD_FishTool.core import matrix_utils
+from FD_FishTool.core.spatial_index import SpatialIndex
+
+# Токен стороны -- отдельное слово между '_', ':' или '|' (не часть 'Brow' или 'FinSide1_R')
+_SIDE_TOKEN = re.compile(r"(?<![^_:|])(right|left|Right|Left|R|L)(?![^_:|])")
+_SWAP = {"right": "left", "left": "right", "Right": "Left", "Left": "Right", "R": "L", "L": "R"}
+
+# Допуск по умолчанию -- доля диагонали габарита узлов
+TOLERANCE_RATIO = 0.002
+
+_scene_cache = {}
+_callbacks = []
+
+
+def mirror_name(name):
+    """Зеркальное имя по правилам: 'mchFcrg_right_Brow1' -> 'mchFcrg_left_Brow1', 'Fin1_R' -> 'Fin1_L'."""
+    return _SIDE_TOKEN.sub(lambda m: _SWAP[m.group(1)], name)
+
+
+def _scene_nodes():
+    joints = cmds.ls(type="joint") or []
+    shapes = cmds.ls(type="nurbsCurve", ni=True, long=True) or []
+    ctrls = cmds.ls(list({s.rsplit("|", 1)[0] for s in shapes})) if shapes else []
+    return sorted(set(joints) | set(ctrls))
+
+
+def _invalidate(*args):
+    _scene_cache.clear()
+
+
+def _install_callbacks():
+    """Сброс кэша по событиям сцены вместо обхода всех узлов на каждом запросе."""
+    if _callbacks: return
+    _callbacks.extend([
+        om.MSceneMessage.addCallback(om.MSceneMessage.kAfterNew, _invalidate),
+        om.MSceneMessage.addCallback(om.MSceneMessage.kAfterOpen, _invalidate),
+        om.MNodeMessage.addNameChangedCallback(om.MObject.kNullObj, _invalidate),
+        om.MDagMessage.addParentAddedCallback(_invalidate),
+    ])
+    for node_type in ("joint", "nurbsCurve"):
+        _callbacks.append(om.MDGMessage.addNodeAddedCallback(_invalidate, node_type))
+        _callbacks.append(om.MDGMessage.addNodeRemovedCallback(_invalidate, node_type))
+
+
+def remove_callbacks():
+    if _callbacks: om.MMessage.removeCallbacks(_callbacks)
+    del _callbacks[:]
+    _invalidate()
+
+
+def get_symmetry_map(rebuild=False):
+    """Карта симметрии текущей сцены; пересобирается после изменения набора узлов (поза не влияет)."""
+    _install_callbacks()
+    if rebuild or "map" not in _scene_cache:
+        _scene_cache["map"] = SymmetryMap(_scene_nodes())
+    return _scene_cache["map"]
+
+
+class SymmetryMap:
+    def __init__(self, nodes, tolerance=None, axis=0):
+        self.nodes = [n for n in nodes if cmds.objExists(n)]
+        self.axis = axis
+        self.tolerance = tolerance
+        self.pairs = {}      # узел -> партнер (центральные узлы -- сами себе)
+        self.status = {}     # узел -> 'confirmed' | 'position' | 'name'
+        self.conflicts = []  # (узел, партнер по позиции или None, партнер по имени)
+        self.build()
+
+    def build(self):
+        self.pairs, self.status, self.conflicts = {}, {}, []
+        if not self.nodes: return
+        mats = matrix_utils.get_rest_matrices(self.nodes)
+        pos = np.array([[m[12], m[13], m[14]] for m in mats])
+        if self.tolerance is None:
+            self.tolerance = max(np.linalg.norm(np.ptp(pos, axis=0)) * TOLERANCE_RATIO, 1e-4)
+
+        mirrored = pos.copy()
+        mirrored[:, self.axis] *= -1.0
+        near, _ = SpatialIndex(pos).nearest(mirrored, self.tolerance)
+        by_short = {n.rsplit("|", 1)[-1]: i for i, n in enumerate(self.nodes)}
+
+        shorts = [n.rsplit("|", 1)[-1] for n in self.nodes]
+        # Пары по токену стороны: заняты именем, позиция их не перехватывает
+        by_name = {i: by_short[mirror_name(s)] for i, s in enumerate(shorts)
+                   if mirror_name(s) != s and mirror_name(s) in by_short}
+
+        for i, node in enumerate(self.nodes):
+            short = shorts[i]
+            has_side = mirror_name(short) != short
+            named = by_short.get(mirror_name(short))
+            spatial = near[i] if near[i] >= 0 and near[near[i]] == i else None
+            if spatial is not None and by_name.get(spatial, i) != i: spatial = None
+
+            if has_side and named is not None:
+                # Имя главнее позиции; несовпадение не переопределяет пару, а попадает в отчет
+                partner = named
+                if np.linalg.norm(mirrored[i] - pos[named]) <= self.tolerance:
+                    status = "confirmed"
+                else:
+                    status = "name"
+                    self.conflicts.append((node, self.nodes[spatial] if spatial is not None else None, self.nodes[named]))
+            elif spatial is not None:
+                partner, status = spatial, "confirmed" if spatial == named else "position"
+            elif named is not None:
+                partner, status = named, "name"
+            else:
+                continue
+            self.pairs[short] = self.nodes[partner].rsplit("|", 1)[-1]
+            self.status[short] = status
+
+        counts = {s: list(self.status.values()).count(s) for s in ("confirmed", "position", "name")}
+        print("SymmetryMap: {} узлов, пары: {} по позиции и имени, {} только по позиции, "
+              "{} только по имени, {} конфликтов.".format(len(self.nodes), counts["confirmed"],
+                                                         counts["position"], counts["name"], len(self.conflicts)))
+        if self.conflicts:
+            shown = ["{} -> {} (по позиции: {})".format(n, named, spatial) for n, spatial, named in self.conflicts[:5]]
+            cmds.warning("SymmetryMap: пары по имени не совпадают с зеркальной позицией: {}{}".format(
+                "; ".join(shown), " ..." if len(self.conflicts) > 5 else ""))
+
+    def partner(self, node):
+        """
+        Симметричный узел (короткое имя) или None. Центральный узел -- сам себе.
+        Узлы вне карты (не кости и не контролы) -- по токену стороны, если зеркальное имя есть в сцене.
+        """
+        short = node.rsplit("|", 1)[-1]
+        if short in self.pairs: return self.pairs[short]
+        swapped = mirror_name(short)
+        return swapped if swapped != short and cmds.objExists(swapped) else None
+
+    def is_center(self, node):
+        short = node.rsplit("|", 1)[-1]
+        return self.pairs.get(short) == short
@@ -7,12 +7,15 @@ import re
 import json
 import xml.etree.ElementTree as ET
 
+from FD_FishTool.core.scene_ops import scene_operation
+
 class FishValidator:
     def __init__(self, config_manager=None):
         self.cfg = config_manager
         self.errors = []
         self.success_log = []
 
+    @scene_operation("Validation", undo=False)
     def validate_all(self):
         self.errors = []
         self.success_log = []
@@ -1,6 +1,12 @@
 # -*- coding: utf-8 -*-
 import maya.cmds as cmds
 import maya.mel as mel
+import numpy as np
+
+from FD_FishTool.core.scene_ops import scene_operation
+from FD_FishTool.core import skin_weights
+from FD_FishTool.core.weight_store import WeightSnapshot
+from FD_FishTool.core.component_set import ComponentSet
 
 class WeightBlender:
     def __init__(self, rig_manager):
@@ -8,6 +14,7 @@ class WeightBlender:
         self.active_data = None
         self.vtx_limit = 1000
 
+    @scene_operation("Twin Machine: Start", undo=False, suspend_undo=True)
     def start_live_blend(self, mesh_name):
         """Подготовка: Безопасный сбор данных и инвертированная логика."""
         joints = cmds.ls(os=True, type='joint')
@@ -31,7 +38,7 @@ class WeightBlender:
         # Получаем облако вертексов
         vtxs1 = self.mgr.get_bone_island(sc, bn1)
         vtxs2 = self.mgr.get_bone_island(sc, bn2)
-        combined = list(vtxs1 | vtxs2)
+        combined = vtxs1 | vtxs2
         
         if not combined:
             cmds.warning("FD_FishTool: Облако вертексов пусто.")
@@ -40,14 +47,15 @@ class WeightBlender:
         if len(combined) > self.vtx_limit:
             combined = combined[:self.vtx_limit]
         
-        # Делаем слепок веса ВТОРОЙ кости (Blue/Right), чтобы движение вправо было положительным
-        snapshot = {v: cmds.skinPercent(sc, v, q=True, v=True, transform=bn2) for v in combined}
+        # Слепок весов облака одним чтением; тянем ВТОРУЮ кость (Blue/Right), движение вправо -- положительное
+        before = WeightSnapshot.capture(sc, combined.indices, mesh_name)
+        column = {n.split('|')[-1]: i for i, n in enumerate(before.influences)}
         
         # Изоляция
         active_panel = cmds.getPanel(withFocus=True)
         if "modelPanel" in active_panel:
             cmds.isolateSelect(active_panel, state=True)
-            cmds.select(combined, r=True)
+            combined.select()
             cmds.isolateSelect(active_panel, addSelected=True)
         
         # Настройка цвета
@@ -62,51 +70,127 @@ class WeightBlender:
         print(f"  > Target: {bn1} (Left) <-> {bn2} (Right)")
         
         self.active_data = {
-            "sc": sc, "bn1": bn1, "bn2": bn2, 
-            "vtxs": combined, "snapshot": snapshot,
+            "sc": sc, "mesh": mesh_name, "bn1": bn1, "bn2": bn2,
+            "c1": column[bn1.split('|')[-1]], "c2": column[bn2.split('|')[-1]],
+            "vtxs": combined, "indices": combined.indices, "before": before,
+            "locked": skin_weights.get_locked(before.influences), "panel": active_panel
+        }
+        return True
+
+    @scene_operation("Twin Machine: Chain Start", undo=False, suspend_undo=True)
+    def start_chain_blend(self, mesh_name):
+        """Режим цепи: упорядоченное выделение N костей, один слепок весов на все."""
+        joints = cmds.ls(os=True, type='joint')
+        if len(joints) < 2:
+            cmds.warning("FD_FishTool: Выделите цепь костей (минимум 2) по порядку.")
+            return False
+        sc = skin_weights.find_skin_cluster(mesh_name)
+        if not sc: return False
+
+        weights, influences = skin_weights.read_weights(sc)
+        column = {n.split('|')[-1]: i for i, n in enumerate(influences)}
+        missing = [j for j in joints if j.split('|')[-1] not in column]
+        if missing:
+            cmds.warning(f"FD_FishTool: Кости {missing} не влияют на этот скин. Операция отменена.")
+            return False
+        cols = np.array([column[j.split('|')[-1]] for j in joints])
+        vtxs = ComponentSet(mesh_name, np.nonzero(weights[:, cols].sum(axis=1) > 0)[0], assume_sorted=True)
+        if not len(vtxs):
+            cmds.warning("FD_FishTool: Облако вертексов пусто.")
+            return False
+
+        active_panel = cmds.getPanel(withFocus=True)
+        if "modelPanel" in active_panel:
+            cmds.isolateSelect(active_panel, state=True)
+            vtxs.select()
+            cmds.isolateSelect(active_panel, addSelected=True)
+
+        shape = cmds.listRelatives(mesh_name, s=True)[0]
+        cmds.setAttr(f"{shape}.displayColors", 1)
+        cmds.polyOptions(colorShadedDisplay=True)
+        mel.eval('polyOptions -sizeVertex 10')
+        cmds.select(cl=True)
+
+        print("\n" + "="*50)
+        print(f"FD_FishTool: TWIN MACHINE CHAIN ACTIVATED")
+        print(f"  > Chain: {' -> '.join(j.split('|')[-1] for j in joints)} | Vtx: {len(vtxs)}")
+
+        # Соседи цепи обмениваются весом, только если обе кости не заблокированы
+        locked = skin_weights.get_locked([influences[c] for c in cols])
+        free = ~(locked[:-1] | locked[1:])
+
+        self.active_data = {
+            "mode": "chain", "sc": sc, "mesh": mesh_name, "joints": joints, "cols": cols,
+            "vtxs": vtxs, "indices": vtxs.indices, "free": free,
+            "before": WeightSnapshot(sc, vtxs.indices, weights[vtxs.indices], influences, mesh_name),
             "panel": active_panel
         }
         return True
 
+    def _update_chain_blend(self, offset):
+        """Сдвиг доли веса каждой кости цепи к следующей (offset > 0) или предыдущей (offset < 0)."""
+        d = self.active_data
+        rows = d["before"].weights.astype(np.float64)
+        chain = rows[:, d["cols"]]
+        o = max(-1.0, min(1.0, offset))
+        new = chain.copy()
+        if o >= 0:
+            moved = chain[:, :-1] * (o * d["free"])
+            new[:, :-1] -= moved; new[:, 1:] += moved
+        else:
+            moved = chain[:, 1:] * (-o * d["free"])
+            new[:, 1:] -= moved; new[:, :-1] += moved
+        rows[:, d["cols"]] = new
+        skin_weights.write_weights(d["sc"], rows, d["indices"])
+
+        # Цвет -- положение «центра масс» веса вдоль цепи: красный (начало) -> синий (конец)
+        total = new.sum(axis=1)
+        t = (new * np.arange(new.shape[1])).sum(axis=1) / np.where(total > 0, total, 1.0) / (new.shape[1] - 1)
+        rgb = np.stack([(1.0 - t) * 0.9, np.full_like(t, 0.05), t * 0.9], axis=1)
+        skin_weights.set_vertex_colors(d["mesh"], d["indices"], rgb)
+        print(f"  [Twin Chain] Offset: {offset:+.2f} | Vtx: {len(d['indices'])}")
+
+    @scene_operation("Twin Machine: Blend", undo=False, suspend_undo=True, suspend_refresh=False, log=False)
     def update_live_blend(self, offset):
         """Обновление: Прямая зависимость - тянешь вправо, BN2 растет."""
         if not self.active_data: return
+        if self.active_data.get("mode") == "chain": return self._update_chain_blend(offset)
         d = self.active_data
-        
-        changed_count = 0
-        for v in d["vtxs"]:
-            # Берем сохраненный вес BN2
-            orig_w2 = d["snapshot"][v]
-            # Новое значение BN2: тянем слайдер вправо (offset > 0) -> BN2 увеличивается
-            new_w2 = max(0.0, min(1.0, orig_w2 + offset))
-            
-            # Проверка на изменения
-            if abs(new_w2 - orig_w2) < 0.001 and (new_w2 == 1.0 or new_w2 == 0.0):
-                continue
-                
-            # Применяем вес к BN2. Maya сама вычтет его у BN1 при нормализации
-            cmds.skinPercent(d["sc"], v, tv=[(d["bn2"], new_w2)], nrm=True)
-            self._apply_smart_color(v, new_w2, offset)
-            changed_count += 1
-
-        print(f"  [Twin] Target: {d['bn2']} | Offset: {offset:+.2f} | Vtx: {changed_count}")
-
-    def _apply_smart_color(self, vtx, w2, offset):
+        rows = d["before"].weights.astype(np.float64)
+
+        # Новое значение BN2: тянем слайдер вправо (offset > 0) -> BN2 увеличивается,
+        # остаток нормализуется как в skinPercent -nrm (BN1 забирает, если других весов нет)
+        new_w2 = rows[:, d["c2"]] + offset
+        rows = skin_weights.set_influence_weight(rows, d["c2"], new_w2, fallback=d["c1"], locked=d["locked"])
+        skin_weights.write_weights(d["sc"], rows, d["indices"])
+        self._apply_smart_color(rows[:, d["c1"]], rows[:, d["c2"]], offset)
+
+        print(f"  [Twin] Target: {d['bn2']} | Offset: {offset:+.2f} | Vtx: {len(d['indices'])}")
+
+    def _apply_smart_color(self, w1, w2, offset):
         """Интуитивная раскраска: Яркость кости, к которой тянем."""
-        if offset >= 0: # Тянем к BN2 (Синий)
-            # w2 - текущий вес синей кости. Темнее при 1.0
-            brightness = 1.0 - (w2 * 0.7)
-            cmds.polyColorPerVertex(vtx, rgb=(0.05, 0.05, w2 * brightness))
+        d = self.active_data
+        zeros = np.full_like(w2, 0.05)
+        if offset >= 0: # Тянем к BN2 (Синий), темнее при 1.0
+            rgb = np.stack([zeros, zeros, w2 * (1.0 - w2 * 0.7)], axis=1)
         else: # Тянем к BN1 (Красный)
-            w1 = 1.0 - w2 # Вес красной кости
-            brightness = 1.0 - (w1 * 0.7)
-            cmds.polyColorPerVertex(vtx, rgb=(w1 * brightness, 0.05, 0.05))
+            rgb = np.stack([w1 * (1.0 - w1 * 0.7), zeros, zeros], axis=1)
+        skin_weights.set_vertex_colors(d["mesh"], d["indices"], rgb)
 
+    @scene_operation("Twin Machine: Stop", undo=False, suspend_undo=True)
     def stop_live_blend(self):
+        """
+        Весь drag (старт, тики, стоп) идет мимо undo Maya и ложится одной записью
+        в историю весов -- откат кнопкой Weights Undo.
+        """
         if not self.active_data: return
-        if "modelPanel" in self.active_data["panel"]:
-            cmds.isolateSelect(self.active_data["panel"], state=False)
+        d = self.active_data
+        after = WeightSnapshot.capture(d["sc"], d["indices"], d["mesh"])
+        if not np.array_equal(after.weights, d["before"].weights):
+            self.mgr.weight_history.push("Twin Machine", d["before"], after)
+        if "modelPanel" in d["panel"]:
+            cmds.isolateSelect(d["panel"], state=False)
         mel.eval('polyOptions -sizeVertex 3')
-        cmds.polyColorPerVertex(self.active_data["vtxs"], remove=True)
-        print("FD_FishTool: TWIN COMPLETE.\n" + "="*50)
+        cmds.polyColorPerVertex(d["vtxs"].to_components(), remove=True)
+        print("FD_FishTool: TWIN COMPLETE (отмена -- Weights Undo, Ctrl+Z Maya не откатывает веса).\n" + "="*50)
         self.active_data = None
\ No newline at end of file
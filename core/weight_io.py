@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Экспорт/импорт весов skinCluster в бинарный файл (.fdsw), читаемый через np.memmap.
+Формат: заголовок '<4sII' (магия, версия, длина JSON) + JSON {mesh, skin, vertices, influences}
++ выравнивание до 64 байт + матрица весов float32 (V x I, C-порядок, little-endian).
+Импорт сопоставляет инфлюенсы по имени или алиасу (bone_aliases.json) и пишет одним вызовом.
+"""
+import json
+import os
+import struct
+import numpy as np
+import maya.cmds as cmds
+
+from FD_FishTool.core import skin_weights
+
+MAGIC = b"FDSW"
+VERSION = 1
+ALIGN = 64
+_HEAD = struct.Struct("<4sII")
+
+
+def export_weights(skin, path):
+    """Полная матрица весов скина в файл. :return: метаданные"""
+    weights, influences = skin_weights.read_weights(skin)
+    geo = cmds.skinCluster(skin, q=True, g=True) or [""]
+    meta = {"mesh": geo[0], "skin": skin, "vertices": int(weights.shape[0]), "influences": influences}
+    blob = json.dumps(meta).encode("utf-8")
+    offset = -(-(_HEAD.size + len(blob)) // ALIGN) * ALIGN
+    with open(path, "wb") as f:
+        f.write(_HEAD.pack(MAGIC, VERSION, len(blob)))
+        f.write(blob)
+        f.write(b"\0" * (offset - _HEAD.size - len(blob)))
+        f.write(weights.astype("<f4").tobytes())
+    return meta
+
+
+def read_header(path):
+    """:return: (метаданные, смещение матрицы в байтах)"""
+    with open(path, "rb") as f:
+        magic, version, size = _HEAD.unpack(f.read(_HEAD.size))
+        if magic != MAGIC:
+            raise ValueError("weight_io: {} -- не файл весов FDSW".format(path))
+        if version > VERSION:
+            raise ValueError("weight_io: версия файла {} новее поддерживаемой {}".format(version, VERSION))
+        meta = json.loads(f.read(size).decode("utf-8"))
+    return meta, -(-(_HEAD.size + size) // ALIGN) * ALIGN
+
+
+def load_weights(path):
+    """:return: (матрица весов (V, I) как np.memmap только для чтения, метаданные)"""
+    meta, offset = read_header(path)
+    shape = (meta["vertices"], len(meta["influences"]))
+    if not shape[0] or not shape[1]:
+        return np.zeros(shape, dtype="<f4"), meta
+    return np.memmap(path, dtype="<f4", mode="r", offset=offset, shape=shape), meta
+
+
+def _key(name):
+    return name.split("|")[-1].split(":")[-1].lower()
+
+
+def alias_groups(aliases):
+    """bone_aliases.json {канон: [варианты]} -> {имя: канон} (в нижнем регистре)."""
+    groups = {}
+    for canon, variants in (aliases or {}).items():
+        for name in [canon] + list(variants):
+            groups[_key(name)] = _key(canon)
+    return groups
+
+
+def match_influences(source, target, aliases=None):
+    """
+    Сопоставление имен файла и скина: точное имя, затем имя без пространства имен/регистра, затем алиас.
+    :return: {индекс в source: индекс в target}
+    """
+    groups = alias_groups(aliases)
+    exact = {n: i for i, n in enumerate(target)}
+    by_key = {}
+    by_alias = {}
+    for i, n in enumerate(target):
+        by_key.setdefault(_key(n), i)
+        by_alias.setdefault(groups.get(_key(n), _key(n)), i)
+    result = {}
+    for i, n in enumerate(source):
+        j = exact.get(n, by_key.get(_key(n), by_alias.get(groups.get(_key(n), _key(n)))))
+        if j is not None: result[i] = j
+    return result
+
+
+def import_weights(skin, path, aliases=None):
+    """
+    Импорт весов из файла в скин одной записью. Недостающие кости, существующие в сцене,
+    добавляются в скин; веса несопоставленных костей отбрасываются с нормализацией.
+    Запись идет мимо undo Maya -- вызывать с выключенным undo, откат через историю весов.
+    :return: отчет; "weights" -- записанная (нормализованная) матрица
+    """
+    data, meta = load_weights(path)
+    geo = cmds.skinCluster(skin, q=True, g=True)[0]
+    count = cmds.polyEvaluate(geo, vertex=True)
+    if count != meta["vertices"]:
+        raise ValueError("weight_io: в файле {} вершин, в меше {} -- {}".format(meta["vertices"], geo, count))
+
+    names = meta["influences"]
+    groups = alias_groups(aliases)
+    matched = match_influences(names, skin_weights.get_influences(skin), aliases)
+    # Кости из файла, которых нет в скине, но они есть в сцене (по имени или алиасу)
+    scene = {_key(j): j for j in cmds.ls(type="joint") or []}
+    for canon, j in list(scene.items()): scene.setdefault(groups.get(canon, canon), j)
+    want = [scene.get(_key(n), scene.get(groups.get(_key(n), _key(n)))) for i, n in enumerate(names) if i not in matched]
+    added = skin_weights.add_influences(skin, [j for j in want if j])
+    target = skin_weights.get_influences(skin)
+    if added: matched = match_influences(names, target, aliases)
+
+    src = np.array(sorted(matched), dtype=np.int64)
+    dst = np.array([matched[i] for i in src], dtype=np.int64)
+    out = np.zeros((count, len(target)))
+    # Несколько костей файла могут прийти в одну кость скина (алиасы) -- складываем
+    np.add.at(out, (slice(None), dst), np.asarray(data[:, src], dtype=np.float64))
+    out = skin_weights.normalize_rows(out)
+    skin_weights.write_weights(skin, out)
+    dropped = [names[i] for i in range(len(names)) if i not in matched]
+    return {"vertices": count, "matched": len(matched), "added": added, "dropped": dropped, "weights": out,
+            "influences": target}
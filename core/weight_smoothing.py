@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Сглаживание весов по топологии меша (Laplacian / Taubin) на всей матрице сразу.
+Соседи -- CSR-массивы из списка ребер, среднее по соседям -- np.add.reduceat.
+Заблокированные инфлюенсы не меняются, остальные нормализуются к остатку веса.
+"""
+import numpy as np
+
+# Taubin: шаг сглаживания и обратный шаг, компенсирующий «усадку» весов
+TAUBIN_MU = -0.53
+
+
+def build_neighbors(edges, vertex_count):
+    """CSR-соседство: (indptr (V+1,), соседи)."""
+    src = np.concatenate([edges[:, 0], edges[:, 1]])
+    dst = np.concatenate([edges[:, 1], edges[:, 0]])
+    order = np.argsort(src, kind="stable")
+    counts = np.bincount(src, minlength=vertex_count)
+    return np.concatenate([[0], np.cumsum(counts)]), dst[order]
+
+
+def _neighbor_mean(weights, indptr, neighbors):
+    counts = np.diff(indptr)
+    has = counts > 0
+    mean = weights.copy()
+    if neighbors.size:
+        sums = np.add.reduceat(weights[neighbors], indptr[:-1][has], axis=0)
+        mean[has] = sums / counts[has, None]
+    return mean
+
+
+def smooth_weights(weights, indptr, neighbors, iterations=3, factor=0.5, taubin=True,
+                   locked=None, mask=None, max_influences=4):
+    """
+    :param weights: (V, I) матрица весов
+    :param locked: (I,) bool -- заблокированные инфлюенсы
+    :param mask: индексы вершин, которые можно менять (None -- все)
+    :return: новая матрица (V, I)
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    count = weights.shape[1]
+    locked = np.zeros(count, dtype=bool) if locked is None else np.asarray(locked, dtype=bool)
+    rows = np.arange(len(weights)) if mask is None else np.asarray(mask, dtype=np.int64)
+    free = ~locked
+    result = weights.copy()
+
+    # Считаем только по свободным ненулевым столбцам: пустой столбец сглаживание не заполнит
+    cols = np.nonzero(free & (weights > 0).any(axis=0))[0]
+    work = result[:, cols]
+    steps = [factor, TAUBIN_MU] if taubin else [factor]
+    for _ in range(iterations):
+        for step in steps:
+            mean = _neighbor_mean(work, indptr, neighbors)
+            work[rows] = np.clip(work[rows] + step * (mean[rows] - work[rows]), 0.0, None)
+    result[:, cols] = work
+
+    out = result[rows]
+    if max_influences and count > max_influences:
+        # Заблокированные ненулевые веса всегда остаются в наборе
+        rank = np.where(locked[None, :] & (out > 0), np.inf, out)
+        drop = np.argpartition(rank, -max_influences, axis=1)[:, :-max_influences]
+        np.put_along_axis(out, drop, 0.0, axis=1)
+
+    # Нормализация свободных весов к остатку после заблокированных
+    locked_sum = weights[rows][:, locked].sum(axis=1)
+    out[:, locked] = weights[rows][:, locked]
+    free_sum = out[:, free].sum(axis=1)
+    target = np.clip(1.0 - locked_sum, 0.0, 1.0)
+    scale = np.where(free_sum > 0, target / np.where(free_sum > 0, free_sum, 1.0), 0.0)
+    out[:, free] *= scale[:, None]
+    result[rows] = out
+    return result
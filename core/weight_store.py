@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Компактные слепки весов и история инструментов весов.
+Слепок -- индексы вершин (int32) и срез матрицы весов (float32), снимается одним
+чтением и возвращается одной записью. История -- кольцо пар «до/после» с лимитом памяти:
+undo/redo инструмента возвращает весь drag одной записью, не засоряя undo Maya.
+Веса пишутся через API мимо undo Maya, поэтому операции с историей идут с выключенным
+undo (scene_operation(suspend_undo=True)), а добавление инфлюенсов и создание скина
+откатывает сама история: слепок приводит к себе состав инфлюенсов, UnboundSnapshot снимает скин.
+"""
+from collections import deque
+import numpy as np
+import maya.cmds as cmds
+
+from FD_FishTool.core import skin_weights
+
+DEFAULT_HISTORY_BYTES = 64 * 1024 * 1024
+
+
+class WeightSnapshot:
+    __slots__ = ("skin", "vertices", "weights", "influences", "mesh")
+
+    def __init__(self, skin, vertices, weights, influences, mesh=None):
+        """:param mesh: меш скина -- чтобы пересоздать скин, если его сняли откатом"""
+        self.skin = skin
+        self.vertices = np.ascontiguousarray(vertices, dtype=np.int32)
+        self.weights = np.ascontiguousarray(weights, dtype=np.float32)
+        self.influences = tuple(influences)
+        self.mesh = mesh
+
+    @classmethod
+    def capture(cls, skin, vertices=None, mesh=None):
+        weights, influences = skin_weights.read_weights(skin, vertices)
+        if vertices is None: vertices = np.arange(len(weights))
+        return cls(skin, vertices, weights, influences, mesh)
+
+    @property
+    def nbytes(self):
+        return self.vertices.nbytes + self.weights.nbytes
+
+    def restore(self):
+        """
+        Одна запись весов по именам инфлюенсов. Недостающие инфлюенсы добавляются,
+        лишние (без веса после записи) убираются; снятый скин создается заново.
+        False, если кость слепка пропала из сцены.
+        """
+        if not all(cmds.objExists(n) for n in self.influences) or not (
+                cmds.objExists(self.skin) or (self.mesh and cmds.objExists(self.mesh))):
+            print("FD_FishTool: Слепок весов {} устарел (нет костей или меша).".format(self.skin))
+            return False
+        if not cmds.objExists(self.skin):
+            cmds.skinCluster(list(self.influences), self.mesh, tsb=True, nw=1, rui=False, n=self.skin)
+        else:
+            skin_weights.add_influences(self.skin, self.influences)
+
+        current = skin_weights.get_influences(self.skin)
+        column = {n: i for i, n in enumerate(current)}
+        weights = np.zeros((len(self.vertices), len(current)))
+        weights[:, [column[n] for n in self.influences]] = self.weights
+        skin_weights.write_weights(self.skin, weights, self.vertices)
+
+        keep = set(self.influences)
+        extra = [i for i, n in enumerate(current) if n not in keep]
+        if extra:
+            full, _ = skin_weights.read_weights(self.skin)
+            unused = [current[i] for i in extra if not full[:, i].any()]
+            if unused: cmds.skinCluster(self.skin, edit=True, ri=unused)
+        return True
+
+
+class UnboundSnapshot:
+    """Состояние «у меша нет скина» -- «до» для операций, создавших skinCluster."""
+    nbytes = 0
+
+    def __init__(self, mesh):
+        self.mesh = mesh
+
+    def restore(self):
+        skin = skin_weights.find_skin_cluster(self.mesh) if cmds.objExists(self.mesh) else None
+        if skin: cmds.skinCluster(skin, edit=True, ub=True)
+        return True
+
+
+class WeightHistory:
+    def __init__(self, max_bytes=DEFAULT_HISTORY_BYTES):
+        self.max_bytes = max_bytes
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self.nbytes = 0
+
+    def push(self, label, before, after):
+        for _, b, a in self.redo_stack: self.nbytes -= b.nbytes + a.nbytes
+        self.redo_stack = []
+        self.undo_stack.append((label, before, after))
+        self.nbytes += before.nbytes + after.nbytes
+        while self.nbytes > self.max_bytes and len(self.undo_stack) > 1:
+            _, b, a = self.undo_stack.popleft()
+            self.nbytes -= b.nbytes + a.nbytes
+
+    def undo(self):
+        if not self.undo_stack: return None
+        entry = self.undo_stack.pop()
+        if not entry[1].restore():
+            self.nbytes -= entry[1].nbytes + entry[2].nbytes
+            return None
+        self.redo_stack.append(entry)
+        return entry[0]
+
+    def redo(self):
+        if not self.redo_stack: return None
+        entry = self.redo_stack.pop()
+        if not entry[2].restore():
+            self.nbytes -= entry[1].nbytes + entry[2].nbytes
+            return None
+        self.undo_stack.append(entry)
+        return entry[0]
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack = []
+        self.nbytes = 0
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Перенос весов между мешами (LOD, варианты) по ближайшей точке поверхности.
+Для каждой вершины цели: ближайшая вершина источника (SpatialIndex) -> ближайшая точка
+на смежных с ней треугольниках -> барицентрическая смесь строк весов.
+Все шаги векторизованы, запись в skinCluster цели -- один вызов.
+"""
+import numpy as np
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+from FD_FishTool.core import skin_weights
+from FD_FishTool.core.spatial_index import SpatialIndex
+from FD_FishTool.core.weight_store import WeightSnapshot, UnboundSnapshot
+
+MAX_INFLUENCES = 4
+
+
+def closest_point_barycentric(p, a, b, c):
+    """
+    Ближайшая точка треугольника (Ericson, Real-Time Collision Detection), векторно.
+    :return: (барицентрические координаты (N, 3), дистанции (N,))
+    """
+    ab, ac = b - a, c - a
+    ap, bp, cp = p - a, p - b, p - c
+    dot = lambda x, y: np.einsum("ij,ij->i", x, y)
+    d1, d2 = dot(ab, ap), dot(ac, ap)
+    d3, d4 = dot(ab, bp), dot(ac, bp)
+    d5, d6 = dot(ab, cp), dot(ac, cp)
+    va, vb, vc = d3 * d6 - d5 * d4, d5 * d2 - d1 * d6, d1 * d4 - d3 * d2
+
+    def safe(num, den):
+        return num / np.where(np.abs(den) > 1e-12, den, 1.0)
+
+    # Внутренность, затем области по возрастанию приоритета (последняя запись побеждает)
+    denom = va + vb + vc
+    v, w = safe(vb, denom), safe(vc, denom)
+    bary = np.stack([1.0 - v - w, v, w], axis=1)
+
+    t = safe(d4 - d3, (d4 - d3) + (d5 - d6))
+    m = (va <= 0) & (d4 - d3 >= 0) & (d5 - d6 >= 0)
+    bary[m] = np.stack([np.zeros_like(t), 1.0 - t, t], axis=1)[m]
+    t = safe(d2, d2 - d6)
+    m = (vb <= 0) & (d2 >= 0) & (d6 <= 0)
+    bary[m] = np.stack([1.0 - t, np.zeros_like(t), t], axis=1)[m]
+    m = (d6 >= 0) & (d5 <= d6)
+    bary[m] = (0.0, 0.0, 1.0)
+    t = safe(d1, d1 - d3)
+    m = (vc <= 0) & (d1 >= 0) & (d3 <= 0)
+    bary[m] = np.stack([1.0 - t, t, np.zeros_like(t)], axis=1)[m]
+    m = (d3 >= 0) & (d4 <= d3)
+    bary[m] = (0.0, 1.0, 0.0)
+    m = (d1 <= 0) & (d2 <= 0)
+    bary[m] = (1.0, 0.0, 0.0)
+
+    closest = bary[:, :1] * a + bary[:, 1:2] * b + bary[:, 2:] * c
+    return bary, np.linalg.norm(p - closest, axis=1)
+
+
+def prune_influences(weights, max_influences=MAX_INFLUENCES):
+    """Оставляет max_influences крупнейших весов в строке и нормализует."""
+    if weights.shape[1] > max_influences:
+        drop = np.argpartition(weights, -max_influences, axis=1)[:, :-max_influences]
+        np.put_along_axis(weights, drop, 0.0, axis=1)
+    return skin_weights.normalize_rows(weights)
+
+
+class WeightTransfer:
+    def __init__(self, source):
+        self.source = source
+        self.skin = skin_weights.find_skin_cluster(source)
+        if not self.skin:
+            raise RuntimeError("WeightTransfer: у {} нет skinCluster".format(source))
+        self.points = skin_weights.get_bind_points(source, om.MSpace.kWorld)
+        self.triangles = skin_weights.get_triangles(source)
+        self.weights, self.influences = skin_weights.read_weights(self.skin)
+        self.index = SpatialIndex(self.points)
+
+        # Смежность вершина -> треугольники (CSR)
+        flat = self.triangles.ravel()
+        self.vtx_tris = np.argsort(flat, kind="stable") // 3
+        self.vtx_ptr = np.concatenate([[0], np.cumsum(np.bincount(flat, minlength=len(self.points)))])
+
+    def sample(self, points):
+        """Веса источника в точках: (строки весов (N, I), дистанции до поверхности (N,))."""
+        nearest, near_dist = self.index.nearest(points)
+        start, end = self.vtx_ptr[nearest], self.vtx_ptr[nearest + 1]
+        counts = end - start
+        rows = np.repeat(np.arange(len(points)), counts)
+        shift = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        tris = self.triangles[self.vtx_tris[np.repeat(start, counts) + shift]]
+
+        a, b, c = (self.points[tris[:, k]] for k in range(3))
+        bary, dist = closest_point_barycentric(points[rows], a, b, c)
+
+        # Лучший треугольник для каждой точки
+        order = np.lexsort((dist, rows))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = rows[order][1:] != rows[order][:-1]
+        best = order[first]
+
+        # Вершины без треугольников -- веса ближайшей вершины
+        result, out_dist = self.weights[nearest].copy(), near_dist.copy()
+        tri, bc, hit = tris[best], bary[best], rows[best]
+        result[hit] = (bc[:, :1] * self.weights[tri[:, 0]] + bc[:, 1:2] * self.weights[tri[:, 1]]
+                       + bc[:, 2:] * self.weights[tri[:, 2]])
+        out_dist[hit] = dist[best]
+        return result, out_dist
+
+    def apply(self, target, max_influences=MAX_INFLUENCES):
+        """
+        Перенос на меш цели одной записью.
+        :return: отчет; "before"/"after" -- слепки цели для истории весов: «до» снят до создания
+                 скина и добавления инфлюенсов, откат возвращает и их
+        """
+        points = skin_weights.get_bind_points(target, om.MSpace.kWorld)
+        weights, dist = self.sample(points)
+        weights = prune_influences(weights, max_influences)
+
+        used = [self.influences[i] for i in np.nonzero(weights.max(axis=0) > 0)[0]]
+        skin = skin_weights.find_skin_cluster(target)
+        added = []
+        if not skin:
+            before = UnboundSnapshot(target)
+            skin = cmds.skinCluster(used, target, tsb=True, bm=0, nw=1, mi=max_influences, omi=True, rui=False)[0]
+        else:
+            before = WeightSnapshot.capture(skin, mesh=target)
+            added = skin_weights.add_influences(skin, used)
+
+        target_infs = skin_weights.get_influences(skin)
+        column = {n: i for i, n in enumerate(target_infs)}
+        out = np.zeros((len(points), len(target_infs)))
+        src_cols = [i for i, n in enumerate(self.influences) if n in column]
+        out[:, [column[self.influences[i]] for i in src_cols]] = weights[:, src_cols]
+        out = skin_weights.normalize_rows(out)
+        skin_weights.write_weights(skin, out)
+        return {"vertices": len(points), "added": added, "max_distance": float(dist.max()) if len(dist) else 0.0,
+                "before": before, "after": WeightSnapshot(skin, np.arange(len(points)), out, target_infs, target)}
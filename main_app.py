@@ -11,6 +11,8 @@ from maya import cmds
 
 # Импорты компонентов нашего фреймворка
 from FD_FishTool.core.config_manager import ConfigManager
+from FD_FishTool.core import instrumentation
+from FD_FishTool.core import symmetry_map
 from FD_FishTool.ui.main_window import FD_MainWindow
 
 # Уникальный идентификатор окна для Maya UI
@@ -37,6 +39,9 @@ def close_existing_window():
     if cmds.dockControl(WINDOW_ID + "_dock", exists=True):
         cmds.deleteUI(WINDOW_ID + "_dock", control=True)
 
+    # Колбэки сцены (кэш карты симметрии) ставятся заново при первом запросе
+    symmetry_map.remove_callbacks()
+
 def run():
     """
     Основная функция запуска инструмента.
@@ -46,7 +51,8 @@ def run():
 
     # 2. Инициализируем конфиг (он подгрузит data/paths.json и bone_map.json)
     try:
-        cfg = ConfigManager()
+        with instrumentation.phase("Startup: Config"):
+            cfg = ConfigManager()
     except Exception as e:
         cmds.error(f"FD_FishTool: Ошибка при загрузке конфигурации: {e}")
         return
@@ -56,11 +62,13 @@ def run():
     global fd_fish_tool_window 
     
     parent_window = get_maya_window()
-    fd_fish_tool_window = FD_MainWindow(config=cfg, parent=parent_window)
-    fd_fish_tool_window.setObjectName(WINDOW_ID)
+    with instrumentation.phase("Startup: Window Build"):
+        fd_fish_tool_window = FD_MainWindow(config=cfg, parent=parent_window)
+        fd_fish_tool_window.setObjectName(WINDOW_ID)
 
     # 4. Отображаем инструмент
-    fd_fish_tool_window.show()
+    with instrumentation.phase("Startup: Show"):
+        fd_fish_tool_window.show()
     
     print("FD_FishTool: Приложение успешно инициализировано и запущено.")
 
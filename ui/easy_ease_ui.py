@@ -48,6 +48,12 @@ class EasyEaseWidget(QtWidgets.QWidget):
         self.ease_slider.sliderMoved.connect(self._on_move)
         self.ease_slider.sliderReleased.connect(self._on_release)
         layout.addWidget(self.ease_slider)
+        undo_row = QtWidgets.QHBoxLayout()
+        undo_hint = QtWidgets.QLabel("↶ Отмена drag (Ctrl+Z Maya веса не откатывает):")
+        undo_hint.setStyleSheet("color: #999;")
+        btn_undo = QtWidgets.QPushButton("Weights Undo"); btn_undo.clicked.connect(lambda: self.engine.mgr.undo_weights())
+        undo_row.addWidget(undo_hint); undo_row.addStretch(); undo_row.addWidget(btn_undo)
+        layout.addLayout(undo_row)
 
     def _show_help_dialog(self):
         """Окно с описанием инструмента."""
@@ -66,6 +72,8 @@ class EasyEaseWidget(QtWidgets.QWidget):
             "<b>3. Веса:</b><br>"
             "• Забор веса не привязан к 1.0. Скрипт меняет текущее состояние скиннинга.<br>"
             "• Благодаря нормализации (nrm=True), добавление веса одной кости пропорционально забирает его у других.<br><br>"
+            "<b>4. Отмена:</b><br>"
+            "• Весь drag -- одна запись истории весов: откат кнопкой Weights Undo. Ctrl+Z Maya веса не откатывает.<br><br>"
             "<b>Итог:</b> Позволяет растягивать или сжимать границы скиннинга, не ломая существующую работу."
         )
         QtWidgets.QMessageBox.information(self, "Easy Ease Info", text)
@@ -5,39 +5,48 @@ import importlib
 from PySide2 import QtWidgets, QtCore, QtGui
 import maya.cmds as cmds
 
+from FD_FishTool.core import instrumentation
 
-# Импорты ядра
-from FD_FishTool.core.meta_exporter import BoneNamePreparing
-from FD_FishTool.core.validator import FishValidator
-from FD_FishTool.core.anim_handler import AnimSyncManager
-from FD_FishTool.core.anim_manager import AnimManager
-from FD_FishTool.core.physics_manager import PhysicsManager
-from FD_FishTool.ui.rig_face_ui import FaceRigTab
-
-
-# Импорты UI (Абсолютные пути для исключения ModuleNotFoundError)
-from FD_FishTool.ui.spring_selector import SpringSelectorWindow
-from FD_FishTool.ui.rig_body_ui import RigBodyWidget
+# Модули ядра и вкладок импортируются при первом обращении (абсолютные пути FD_FishTool.*):
+# окно открывается без pymel/SpringMagic/OpenMaya, каждая вкладка платит за себя сама.
 
 class FD_MainWindow(QtWidgets.QMainWindow):
     def __init__(self, config, parent=None):
         super(FD_MainWindow, self).__init__(parent)
         self.cfg = config
-        self.validator = FishValidator(self.cfg)
-        self.anim_mgr = AnimManager(self.cfg) 
-        self.physics_mgr = PhysicsManager(self.cfg)
-        
-        # Подготовка костей для ренейма
-        bone_map = self.cfg.load_json("bone_map.json")
-        self.bone_preparer = BoneNamePreparing(bone_map)
+        self._subsystems = {}
+        self._tab_builders = {}  # индекс вкладки -> построитель содержимого
         
         self.setWindowTitle("FD_FishTool v2.1 | Rigging Master")
         self.setMinimumSize(500, 850)
         
         self.init_ui()
-        self.refresh_anim_list()
-        self.face_tab = FaceRigTab()
-        self.tabs.addTab(self.face_tab, "Face Rig")
+
+    # --- Подсистемы (ленивое создание) ---
+    def _subsystem(self, name, factory):
+        if name not in self._subsystems: self._subsystems[name] = factory()
+        return self._subsystems[name]
+
+    @property
+    def validator(self):
+        from FD_FishTool.core.validator import FishValidator
+        return self._subsystem("validator", lambda: FishValidator(self.cfg))
+
+    @property
+    def anim_mgr(self):
+        from FD_FishTool.core.anim_manager import AnimManager
+        return self._subsystem("anim_mgr", lambda: AnimManager(self.cfg))
+
+    @property
+    def physics_mgr(self):
+        from FD_FishTool.core.physics_manager import PhysicsManager
+        return self._subsystem("physics_mgr", lambda: PhysicsManager(self.cfg))
+
+    @property
+    def bone_preparer(self):
+        # Подготовка костей для ренейма
+        from FD_FishTool.core.meta_exporter import BoneNamePreparing
+        return self._subsystem("bone_preparer", lambda: BoneNamePreparing(self.cfg.load_json("bone_map.json")))
 
     def init_ui(self):
         central = QtWidgets.QWidget()
@@ -47,10 +56,13 @@ class FD_MainWindow(QtWidgets.QMainWindow):
         self.tabs = QtWidgets.QTabWidget()
         layout.addWidget(self.tabs)
 
-        # Подключение вкладок (Animation и Export не тронуты)
-        self.tabs.addTab(self.ui_rigging_tab(), "Rigging")
-        self.tabs.addTab(self.ui_animation_tab(), "Animation")
-        self.tabs.addTab(self.ui_export_tab(), "Export")
+        # Подключение вкладок: пустые держатели, содержимое строится при первом открытии
+        for title, builder in [("Rigging", self.ui_rigging_tab), ("Animation", self.ui_animation_tab),
+                               ("Export", self.ui_export_tab), ("Face Rig", self.ui_face_tab)]:
+            holder = QtWidgets.QWidget()
+            QtWidgets.QVBoxLayout(holder).setContentsMargins(0, 0, 0, 0)
+            self._tab_builders[self.tabs.addTab(holder, title)] = builder
+        self.tabs.currentChanged.connect(self._build_tab)
 
         # Настройки снизу
         btn_settings = QtWidgets.QPushButton("⚙ Настройки Пайплайна")
@@ -58,12 +70,25 @@ class FD_MainWindow(QtWidgets.QMainWindow):
         btn_settings.clicked.connect(self.open_settings)
         layout.addWidget(btn_settings)
 
+        btn_timing = QtWidgets.QPushButton("⏱ Тайминги")
+        btn_timing.clicked.connect(self.open_timing_panel)
+        layout.addWidget(btn_timing)
+
+        self._build_tab(self.tabs.currentIndex())
+
+    def _build_tab(self, index):
+        builder = self._tab_builders.pop(index, None)
+        if not builder: return
+        with instrumentation.phase("Tab: " + self.tabs.tabText(index), "tab"):
+            self.tabs.widget(index).layout().addWidget(builder())
+
     def ui_rigging_tab(self):
         """Вкладка риггинга: Здесь мы работаем над телом и ИИ."""
         tab = QtWidgets.QWidget()
         layout = QtWidgets.QVBoxLayout(tab)
         
         # Виджет логики тела (наш новый модуль)
+        from FD_FishTool.ui.rig_body_ui import RigBodyWidget
         self.rig_body_ui = RigBodyWidget(config=self.cfg)
         layout.addWidget(self.rig_body_ui)
         
@@ -117,6 +142,7 @@ class FD_MainWindow(QtWidgets.QMainWindow):
         btn_sync.clicked.connect(self.refresh_anim_list)
         layout.addWidget(btn_sync)
         
+        self.refresh_anim_list()
         return tab
 
     def ui_export_tab(self):
@@ -137,6 +163,16 @@ class FD_MainWindow(QtWidgets.QMainWindow):
         val_lay.addWidget(self.report_tree)
         layout.addWidget(val_group)
 
+        # Предпросмотр весов движка (4 инфлюенса, 8 бит)
+        eng_group = QtWidgets.QGroupBox("Веса движка (4 x 8 бит)")
+        eng_lay = QtWidgets.QHBoxLayout(eng_group)
+        btn_engine = QtWidgets.QPushButton("🧮 ОШИБКА КВАНТОВАНИЯ (выделенный меш)")
+        btn_engine.clicked.connect(self.run_engine_preview)
+        btn_engine_clear = QtWidgets.QPushButton("Сбросить цвета")
+        btn_engine_clear.clicked.connect(self.clear_engine_preview)
+        eng_lay.addWidget(btn_engine, 3); eng_lay.addWidget(btn_engine_clear, 1)
+        layout.addWidget(eng_group)
+
         # Секция подготовки и экспорта
         prep_group = QtWidgets.QGroupBox("Подготовка")
         prep_lay = QtWidgets.QVBoxLayout(prep_group)
@@ -155,7 +191,13 @@ class FD_MainWindow(QtWidgets.QMainWindow):
         layout.addWidget(prep_group)
         return tab
 
+    def ui_face_tab(self):
+        from FD_FishTool.ui.rig_face_ui import FaceRigTab
+        self.face_tab = FaceRigTab()
+        return self.face_tab
+
     def open_spring_selector(self):
+        from FD_FishTool.ui.spring_selector import SpringSelectorWindow
         self.spring_win = SpringSelectorWindow(self.physics_mgr, parent=self)
         self.spring_win.show()
 
@@ -171,6 +213,36 @@ class FD_MainWindow(QtWidgets.QMainWindow):
             item.setForeground(0, QtGui.QColor(255, 120, 120))
             self.report_tree.addTopLevelItem(item)
 
+    def run_engine_preview(self):
+        from FD_FishTool.core.engine_preview import EnginePreview, parse_clips
+        sel = [t for t in cmds.ls(sl=True, type='transform') if cmds.listRelatives(t, s=True, type='mesh')]
+        if not sel:
+            cmds.warning("FD_FishTool: Выделите скинованный меш.")
+            return
+        clips = parse_clips(self.cfg.load_json("paths.json").get("animation_data"))
+        if not clips:
+            cmds.warning("FD_FishTool: Нет клипов animation.txt (см. Настройки Пайплайна).")
+            return
+        try:
+            self.engine_preview = EnginePreview(sel[0])
+        except RuntimeError as e:
+            cmds.warning(f"FD_FishTool: {e}")
+            return
+        report = self.engine_preview.analyze(clips)
+        self.engine_preview.show_overlay()
+
+        self.report_tree.clear()
+        head = QtWidgets.QTreeWidgetItem(["🧮 ENGINE", "{}: макс. смещение {:.4f}, среднее {:.5f} ({} кадров, урезано до 4: {} вершин)".format(
+            sel[0], report["max"], report["mean"], report["frames"], report["pruned"])])
+        self.report_tree.addTopLevelItem(head)
+        for v, err, frame in report["worst"]:
+            head.addChild(QtWidgets.QTreeWidgetItem([f"vtx[{v}]", f"{err:.4f} (кадр {frame:g})"]))
+        head.setExpanded(True)
+
+    def clear_engine_preview(self):
+        preview = getattr(self, "engine_preview", None)
+        if preview and cmds.objExists(preview.mesh): preview.clear_overlay()
+
     def run_export_toggle(self):
         self.bone_preparer.execute()
 
@@ -197,6 +269,7 @@ class FD_MainWindow(QtWidgets.QMainWindow):
             cmds.warning(f"Ошибка при открытии экспортера: {e}")
 
     def refresh_anim_list(self):
+        from FD_FishTool.core.anim_handler import AnimSyncManager
         self.anim_tree.clear()
         ref_path = self.cfg.load_json("paths.json").get("animation_data")
         if not ref_path: return
@@ -221,6 +294,11 @@ class FD_MainWindow(QtWidgets.QMainWindow):
                 cmds.currentTime(start)
             except: pass
 
+    def open_timing_panel(self):
+        from FD_FishTool.ui.timing_panel import TimingPanel
+        self.timing_panel = TimingPanel(parent=self)
+        self.timing_panel.show()
+
     def open_settings(self):
         from FD_FishTool.ui.settings_window import SettingsWindow
         sw = SettingsWindow(self.cfg, parent=self)
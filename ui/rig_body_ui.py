@@ -51,10 +51,54 @@ class RigBodyWidget(QtWidgets.QWidget):
         btn_apply.clicked.connect(lambda: self.manager.apply_topological_gradient(self.mesh_combo.currentText()))
         btn_weighted = QtWidgets.QPushButton("Select Influenced Bones"); btn_weighted.clicked.connect(lambda: self.manager.select_weighted_bones(self.mesh_combo.currentText()))
         btn_clean = QtWidgets.QPushButton("Remove Zero Weight Bones"); btn_clean.clicked.connect(lambda: self.manager.clean_weightless_bones(self.mesh_combo.currentText()))
-        ul.addWidget(btn_apply); ul.addWidget(btn_weighted); ul.addWidget(btn_clean); layout.addWidget(util_group)
+        ul.addWidget(btn_apply); ul.addWidget(btn_weighted); ul.addWidget(btn_clean)
+        mirror_l = QtWidgets.QHBoxLayout()
+        self.mirror_dir = QtWidgets.QComboBox(); self.mirror_dir.addItems(["+X -> -X", "-X -> +X"])
+        btn_mirror = QtWidgets.QPushButton("Mirror Skin Weights"); btn_mirror.clicked.connect(self._mirror_weights)
+        mirror_l.addWidget(self.mirror_dir, 1); mirror_l.addWidget(btn_mirror, 3); ul.addLayout(mirror_l)
+        btn_transfer = QtWidgets.QPushButton("Transfer Weights To Selected Meshes"); btn_transfer.clicked.connect(self._transfer_weights)
+        ul.addWidget(btn_transfer)
+        smooth_l = QtWidgets.QHBoxLayout(); smooth_l.addWidget(QtWidgets.QLabel("Iterations:"))
+        self.smooth_spin = QtWidgets.QSpinBox(); self.smooth_spin.setRange(1, 20); self.smooth_spin.setValue(3)
+        btn_smooth = QtWidgets.QPushButton("Smooth Weights (Selected / All)")
+        btn_smooth.clicked.connect(lambda: self.manager.smooth_weights(self.mesh_combo.currentText(), self.smooth_spin.value()))
+        smooth_l.addWidget(self.smooth_spin, 1); smooth_l.addWidget(btn_smooth, 3); ul.addLayout(smooth_l)
+        hist_l = QtWidgets.QHBoxLayout()
+        btn_w_undo = QtWidgets.QPushButton("Weights Undo"); btn_w_undo.clicked.connect(lambda: self.manager.undo_weights())
+        btn_w_redo = QtWidgets.QPushButton("Weights Redo"); btn_w_redo.clicked.connect(lambda: self.manager.redo_weights())
+        hist_l.addWidget(btn_w_undo); hist_l.addWidget(btn_w_redo); ul.addLayout(hist_l)
+        io_l = QtWidgets.QHBoxLayout()
+        btn_export = QtWidgets.QPushButton("Export Weights..."); btn_export.clicked.connect(self._export_weights)
+        btn_import = QtWidgets.QPushButton("Import Weights..."); btn_import.clicked.connect(self._import_weights)
+        io_l.addWidget(btn_export); io_l.addWidget(btn_import); ul.addLayout(io_l)
+        layout.addWidget(util_group)
         
         layout.addStretch()
 
+    def _mirror_weights(self):
+        mesh = self.mesh_combo.currentText()
+        unmatched = self.manager.mirror_skin_weights(mesh, self.mirror_dir.currentIndex() == 0)
+        if unmatched:
+            cmds.select(["{}.vtx[{}]".format(mesh, i) for i in unmatched], r=True)
+            cmds.warning("FD_FishTool: {} вершин без симметричной пары (выделены).".format(len(unmatched)))
+
+    def _transfer_weights(self):
+        source = self.mesh_combo.currentText()
+        targets = [t for t in cmds.ls(sl=True, type='transform') if cmds.listRelatives(t, s=True, type='mesh')]
+        if not targets:
+            cmds.warning("FD_FishTool: Выделите меши-цели (LOD / варианты).")
+            return
+        self.manager.transfer_weights(source, targets)
+
+    def _export_weights(self):
+        mesh = self.mesh_combo.currentText()
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Экспорт весов", mesh + ".fdsw", "Skin Weights (*.fdsw)")
+        if path: self.manager.export_skin_weights(mesh, path)
+
+    def _import_weights(self):
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Импорт весов", "", "Skin Weights (*.fdsw)")
+        if path: self.manager.import_skin_weights(self.mesh_combo.currentText(), path)
+
     def _get_mesh_from_sel(self):
         sel = cmds.ls(sl=True, type='transform')
         if sel and cmds.listRelatives(sel[0], s=True, type='mesh'):
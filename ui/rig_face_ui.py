@@ -137,7 +137,24 @@ class FaceRigTab(QtWidgets.QWidget):
         brow_l = QtWidgets.QHBoxLayout(); brow_l.addWidget(QtWidgets.QLabel("Brows:")); self.brow_spin = QtWidgets.QSpinBox(); self.brow_spin.setRange(1, 3); self.brow_spin.setValue(2); brow_l.addWidget(self.brow_spin)
         gl.addLayout(brow_l); self.btn_brows = QtWidgets.QPushButton("Build Brows"); self.btn_brows.clicked.connect(self.run_brows); gl.addWidget(self.btn_brows)
         self.btn_jaw = QtWidgets.QPushButton("Create Jaw & Teeth"); self.btn_jaw.clicked.connect(self.run_jaw_teeth); gl.addWidget(self.btn_jaw)
-        layout.addWidget(g_geo); layout.addStretch()
+        layout.addWidget(g_geo)
+
+        self.btn_reduce = QtWidgets.QPushButton("Reduce SDK Keys"); self.btn_reduce.clicked.connect(lambda: self.builder.reduce_sdk_keys())
+        layout.addWidget(self.btn_reduce)
+
+        g_recipe = QtWidgets.QGroupBox("Face Recipe")
+        rl = QtWidgets.QHBoxLayout(g_recipe)
+        self.btn_save_recipe = QtWidgets.QPushButton("Save Recipe"); self.btn_save_recipe.clicked.connect(self.save_recipe); rl.addWidget(self.btn_save_recipe)
+        self.btn_build_recipe = QtWidgets.QPushButton("Build From Recipe"); self.btn_build_recipe.clicked.connect(self.build_recipe); rl.addWidget(self.btn_build_recipe)
+        layout.addWidget(g_recipe); layout.addStretch()
+
+    def save_recipe(self):
+        self.builder.ai_log = self.ai_log
+        self.builder.save_recipe()
+
+    def build_recipe(self):
+        self.builder.ai_log = self.ai_log
+        self.builder.build_from_recipe()
 
     def open_selector(self):
         if self.builder.import_gui_library():
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from PySide2 import QtWidgets, QtCore, QtGui
 import maya.cmds as cmds
+from FD_FishTool.core.chain_detector import FinChainDetector
 
 class SpringSelectorWindow(QtWidgets.QDialog):
     def __init__(self, physics_manager, parent=None):
@@ -37,12 +38,21 @@ class SpringSelectorWindow(QtWidgets.QDialog):
         
         self.chk_loop = QtWidgets.QCheckBox("Loop (Цикличная анимация)")
         self.chk_loop.setChecked(True)
+        self.chk_pool = QtWidgets.QCheckBox("Параллельный расчет в воркерах (вне Maya)")
+        self.chk_pool.setChecked(False)
+        self.chk_sparse = QtWidgets.QCheckBox("Sparse bake (только диапазоны клипов)")
+        self.chk_sparse.setChecked(False)
+        self.chk_reduce = QtWidgets.QCheckBox("Прореживание ключей после запекания")
+        self.chk_reduce.setChecked(False)
         
         cfg_lay.addWidget(QtWidgets.QLabel("Spring (Ratio):"), 0, 0)
         cfg_lay.addWidget(self.val_spring, 0, 1)
         cfg_lay.addWidget(QtWidgets.QLabel("Twist (Ratio):"), 0, 2)
         cfg_lay.addWidget(self.val_twist, 0, 3)
         cfg_lay.addWidget(self.chk_loop, 1, 0, 1, 4)
+        cfg_lay.addWidget(self.chk_pool, 2, 0, 1, 4)
+        cfg_lay.addWidget(self.chk_sparse, 3, 0, 1, 4)
+        cfg_lay.addWidget(self.chk_reduce, 4, 0, 1, 4)
         layout.addWidget(cfg_group)
 
         # 2. Блок выбора контролов цепей (версия 5)
@@ -75,6 +85,19 @@ class SpringSelectorWindow(QtWidgets.QDialog):
             
         layout.addLayout(form)
 
+        # Автоматический поиск цепей по именам и иерархии
+        auto_lay = QtWidgets.QHBoxLayout()
+        btn_auto = QtWidgets.QPushButton("🔍 Авто-поиск цепей")
+        btn_auto.clicked.connect(self.auto_detect)
+        btn_auto_run = QtWidgets.QPushButton("⚡ Авто-поиск + полный цикл")
+        btn_auto_run.clicked.connect(self.auto_detect_and_run)
+        btn_parity = QtWidgets.QPushButton("⚖ Сверка пула со SpringMagic")
+        btn_parity.clicked.connect(self.check_parity)
+        auto_lay.addWidget(btn_auto)
+        auto_lay.addWidget(btn_auto_run)
+        auto_lay.addWidget(btn_parity)
+        layout.addLayout(auto_lay)
+
         # 3. Кнопка запуска полного цикла
         btn_run = QtWidgets.QPushButton("🚀 ЗАПУСТИТЬ ПОЛНЫЙ ЦИКЛ ФИЗИКИ")
         btn_run.setMinimumHeight(60)
@@ -92,8 +115,11 @@ class SpringSelectorWindow(QtWidgets.QDialog):
             return
         
         root_ctrl = sel[0]
-        # Используем метод симметрии из менеджера
-        sym_ctrl = self.physics_mgr.get_symmetric_control(root_ctrl)
+        # Симметричная пара из индекса контролов (перестраиваем, если контрол новый)
+        index = self.physics_mgr.get_control_index()
+        if not index.long_name(root_ctrl):
+            index = self.physics_mgr.get_control_index(rebuild=True)
+        sym_ctrl = index.partner(root_ctrl)
         
         roots = [root_ctrl]
         display_text = root_ctrl
@@ -106,6 +132,47 @@ class SpringSelectorWindow(QtWidgets.QDialog):
         self.ui_inputs[key].setText(display_text)
         self.ui_inputs[key].setStyleSheet("background-color: #2b4433; color: white;")
 
+    def auto_detect(self):
+        """Заполняет все группы найденными цепями (пары _L/_R вместе)."""
+        index = self.physics_mgr.get_control_index(rebuild=True)
+        mapping = FinChainDetector(index).detect()
+        if not mapping:
+            QtWidgets.QMessageBox.warning(self, "Ошибка", "Пружинные цепи в сцене не найдены.")
+            return False
+
+        self.mapping = mapping
+        for key, line in self.ui_inputs.items():
+            roots = mapping.get(key)
+            if roots:
+                line.setText(" + ".join(roots) + " (Auto)")
+                line.setStyleSheet("background-color: #2b4433; color: white;")
+            else:
+                line.clear()
+                line.setStyleSheet("")
+        return True
+
+    def auto_detect_and_run(self):
+        """Один клик: поиск всех цепей и расчет их одной пакетной задачей."""
+        if self.auto_detect():
+            self.execute_pipeline()
+
+    def check_parity(self):
+        """Сверка решателя пула с SpringMagic на первой назначенной цепи (сцена не меняется)."""
+        if not self.mapping:
+            QtWidgets.QMessageBox.warning(self, "Ошибка", "Назначьте хотя бы один контрол!")
+            return
+        key, roots = next(iter(self.mapping.items()))
+        anim = "plavnik_normal_move" if key in ["SideFin", "SideFin2", "BellyFin"] else "normal_move"
+        r = self.physics_mgr.check_solver_parity(roots[0], anim, self.val_spring.value(),
+                                                 self.val_twist.value(), self.chk_loop.isChecked())
+        if r is None:
+            QtWidgets.QMessageBox.warning(self, "Ошибка", f"Цепь {roots[0]} / {anim} нельзя посчитать в пуле.")
+            return
+        QtWidgets.QMessageBox.information(
+            self, "Parity",
+            f"{roots[0]} / {anim}: макс. {r['max']:.3f} град. (кадр {r['frame']:g}), средн. {r['mean']:.3f} -- "
+            + ("в допуске" if r["ok"] else "РАСХОЖДЕНИЕ, пул для этой цепи не использовать"))
+
     def execute_pipeline(self):
         """
         Выполняет итеративный просчет всех анимаций для каждой группы.
@@ -114,30 +181,91 @@ class SpringSelectorWindow(QtWidgets.QDialog):
             QtWidgets.QMessageBox.warning(self, "Ошибка", "Назначьте хотя бы один контрол!")
             return
         
-        all_proxies = []
-        
         # Определяем наборы анимаций для разных групп по эталону
         fin_anims = ["plavnik_normal_move", "plavnik_normal_move2", "plavnik_wait_pose", "plavnik_crowded"]
         other_anims = ["normal_move", "wait_pose"]
 
-        # Процесс: LAT -> Bind -> Apply (для каждого клипа)
+        self.physics_mgr.sim_cache.reset_stats()
+        self.physics_mgr.get_control_index(rebuild=True)
+        roots_anims = []
         for key, roots in self.mapping.items():
             # Выбор списка анимаций в зависимости от группы
             anims = fin_anims if key in ["SideFin", "SideFin2", "BellyFin"] else other_anims
-            
-            for r in roots:
-                # Вызов основного рабочего метода физики
-                proxies = self.physics_mgr.process_spring_logic(
-                    root_ctrl=r, 
-                    anim_list=anims, 
-                    spring_val=self.val_spring.value(), 
-                    twist_val=self.val_twist.value(), 
-                    is_loop=self.chk_loop.isChecked()
-                )
-                all_proxies.extend(proxies)
-
-        # Финальное запекание на контролы в диапазоне 9-189
-        self.physics_mgr.final_bake(all_proxies)
+            roots_anims.extend((r, anims) for r in roots)
+
+        report = {}
+        if self.chk_pool.isChecked():
+            pool_out = self.run_pool_pipeline(roots_anims)
+            if pool_out is None:
+                QtWidgets.QMessageBox.warning(self, "Отмена", "Расчет физики отменен, ключи не записаны.")
+                return
+            roots_anims, report = pool_out
+
+        if roots_anims:
+            report.update(self.run_springmagic_pipeline(roots_anims) or {})
+        
+        stats = self.physics_mgr.sim_cache.stats()
+        lines = [f"{root}: кадров {r['frames']}, ключей {r['keys']}" for root, r in sorted(report.items())]
         
-        QtWidgets.QMessageBox.information(self, "Success", "Все физические циклы запечены и очищены.")
-        self.accept()
\ No newline at end of file
+        if self.chk_reduce.isChecked():
+            reduced = self.physics_mgr.reduce_baked_keys()
+            if reduced:
+                before = sum(r["before"] for r in reduced.values())
+                after = sum(r["after"] for r in reduced.values())
+                worst = max(r["max_error"] for r in reduced.values())
+                lines.append(f"Прореживание: ключей {before} -> {after}, макс. ошибка {worst:.4f}")
+        QtWidgets.QMessageBox.information(
+            self, "Success",
+            "Все физические циклы запечены и очищены.\n"
+            f"Кэш симуляции: попаданий {stats['hits']}, промахов {stats['misses']}.\n"
+            + "\n".join(lines)
+        )
+        self.accept()
+
+    def run_pool_pipeline(self, roots_anims):
+        """
+        Расчет всех задач цепь x клип в пуле воркеров с прогрессом и отменой.
+        Возвращает (цепи для SpringMagic, отчет по цепям) или None при отмене.
+        """
+        progress = QtWidgets.QProgressDialog("Расчет физики цепей...", "Отмена", 0, 100, self)
+        progress.setWindowModality(QtCore.Qt.WindowModal)
+        progress.setMinimumDuration(0)
+
+        def on_progress(done, total):
+            progress.setMaximum(total)
+            progress.setValue(done)
+            progress.setLabelText(f"Расчет физики цепей: {done}/{total}")
+            QtWidgets.QApplication.processEvents()
+
+        def is_cancelled():
+            QtWidgets.QApplication.processEvents()
+            return progress.wasCanceled()
+
+        try:
+            return self.physics_mgr.process_spring_batch(
+                roots_anims,
+                spring_val=self.val_spring.value(),
+                twist_val=self.val_twist.value(),
+                is_loop=self.chk_loop.isChecked(),
+                progress_cb=on_progress,
+                cancel_cb=is_cancelled
+            )
+        finally:
+            progress.close()
+
+    def run_springmagic_pipeline(self, roots_anims):
+        """Последовательный расчет через SpringMagic (LAT -> Bind -> Apply для каждого клипа)."""
+        all_proxies = []
+        for r, anims in roots_anims:
+            # Вызов основного рабочего метода физики
+            proxies = self.physics_mgr.process_spring_logic(
+                root_ctrl=r, 
+                anim_list=anims, 
+                spring_val=self.val_spring.value(), 
+                twist_val=self.val_twist.value(), 
+                is_loop=self.chk_loop.isChecked()
+            )
+            all_proxies.extend(proxies)
+
+        # Финальное запекание на контролы: диапазоны клипов или весь 9-189
+        return self.physics_mgr.final_bake(all_proxies, sparse=self.chk_sparse.isChecked())
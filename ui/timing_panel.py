@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+from PySide2 import QtWidgets, QtCore, QtGui
+from FD_FishTool.core import instrumentation
+
+
+class TimingPanel(QtWidgets.QDialog):
+    def __init__(self, parent=None):
+        """Журнал замеров: фазы старта, вкладки и операции с числом команд Maya."""
+        super(TimingPanel, self).__init__(parent)
+        self.setWindowTitle("Тайминги | FD_FishTool")
+        self.setMinimumSize(650, 450)
+        self.setModal(False)
+        self.init_ui()
+        self.refresh()
+
+    def init_ui(self):
+        layout = QtWidgets.QVBoxLayout(self)
+        top = QtWidgets.QHBoxLayout()
+        self.enable_chk = QtWidgets.QCheckBox("Запись включена")
+        self.enable_chk.setChecked(instrumentation.is_enabled())
+        self.enable_chk.toggled.connect(instrumentation.enable)
+        self.stacks_chk = QtWidgets.QCheckBox("Стеки (flame graph)")
+        self.stacks_chk.toggled.connect(lambda on: instrumentation.enable(instrumentation.is_enabled(), stacks=on))
+        top.addWidget(self.enable_chk); top.addWidget(self.stacks_chk); top.addStretch()
+        for label, slot in [("Обновить", self.refresh), ("Очистить", self.clear), ("Сохранить JSON", self.save_json),
+                            ("Отчет cmds", self.print_report), ("Сохранить стеки", self.save_folded)]:
+            btn = QtWidgets.QPushButton(label); btn.clicked.connect(slot); top.addWidget(btn)
+        layout.addLayout(top)
+
+        self.tree = QtWidgets.QTreeWidget()
+        self.tree.setHeaderLabels(["Фаза", "Тип", "мс", "Команд", "Топ команд"])
+        self.tree.setColumnWidth(0, 200)
+        layout.addWidget(self.tree)
+
+    def refresh(self):
+        self.tree.clear()
+        for r in reversed(instrumentation.records()):
+            top = ", ".join("{} x{}".format(c, n) for c, n in list(r["commands"].items())[:4])
+            item = QtWidgets.QTreeWidgetItem(["  " * r["depth"] + r["name"], r["kind"],
+                                              "{:.1f}".format(r["duration"] * 1000.0), str(r["calls"]), top])
+            item.setToolTip(0, "\n".join(r["callers"]))
+            if r["hot"]:
+                item.setForeground(4, QtGui.QColor(255, 120, 120))
+                item.setToolTip(4, "Горячие команды (>{} вызовов): {}".format(instrumentation.HOT_CALLS, ", ".join(r["hot"])))
+            self.tree.addTopLevelItem(item)
+
+    def clear(self):
+        instrumentation.clear()
+        self.refresh()
+
+    def save_json(self):
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Сохранить тайминги", "fd_timing.json", "JSON (*.json)")
+        if path: instrumentation.dump_json(path)
+
+    def print_report(self):
+        """Отчет по командам и вызывающим функциям последней внешней фазы -- в Script Editor."""
+        prof = instrumentation.last_profile
+        if prof: print(prof.report())
+
+    def save_folded(self):
+        prof = instrumentation.last_profile
+        if not prof or not prof.folded:
+            print("FD_FishTool: Нет стеков -- включите 'Стеки' и повторите операцию.")
+            return
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Сохранить стеки", "fd_cmds.folded", "Folded stacks (*.folded *.txt)")
+        if path: prof.save_folded(path)
@@ -34,17 +34,29 @@ class WeightBlenderWidget(QtWidgets.QWidget):
         self.tw_slider.sliderMoved.connect(self._on_move)
         self.tw_slider.sliderReleased.connect(self._on_release)
         
-        tw_group.addWidget(self.tw_slider); layout.addLayout(tw_group)
+        tw_group.addWidget(self.tw_slider)
+        self.chain_chk = QtWidgets.QCheckBox("Chain Mode (all selected joints, in order)")
+        tw_group.addWidget(self.chain_chk)
+        # Весь drag -- одна запись истории весов; Ctrl+Z Maya ее не видит
+        undo_row = QtWidgets.QHBoxLayout()
+        undo_hint = QtWidgets.QLabel("↶ Отмена drag (Ctrl+Z Maya веса не откатывает):")
+        undo_hint.setStyleSheet("color: #999;")
+        btn_undo = QtWidgets.QPushButton("Weights Undo"); btn_undo.clicked.connect(lambda: self.blender.mgr.undo_weights())
+        undo_row.addWidget(undo_hint); undo_row.addStretch(); undo_row.addWidget(btn_undo)
+        tw_group.addLayout(undo_row); layout.addLayout(tw_group)
 
     def _on_press(self):
         """Информативное отображение имен костей."""
         joints = cmds.ls(os=True, type='joint')
         if len(joints) >= 2:
-            n1, n2 = joints[0].split('|')[-1], joints[1].split('|')[-1]
+            chain = self.chain_chk.isChecked()
+            n1, n2 = joints[0].split('|')[-1], joints[-1 if chain else 1].split('|')[-1]
+            if chain: n2 = f"{n2} ({len(joints)})"
             self.bn1_label.setText(f"🔴 <b>{n1}</b>")
             self.bn2_label.setText(f"<b>{n2}</b> 🔵")
             # Стартуем логику. Если кость не инфлюенс - вернет False.
-            if not self.blender.start_live_blend(self.get_mesh()):
+            start = self.blender.start_chain_blend if chain else self.blender.start_live_blend
+            if not start(self.get_mesh()):
                 # Сбрасываем метки, если старт не удался
                 self.bn1_label.setText("🔴 <b>BN1</b>")
                 self.bn2_label.setText("<b>BN2</b> 🔵")